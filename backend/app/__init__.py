@@ -0,0 +1,4 @@
+# Environment is loaded once, before any module reads its settings from os.getenv
+from dotenv import load_dotenv
+
+load_dotenv()
@@ -0,0 +1,118 @@
+# app/admission.py
+
+import asyncio
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from fastapi import Request
+from fastapi.responses import JSONResponse
+
+
+class Saturated(Exception):
+    """Raised when a pool's workers and queue are all taken."""
+
+    def __init__(self, pool: str, retry_after: int):
+        super().__init__(f"{pool} is saturated")
+        self.pool = pool
+        self.retry_after = retry_after
+
+
+class BoundedExecutor:
+    """
+    Thread pool with a bounded queue. At most max_workers tasks run and max_queue wait;
+    beyond that submit() rejects immediately (or blocks, for nested pipeline stages).
+    """
+
+    def __init__(self, name: str, max_workers: int, max_queue: int, retry_after: int = 5):
+        self.name = name
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.retry_after = retry_after
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+        self._slots = threading.BoundedSemaphore(max_workers + max_queue)
+        self._lock = threading.Lock()
+        self.active = 0
+        self.queued = 0
+        self.completed = 0
+        self.rejected = 0
+
+    def submit(self, fn, *args, block: bool = False, timeout: float | None = None, **kwargs) -> Future:
+        """Queue fn. block=True waits (up to timeout) for a slot instead of rejecting."""
+        acquired = self._slots.acquire(timeout=timeout) if block else self._slots.acquire(blocking=False)
+        if not acquired:
+            with self._lock:
+                self.rejected += 1
+            raise Saturated(self.name, self.retry_after)
+        with self._lock:
+            self.queued += 1
+
+        def _run():
+            with self._lock:
+                self.queued -= 1
+                self.active += 1
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                with self._lock:
+                    self.active -= 1
+                    self.completed += 1
+                self._slots.release()
+
+        try:
+            return self._executor.submit(_run)
+        except Exception:
+            with self._lock:
+                self.queued -= 1
+            self._slots.release()
+            raise
+
+    def call(self, fn, *args, **kwargs):
+        """Run fn in the pool and wait for it, queueing for a slot instead of rejecting."""
+        return self.submit(fn, *args, block=True, **kwargs).result()
+
+    async def run(self, fn, *args, **kwargs):
+        """Await fn in the pool from a route; raises Saturated when full."""
+        return await asyncio.wrap_future(self.submit(fn, *args, **kwargs))
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "workers": self.max_workers,
+                "queue_limit": self.max_queue,
+                "active": self.active,
+                "queued": self.queued,
+                "completed": self.completed,
+                "rejected": self.rejected,
+            }
+
+
+def _pool(name: str, env_prefix: str, workers: int, queue: int) -> BoundedExecutor:
+    return BoundedExecutor(
+        name,
+        max_workers=int(os.getenv(f"{env_prefix}_WORKERS", str(workers))),
+        max_queue=int(os.getenv(f"{env_prefix}_QUEUE", str(queue))),
+        retry_after=int(os.getenv(f"{env_prefix}_RETRY_AFTER", "5")),
+    )
+
+
+# Heavy work runs here instead of FastAPI's shared threadpool, so light routes
+# (/test-token, /user/update-profile) keep their latency under parsing bursts.
+gmail_pool = _pool("gmail-io", "GMAIL_IO", workers=8, queue=32)
+decrypt_pool = _pool("decrypt-text", "DECRYPT", workers=4, queue=16)
+ocr_pool = _pool("ocr", "OCR", workers=2, queue=4)
+render_pool = _pool("render", "RENDER", workers=2, queue=8)
+
+POOLS = {pool.name: pool for pool in (gmail_pool, decrypt_pool, ocr_pool, render_pool)}
+
+
+def pool_stats() -> dict:
+    return {name: pool.stats() for name, pool in POOLS.items()}
+
+
+async def saturated_handler(request: Request, exc: Saturated) -> JSONResponse:
+    return JSONResponse(
+        status_code=503,
+        content={"detail": f"{exc.pool} is busy, retry later", "pool": exc.pool},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
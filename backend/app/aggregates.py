@@ -0,0 +1,163 @@
+# app/aggregates.py
+
+import hashlib
+import sys
+from datetime import date, datetime
+
+from pymongo.errors import DuplicateKeyError
+
+from app.db import aggregates_collection
+from app.records import iter_records
+
+# One document per user, updated in place as statements are ingested:
+#   months.<card>.<YYYY-MM> -> {total_due, minimum_due, statements}
+#   latest.<card>            -> newest statement's {due_date, total_due, minimum_due, message_id}
+#   contrib.<key>            -> what each statement last added, so re-ingesting applies only the delta
+# Cards are keyed by issuer; statements are bucketed by the month of their due date.
+
+# a conditional update that lost a race re-reads and retries this many times
+_APPLY_ATTEMPTS = 5
+_indexes_ready = False
+
+
+def _ensure_indexes() -> None:
+    global _indexes_ready
+    if not _indexes_ready:
+        aggregates_collection.create_index("email", unique=True)
+        _indexes_ready = True
+
+
+def _contrib_key(message_id: str, filename: str) -> str:
+    # field names cannot hold dots, so statements are keyed by a digest
+    return hashlib.sha1(f"{message_id}/{filename}".encode()).hexdigest()[:16]
+
+
+def _bucket(card: str, month: str) -> str:
+    return f"months.{card}.{month}"
+
+
+def apply_statement(email: str, message_id: str, filename: str, card: str,
+                    total_due: float | None, minimum_due: float | None, due_date: str | None) -> None:
+    """
+    Fold one parsed statement into the user's aggregates. Re-applying a statement
+    (a re-parse, a corrected amount) first subtracts its previous contribution; one
+    that no longer has a total or due date is taken out of the aggregates entirely.
+    """
+    _ensure_indexes()
+    key = _contrib_key(message_id, filename)
+    card = card or "generic"
+    new = None
+    if total_due is not None and due_date:
+        new = {"card": card, "month": due_date[:7], "total_due": total_due or 0.0, "minimum_due": minimum_due or 0.0}
+
+    for _ in range(_APPLY_ATTEMPTS):
+        state = aggregates_collection.find_one({"email": email}, {f"contrib.{key}": 1, "latest": 1})
+        old = (state or {}).get("contrib", {}).get(key)
+        if old == new:
+            return
+        # only lands if the contribution is still the one read above, so two workers
+        # applying the same statement (ingest, re-parse, OCR callback) cannot both count it
+        guard = {"email": email, f"contrib.{key}": old if old else {"$exists": False}}
+        update = _statement_update(state or {}, key, old, new, message_id, filename, due_date)
+        try:
+            result = aggregates_collection.update_one(guard, update, upsert=state is None)
+        except DuplicateKeyError:
+            continue  # another worker created the document first
+        if result.matched_count or result.upserted_id is not None:
+            return
+    print(f"❌ Aggregates for {email} kept changing; statement {message_id}/{filename} not applied")
+
+
+def _statement_update(state: dict, key: str, old: dict | None, new: dict | None, message_id: str, filename: str,
+                      due_date: str | None) -> dict:
+    """The update that replaces a statement's old contribution (if any) with new (None removes it)."""
+    inc: dict[str, float] = {}
+    if old:
+        prefix = _bucket(old["card"], old["month"])
+        inc[f"{prefix}.total_due"] = -old["total_due"]
+        inc[f"{prefix}.minimum_due"] = -old["minimum_due"]
+        inc[f"{prefix}.statements"] = -1
+    update = {"$set": {"updated_at": datetime.utcnow()}}
+    unset = {}
+    latest_by_card = state.get("latest", {})
+    if old and (new is None or old["card"] != new["card"]):
+        # the statement left its old card (or the aggregates): it can no longer be that card's latest
+        previous = latest_by_card.get(old["card"], {})
+        if previous.get("message_id") == message_id and previous.get("filename") == filename:
+            unset[f"latest.{old['card']}"] = ""
+    if new is None:
+        unset[f"contrib.{key}"] = ""
+    else:
+        card = new["card"]
+        prefix = _bucket(card, new["month"])
+        inc[f"{prefix}.total_due"] = inc.get(f"{prefix}.total_due", 0) + new["total_due"]
+        inc[f"{prefix}.minimum_due"] = inc.get(f"{prefix}.minimum_due", 0) + new["minimum_due"]
+        inc[f"{prefix}.statements"] = inc.get(f"{prefix}.statements", 0) + 1
+        update["$set"][f"contrib.{key}"] = new
+        latest = latest_by_card.get(card)
+        if not latest or latest.get("message_id") == message_id or due_date >= latest.get("due_date", ""):
+            update["$set"][f"latest.{card}"] = {
+                "due_date": due_date,
+                "total_due": new["total_due"],
+                "minimum_due": new["minimum_due"],
+                "message_id": message_id,
+                "filename": filename,
+            }
+    if inc:
+        update["$inc"] = inc
+    if unset:
+        update["$unset"] = unset
+    return update
+
+
+def apply_record(email: str, record: dict) -> None:
+    """Apply a stored attachment record if it is a parsed credit-card statement."""
+    if record.get("is_credit") and record.get("parsed") and record.get("status", "done") == "done":
+        apply_statement(email, record["message_id"], record["filename"], record.get("issuer"),
+                        record.get("total_amount_due"), record.get("minimum_amount_due"), record.get("due_date"))
+
+
+def get_summary(email: str) -> dict:
+    """The user's aggregates from a single document read; size grows with cards and months only."""
+    state = aggregates_collection.find_one({"email": email}, {"contrib": 0}) or {}
+    today = date.today().isoformat()
+    cards = {}
+    for card, months in state.get("months", {}).items():
+        series = []
+        for month in sorted(months):
+            bucket = months[month]
+            if bucket.get("statements", 0) <= 0:
+                continue
+            total = round(bucket.get("total_due", 0.0), 2)
+            minimum = round(bucket.get("minimum_due", 0.0), 2)
+            series.append({
+                "month": month,
+                "total_due": total,
+                "minimum_due": minimum,
+                "min_due_ratio": round(minimum / total, 4) if total else None,
+                "statements": bucket["statements"],
+            })
+        cards[card] = series
+    upcoming = [
+        {"card": card, **{k: v for k, v in latest.items() if k != "filename"},
+         "days_left": (date.fromisoformat(latest["due_date"]) - date.today()).days}
+        for card, latest in state.get("latest", {}).items()
+        if latest.get("due_date", "") >= today
+    ]
+    upcoming.sort(key=lambda d: d["due_date"])
+    return {"cards": cards, "upcoming": upcoming, "updated_at": state.get("updated_at")}
+
+
+def rebuild_aggregates(email: str) -> dict:
+    """Recompute a user's aggregates from their records (backfill for statements ingested before aggregates existed)."""
+    aggregates_collection.delete_one({"email": email})
+    applied = 0
+    for record in iter_records(email, is_credit=True, parsed=True):
+        apply_record(email, record)
+        applied += 1
+    return {"email": email, "statements": applied}
+
+
+if __name__ == "__main__":
+    for user_email in sys.argv[1:]:
+        print(rebuild_aggregates(user_email))
@@ -1,16 +1,10 @@
 import os
 from fastapi import APIRouter, Request, Body, HTTPException
 from fastapi.responses import RedirectResponse, JSONResponse
-from google_auth_oauthlib.flow import Flow
-from googleapiclient.discovery import build  
-from dotenv import load_dotenv
-from pymongo import MongoClient
 # from app.db import tokens_collection
-from app.gmail_fetcher import get_user_credentials
+from app.gmail_fetcher import get_user_credentials, gmail_service
 from app.db import tokens_collection, user_profiles_collection
-
-
-load_dotenv()
+from app.gmail_routes import start_background_sync
 
 router = APIRouter()
 
@@ -27,13 +21,18 @@ CLIENT_CONFIG = {
     }
 }
 
-@router.get("/auth/login")
-def login():
-    flow = Flow.from_client_config(
+def _oauth_flow():
+    # google_auth_oauthlib is only needed during sign-in, so it loads on first use
+    from google_auth_oauthlib.flow import Flow
+    return Flow.from_client_config(
         client_config=CLIENT_CONFIG,
         scopes=SCOPES,
         redirect_uri=os.getenv("GOOGLE_REDIRECT_URI")
     )
+
+@router.get("/auth/login")
+def login():
+    flow = _oauth_flow()
     auth_url, _ = flow.authorization_url(
         access_type='offline',
         prompt='consent',
@@ -45,16 +44,12 @@ def login():
 def auth_callback(request: Request):
     code = request.query_params.get("code")
 
-    flow = Flow.from_client_config(
-        client_config=CLIENT_CONFIG,
-        scopes=SCOPES,
-        redirect_uri=os.getenv("GOOGLE_REDIRECT_URI")
-    )
+    flow = _oauth_flow()
     flow.fetch_token(code=code)
     credentials = flow.credentials
 
     # Use Gmail API to get user's email
-    service = build("gmail", "v1", credentials=credentials)
+    service = gmail_service(credentials)
     profile = service.users().getProfile(userId="me").execute()
     user_email = profile.get("emailAddress")
 
@@ -86,12 +81,17 @@ def auth_callback(request: Request):
         upsert=True
     )
 
+    # Warm start: ingest statements while the frontend is still redirecting,
+    # reusing the credentials we already hold. Progress: /gmail/sync-status
+    start_background_sync(user_email, credentials)
+
     return JSONResponse(content={
         "email": user_email,
         "access_token": credentials.token,
         "refresh_token": credentials.refresh_token,
         "token_expiry": str(credentials.expiry),
-        "email_access_granted": True
+        "email_access_granted": True,
+        "sync_started": True
     })
 
 @router.get("/test-token")
@@ -0,0 +1,182 @@
+# app/batch_parse.py
+#
+# Parse a directory of statement PDFs to JSONL (run from backend/):
+#   python -m app.batch_parse statements/ -o results.jsonl --workers 4 --name "Jane Doe" --dob 1990-01-01
+# Re-running with the same output resumes where an interrupted run stopped.
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+from collections import defaultdict
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from pathlib import Path
+
+from app.passwords import candidate_passwords, decrypt_pdf, profile_passwords
+
+
+def parse_file(path: str, rel: str, passwords: list[str], password_sources: list[str], ocr: bool) -> dict:
+    """Decrypt and parse one statement, the same way ingestion does. Runs in a worker process."""
+    # the parsing stack loads once per worker process
+    from app.parsing import extract_text_from_pdf_bytes, parse_credit_card_fields, ocr_statement_fields
+    from app.issuers import detect_issuer
+
+    started = time.perf_counter()
+    row = {"path": rel, "status": "failed", "issuer": detect_issuer(filename=Path(rel).name)}
+    try:
+        file_bytes = Path(path).read_bytes()
+        row["size"] = len(file_bytes)
+        row["sha256"] = hashlib.sha256(file_bytes).hexdigest()
+        clear_bytes, password_index = decrypt_pdf(file_bytes, passwords)
+        if clear_bytes is None:
+            row["status"] = "password_required"
+            return row
+        if password_index is not None:
+            # record where the password came from, never the password itself
+            row["password_source"] = password_sources[password_index]
+
+        text = extract_text_from_pdf_bytes(clear_bytes)
+        if row["issuer"] == "generic" and text:
+            row["issuer"] = detect_issuer(filename=Path(rel).name, first_page_text=text)
+        if text.strip():
+            fields = parse_credit_card_fields(text, row["issuer"])
+            fields.pop("days_left", None)
+        elif ocr:
+            fields = ocr_statement_fields(clear_bytes, row["issuer"])
+            row["ocr"] = True
+        else:
+            fields = {}
+        row.update(
+            status="ok",
+            total_amount_due=fields.get("total_amount_due"),
+            minimum_amount_due=fields.get("minimum_amount_due"),
+            due_date=fields.get("due_date"),
+        )
+    except Exception as e:
+        row["error"] = f"{type(e).__name__}: {e}"
+    finally:
+        row["seconds"] = round(time.perf_counter() - started, 3)
+    return row
+
+
+def _completed_paths(output: Path) -> set[str]:
+    """Paths already in the output. A line cut off by an interruption is dropped first."""
+    if not output.exists():
+        return set()
+    data = output.read_bytes()
+    if data and not data.endswith(b"\n"):
+        data = data[:data.rfind(b"\n") + 1]
+        with open(output, "r+b") as f:
+            f.truncate(len(data))
+    done = set()
+    for line in data.splitlines():
+        try:
+            done.add(json.loads(line)["path"])
+        except (ValueError, KeyError):
+            continue
+    return done
+
+
+def _summarize(rows_by_issuer: dict, elapsed: float, total_bytes: int) -> dict:
+    files = sum(s["files"] for s in rows_by_issuer.values())
+    return {
+        "files": files,
+        "ok": sum(s["ok"] for s in rows_by_issuer.values()),
+        "failed": sum(s["failed"] for s in rows_by_issuer.values()),
+        "password_required": sum(s["password_required"] for s in rows_by_issuer.values()),
+        "seconds": round(elapsed, 2),
+        "files_per_second": round(files / elapsed, 2) if elapsed else None,
+        "mb_per_second": round(total_bytes / elapsed / 1e6, 2) if elapsed else None,
+        "by_issuer": {issuer: dict(stats) for issuer, stats in sorted(rows_by_issuer.items())},
+    }
+
+
+def run(directory: Path, output: Path, passwords: list[str], password_sources: list[str],
+        workers: int, ocr: bool = True, restart: bool = False) -> dict:
+    """
+    Parse every PDF under directory in a process pool, appending one JSON line per file
+    as results arrive. At most 2 x workers files are in flight, so memory stays bounded.
+    """
+    if restart and output.exists():
+        output.unlink()
+    done = _completed_paths(output)
+    pending = [p for p in sorted(directory.rglob("*")) if p.suffix.lower() == ".pdf" and p.is_file()
+               and str(p.relative_to(directory)) not in done]
+    print(f"📂 {len(pending)} PDFs to parse ({len(done)} already in {output})", file=sys.stderr)
+
+    rows_by_issuer = defaultdict(lambda: {"files": 0, "ok": 0, "failed": 0, "password_required": 0, "complete": 0})
+    total_bytes = 0
+    started = time.perf_counter()
+    todo = iter(pending)
+    in_flight = set()
+    with open(output, "a", encoding="utf-8") as out, ProcessPoolExecutor(max_workers=workers) as pool:
+        try:
+            while True:
+                while len(in_flight) < workers * 2:
+                    path = next(todo, None)
+                    if path is None:
+                        break
+                    in_flight.add(pool.submit(parse_file, str(path), str(path.relative_to(directory)),
+                                              passwords, password_sources, ocr))
+                if not in_flight:
+                    break
+                finished, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    row = future.result()
+                    out.write(json.dumps(row) + "\n")
+                    out.flush()
+                    stats = rows_by_issuer[row["issuer"]]
+                    stats["files"] += 1
+                    stats[row["status"]] += 1
+                    if row.get("total_amount_due") and row.get("minimum_amount_due") and row.get("due_date"):
+                        stats["complete"] += 1
+                    total_bytes += row.get("size", 0)
+        except KeyboardInterrupt:
+            print("⏹️  Interrupted; re-run the same command to resume", file=sys.stderr)
+            for future in in_flight:
+                future.cancel()
+            pool.shutdown(wait=False, cancel_futures=True)
+    return _summarize(rows_by_issuer, time.perf_counter() - started, total_bytes)
+
+
+def _load_profile(email: str) -> dict:
+    from app.db import user_profiles_collection
+    return user_profiles_collection.find_one({"email": email}) or {}
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m app.batch_parse", description="Parse a directory of statement PDFs to JSONL.")
+    parser.add_argument("directory", type=Path)
+    parser.add_argument("-o", "--output", type=Path, default=Path("batch_results.jsonl"))
+    parser.add_argument("-w", "--workers", type=int, default=os.cpu_count() or 2)
+    parser.add_argument("-p", "--password", action="append", default=[], help="password to try (repeatable)")
+    parser.add_argument("--profile-email", help="derive passwords from this user's stored profile")
+    parser.add_argument("--name")
+    parser.add_argument("--dob", help="date of birth, e.g. 1990-01-01")
+    parser.add_argument("--pan")
+    parser.add_argument("--card-last4")
+    parser.add_argument("--no-ocr", action="store_true", help="skip scanned statements instead of OCR-ing them")
+    parser.add_argument("--restart", action="store_true", help="discard existing output instead of resuming")
+    parser.add_argument("--summary", type=Path, help="also write the summary JSON here")
+    args = parser.parse_args(argv)
+
+    profile = _load_profile(args.profile_email) if args.profile_email else {}
+    for field in ("name", "dob", "pan", "card_last4"):
+        if getattr(args, field):
+            profile[field] = getattr(args, field)
+    passwords = candidate_passwords(args.password, profile)
+    derived = set(profile_passwords(profile))
+    sources = ["supplied" if p in args.password else "profile" if p in derived else "default" for p in passwords]
+
+    summary = run(args.directory, args.output, passwords, sources, max(1, args.workers),
+                  ocr=not args.no_ocr, restart=args.restart)
+    print(json.dumps(summary, indent=2))
+    if args.summary:
+        args.summary.write_text(json.dumps(summary, indent=2))
+    return 0 if summary["failed"] == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
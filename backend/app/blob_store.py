@@ -0,0 +1,126 @@
+# app/blob_store.py
+
+import hashlib
+import os
+import time
+from pathlib import Path
+
+from app.db import attachments_collection
+from app.fileio import write_atomic
+from app.records import upsert_record, get_record
+from app.sidecars import SIDECAR_ROOT, SIDECAR_KINDS, sidecar_path
+
+# Attachments are stored once per content hash, sharded as blobs/ab/cd/<sha256>.
+# Records in attachments_collection map (email, message_id, filename) -> sha256.
+BLOB_ROOT = Path(os.getenv("BLOB_ROOT", "downloads/blobs"))
+
+
+def blob_path(digest: str) -> Path:
+    return BLOB_ROOT / digest[:2] / digest[2:4] / digest
+
+
+def put_blob(data: bytes) -> str:
+    """
+    Store bytes under their sha256 and return the digest.
+    Existing blobs are never rewritten, only touched so garbage collection treats a
+    re-adopted orphan as new; new ones are written to a temp file and renamed into
+    place so readers never see a partial file.
+    """
+    digest = hashlib.sha256(data).hexdigest()
+    path = blob_path(digest)
+    try:
+        os.utime(path)
+        return digest
+    except FileNotFoundError:
+        pass
+    write_atomic(path, data, fsync=True)
+    return digest
+
+
+def read_blob(digest: str) -> bytes:
+    with open(blob_path(digest), "rb") as f:
+        return f.read()
+
+
+def add_reference(email: str, message_id: str, filename: str, digest: str, size: int, **fields) -> None:
+    """Point a user's attachment at a blob; extra fields (subject, sender, ...) are stored alongside."""
+    upsert_record(email, message_id, filename, sha256=digest, size=size, **fields)
+
+
+def get_reference(email: str, message_id: str, filename: str) -> dict | None:
+    return get_record(email, message_id, filename)
+
+
+def resolve_reference(email: str, message_id: str, filename: str) -> Path | None:
+    """Blob path for a user's attachment, or None if unknown or the blob is missing."""
+    ref = get_reference(email, message_id, filename)
+    if not ref or not ref.get("sha256"):
+        return None
+    path = blob_path(ref["sha256"])
+    return path if path.exists() else None
+
+
+def _still_orphaned(path: Path, cutoff: float) -> bool:
+    """Re-check a candidate right before deleting it: a sync may have re-adopted it since the snapshot."""
+    try:
+        if path.stat().st_mtime > cutoff:
+            return False
+    except FileNotFoundError:
+        return False
+    return attachments_collection.find_one({"sha256": path.name}, {"_id": 1}) is None
+
+
+def collect_garbage(grace_seconds: int = 3600) -> dict:
+    """
+    Delete blobs no reference points at, together with their text/OCR sidecars. Blobs
+    younger than grace_seconds are kept, since a sync may have written the blob but not
+    yet its reference. Temp files left by interrupted writes are swept from both trees.
+    """
+    referenced = set(attachments_collection.distinct("sha256"))
+    cutoff = time.time() - grace_seconds
+    removed = 0
+    freed = 0
+    kept = 0
+    for path in BLOB_ROOT.glob("*/*/*") if BLOB_ROOT.exists() else []:
+        if not path.is_file():
+            continue
+        stat = path.stat()
+        if stat.st_mtime > cutoff:
+            kept += 1
+            continue
+        # leftovers from interrupted writes, or blobs nobody references any more
+        if path.name.startswith("."):
+            path.unlink(missing_ok=True)
+            removed += 1
+            freed += stat.st_size
+        elif path.name not in referenced and _still_orphaned(path, cutoff):
+            removed += 1
+            freed += delete_blob(path.name)
+        else:
+            kept += 1
+    for path in SIDECAR_ROOT.glob("*/*/.*") if SIDECAR_ROOT.exists() else []:
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            continue
+        if stat.st_mtime <= cutoff:
+            path.unlink(missing_ok=True)
+            removed += 1
+            freed += stat.st_size
+    return {"removed": removed, "bytes_freed": freed, "kept": kept}
+
+
+def delete_blob(digest: str) -> int:
+    """Delete a blob and its sidecars, whether or not anything references it; returns the bytes freed."""
+    freed = 0
+    for path in [blob_path(digest)] + [sidecar_path(digest, kind) for kind in SIDECAR_KINDS]:
+        try:
+            freed += path.stat().st_size
+            path.unlink()
+        except FileNotFoundError:
+            pass
+    return freed
+
+
+if __name__ == "__main__":
+    print(collect_garbage())
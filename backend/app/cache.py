@@ -0,0 +1,308 @@
+# app/cache.py
+
+import hashlib
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable
+
+# CACHE_BACKEND: "tiered" (memory LRU in front of the shared SQLite file), "memory", "sqlite" or "none".
+# The SQLite file is shared by every uvicorn worker on the host, so a result computed by one
+# worker is a hit in the others and survives restarts.
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "tiered")
+CACHE_PATH = Path(os.getenv("CACHE_PATH", "downloads/cache.sqlite3"))
+CACHE_MAX_BYTES = int(os.getenv("CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+CACHE_MEMORY_ITEMS = int(os.getenv("CACHE_MEMORY_ITEMS", "1024"))
+# Memory entries are re-read from the shared tier after this long, so a delete in one worker
+# reaches the others' memory tiers within it
+CACHE_MEMORY_TTL_SECONDS = float(os.getenv("CACHE_MEMORY_TTL_SECONDS", "30"))
+
+_MISSING = object()
+
+
+class CacheBackend:
+    """Interface for cache tiers. Values are any picklable object; ttl is in seconds (None = no expiry)."""
+
+    def get(self, key: str, default: Any = None) -> Any:
+        raise NotImplementedError
+
+    def get_with_expiry(self, key: str, default: Any = None) -> tuple[Any, float | None]:
+        """(value, epoch seconds it expires at or None); backends that do not track expiry report None."""
+        return self.get(key, default), None
+
+    def set(self, key: str, value: Any, ttl: float | None = None) -> None:
+        raise NotImplementedError
+
+    def delete(self, key: str) -> None:
+        raise NotImplementedError
+
+    def clear(self) -> None:
+        raise NotImplementedError
+
+    def stats(self) -> dict:
+        return {}
+
+
+class NullCache(CacheBackend):
+    def get(self, key, default=None):
+        return default
+
+    def set(self, key, value, ttl=None):
+        pass
+
+    def delete(self, key):
+        pass
+
+    def clear(self):
+        pass
+
+
+class MemoryLRU(CacheBackend):
+    """Thread-safe in-process LRU with per-entry expiry."""
+
+    def __init__(self, max_items: int = CACHE_MEMORY_ITEMS):
+        self.max_items = max_items
+        self._items: OrderedDict[str, tuple[float | None, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._items.get(key)
+            if entry is None or (entry[0] is not None and entry[0] <= time.time()):
+                if entry is not None:
+                    del self._items[key]
+                self.misses += 1
+                return default
+            self._items.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value, ttl=None):
+        expires_at = time.time() + ttl if ttl is not None else None
+        with self._lock:
+            self._items[key] = (expires_at, value)
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_items:
+                self._items.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._items.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+    def stats(self):
+        with self._lock:
+            return {"items": len(self._items), "hits": self.hits, "misses": self.misses}
+
+
+class SQLiteCache(CacheBackend):
+    """
+    Cache in a local SQLite file shared by all worker processes. WAL mode lets readers
+    proceed while one writer holds the lock; busy_timeout makes writers wait their turn
+    instead of failing. Least recently read entries are evicted past max_bytes.
+    """
+
+    _SCHEMA = """
+        CREATE TABLE IF NOT EXISTS cache (
+            key TEXT PRIMARY KEY,
+            value BLOB NOT NULL,
+            size INTEGER NOT NULL,
+            expires_at REAL,
+            accessed_at REAL NOT NULL
+        )
+    """
+    # Reads refresh accessed_at at most this often, to keep cache hits read-only
+    _TOUCH_INTERVAL = 60.0
+    _EVICT_EVERY = 64
+
+    def __init__(self, path: Path = CACHE_PATH, max_bytes: int = CACHE_MAX_BYTES):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+        self._sets = 0
+        self.hits = 0
+        self.misses = 0
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(self._SCHEMA)
+            conn.execute("CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed_at)")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key, default=None):
+        return self.get_with_expiry(key, default)[0]
+
+    def get_with_expiry(self, key, default=None):
+        now = time.time()
+        try:
+            row = self._conn().execute(
+                "SELECT value, expires_at, accessed_at FROM cache WHERE key = ?", (key,)
+            ).fetchone()
+        except sqlite3.Error:
+            return default, None
+        if row is None or (row[1] is not None and row[1] <= now):
+            self.misses += 1
+            return default, None
+        if now - row[2] > self._TOUCH_INTERVAL:
+            try:
+                self._conn().execute("UPDATE cache SET accessed_at = ? WHERE key = ?", (now, key))
+            except sqlite3.Error:
+                pass
+        self.hits += 1
+        return pickle.loads(row[0]), row[1]
+
+    def set(self, key, value, ttl=None):
+        data = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        now = time.time()
+        try:
+            self._conn().execute(
+                "INSERT OR REPLACE INTO cache (key, value, size, expires_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                (key, data, len(data), now + ttl if ttl is not None else None, now),
+            )
+        except sqlite3.Error as e:
+            print(f"❌ Cache write failed for {key}: {e}")
+            return
+        self._sets += 1
+        if self._sets % self._EVICT_EVERY == 0:
+            self.evict()
+
+    def evict(self) -> None:
+        """Drop expired entries, then least recently read ones until under max_bytes."""
+        conn = self._conn()
+        try:
+            conn.execute("DELETE FROM cache WHERE expires_at IS NOT NULL AND expires_at <= ?", (time.time(),))
+            total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM cache").fetchone()[0]
+            if total <= self.max_bytes:
+                return
+            excess = total - int(self.max_bytes * 0.9)
+            freed = 0
+            victims = []
+            for key, size in conn.execute("SELECT key, size FROM cache ORDER BY accessed_at"):
+                if freed >= excess:
+                    break
+                victims.append((key,))
+                freed += size
+            conn.executemany("DELETE FROM cache WHERE key = ?", victims)
+        except sqlite3.Error as e:
+            print(f"❌ Cache eviction failed: {e}")
+
+    def delete(self, key):
+        try:
+            self._conn().execute("DELETE FROM cache WHERE key = ?", (key,))
+        except sqlite3.Error:
+            pass
+
+    def clear(self):
+        self._conn().execute("DELETE FROM cache")
+
+    def stats(self):
+        try:
+            items, size = self._conn().execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM cache").fetchone()
+        except sqlite3.Error:
+            items = size = None
+        return {"items": items, "bytes": size, "hits": self.hits, "misses": self.misses}
+
+
+class TieredCache(CacheBackend):
+    """
+    Memory LRU in front of a shared tier. Memory entries live at most memory_ttl seconds, and
+    never past the shared entry they were copied from.
+    """
+
+    def __init__(self, memory: CacheBackend, shared: CacheBackend, memory_ttl: float = CACHE_MEMORY_TTL_SECONDS):
+        self.memory = memory
+        self.shared = shared
+        self.memory_ttl = memory_ttl
+
+    def _memory_ttl(self, ttl: float | None) -> float:
+        return min(ttl, self.memory_ttl) if ttl is not None else self.memory_ttl
+
+    def get(self, key, default=None):
+        value = self.memory.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+        value, expires_at = self.shared.get_with_expiry(key, _MISSING)
+        if value is _MISSING:
+            return default
+        self.memory.set(key, value, self._memory_ttl(expires_at - time.time() if expires_at is not None else None))
+        return value
+
+    def set(self, key, value, ttl=None):
+        self.shared.set(key, value, ttl)
+        self.memory.set(key, value, self._memory_ttl(ttl))
+
+    def delete(self, key):
+        self.shared.delete(key)
+        self.memory.delete(key)
+
+    def clear(self):
+        self.shared.clear()
+        self.memory.clear()
+
+    def stats(self):
+        return {"memory": self.memory.stats(), "shared": self.shared.stats()}
+
+
+class Namespace:
+    """A prefixed view of a backend with a default ttl, e.g. cache_namespace("pdf-text")."""
+
+    def __init__(self, backend: CacheBackend, name: str, ttl: float | None = None):
+        self.backend = backend
+        self.name = name
+        self.ttl = ttl
+
+    def _key(self, key: str) -> str:
+        return f"{self.name}:{key}"
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return self.backend.get(self._key(key), default)
+
+    def set(self, key: str, value: Any, ttl: float | None = _MISSING) -> None:
+        self.backend.set(self._key(key), value, self.ttl if ttl is _MISSING else ttl)
+
+    def delete(self, key: str) -> None:
+        self.backend.delete(self._key(key))
+
+    def get_or_compute(self, key: str, compute: Callable[[], Any], ttl: float | None = _MISSING) -> Any:
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = compute()
+            self.set(key, value, ttl)
+        return value
+
+
+def _build_backend(kind: str) -> CacheBackend:
+    if kind == "memory":
+        return MemoryLRU()
+    if kind == "sqlite":
+        return SQLiteCache()
+    if kind == "tiered":
+        return TieredCache(MemoryLRU(), SQLiteCache())
+    return NullCache()
+
+
+cache_backend = _build_backend(CACHE_BACKEND)
+
+
+def cache_namespace(name: str, ttl: float | None = None) -> Namespace:
+    return Namespace(cache_backend, name, ttl)
+
+
+def content_key(data: bytes, *parts) -> str:
+    """Key for a value derived from bytes: their sha256 plus whatever else the result depends on."""
+    return ":".join([hashlib.sha256(data).hexdigest(), *map(str, parts)])
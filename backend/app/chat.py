@@ -0,0 +1,201 @@
+# app/chat.py
+#
+# Statement-aware assistant: POST /chat streams the model's reply as server-sent events.
+# The model is any OpenAI-compatible /chat/completions server (CHAT_API_BASE); for local
+# testing run the stub with `python -m app.llm_stub --port 8087`.
+
+import hashlib
+import json
+import os
+import threading
+from datetime import date
+
+from fastapi import APIRouter, Body, HTTPException
+from fastapi.responses import StreamingResponse
+
+from app.cache import cache_namespace
+from app.records import iter_records
+
+CHAT_API_BASE = os.getenv("CHAT_API_BASE", "http://0.0.0.0:8087/v1").rstrip("/")
+CHAT_API_KEY = os.getenv("CHAT_API_KEY", "")
+CHAT_MODEL = os.getenv("CHAT_MODEL", "meta-llama/Llama-3.3-70B-Instruct")
+CHAT_POOL_SIZE = int(os.getenv("CHAT_POOL_SIZE", "8"))
+# (connect, read) timeouts; the read timeout applies between streamed chunks
+CHAT_TIMEOUT_SECONDS = (float(os.getenv("CHAT_CONNECT_TIMEOUT_SECONDS", "5")), float(os.getenv("CHAT_READ_TIMEOUT_SECONDS", "60")))
+CHAT_MAX_MESSAGES = int(os.getenv("CHAT_MAX_MESSAGES", "12"))
+CHAT_MAX_MESSAGE_CHARS = int(os.getenv("CHAT_MAX_MESSAGE_CHARS", "4000"))
+CHAT_CONTEXT_STATEMENTS = int(os.getenv("CHAT_CONTEXT_STATEMENTS", "12"))
+CHAT_CONTEXT_SECONDS = float(os.getenv("CHAT_CONTEXT_SECONDS", "600"))
+CHAT_REPLY_CACHE_SECONDS = float(os.getenv("CHAT_REPLY_CACHE_SECONDS", "3600"))
+
+SYSTEM_PROMPT = (
+    "You are NoneyView.AI, an assistant for the user's credit card statements. "
+    "Answer from the statement data below; if it does not cover the question, say so. "
+    "Amounts are in INR. Be brief."
+)
+
+router = APIRouter()
+
+_context_cache = cache_namespace("chat-context", ttl=CHAT_CONTEXT_SECONDS)
+_reply_cache = cache_namespace("chat-reply", ttl=CHAT_REPLY_CACHE_SECONDS)
+
+_session = None
+_session_lock = threading.Lock()
+
+
+class ChatUpstreamError(Exception):
+    pass
+
+
+def _get_session():
+    """One pooled HTTP session for every chat request, so model calls reuse keep-alive connections."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            # imported here so requests loads with the first chat, not at app startup
+            import requests
+            from requests.adapters import HTTPAdapter
+
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=CHAT_POOL_SIZE)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            if CHAT_API_KEY:
+                session.headers["Authorization"] = f"Bearer {CHAT_API_KEY}"
+            _session = session
+        return _session
+
+
+# ---------------- Statement context ----------------
+
+def _context_line(record: dict) -> str:
+    parts = [record.get("issuer") or "card"]
+    for label, field in (("total", "total_amount_due"), ("minimum", "minimum_amount_due")):
+        if record.get(field) is not None:
+            parts.append(f"{label} {record[field]:.2f}")
+    due = record.get("due_date")
+    if due:
+        days = (date.fromisoformat(due) - date.today()).days
+        parts.append(f"due {due} ({f'in {days} days' if days >= 0 else f'overdue by {-days} days'})")
+    if record.get("transaction_count"):
+        parts.append(f"{record['transaction_count']} transactions")
+    return "- " + " | ".join(parts)
+
+
+def build_context(email: str) -> str:
+    """A compact text block of the user's newest parsed statements, one line each."""
+    records = iter_records(email, is_credit=True, parsed=True).limit(CHAT_CONTEXT_STATEMENTS)
+    lines = [_context_line(record) for record in records]
+    if not lines:
+        return f"Today is {date.today().isoformat()}. No parsed statements are on file for this user."
+    return "\n".join([f"Today is {date.today().isoformat()}. Statements on file, newest first:", *lines])
+
+
+def statement_context(email: str) -> str:
+    """build_context through the shared cache; forget_context drops it when a record changes."""
+    return _context_cache.get_or_compute(email, lambda: build_context(email))
+
+
+def forget_context(email: str) -> None:
+    _context_cache.delete(email)
+
+
+# ---------------- Model calls ----------------
+
+def _clean_messages(messages) -> list[dict]:
+    """Keep the latest user/assistant turns; system prompts come only from the server."""
+    if not isinstance(messages, list):
+        raise HTTPException(status_code=400, detail="messages must be a list")
+    cleaned = [
+        {"role": m["role"], "content": m["content"][:CHAT_MAX_MESSAGE_CHARS]}
+        for m in messages
+        if isinstance(m, dict) and m.get("role") in ("user", "assistant") and isinstance(m.get("content"), str)
+    ][-CHAT_MAX_MESSAGES:]
+    if not cleaned or cleaned[-1]["role"] != "user":
+        raise HTTPException(status_code=400, detail="The last message must be from the user")
+    return cleaned
+
+
+def _prompt_key(payload: dict) -> str:
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+
+def _upstream_deltas(payload: dict):
+    """Yield content deltas from the model, streamed or (if the server ignores stream) whole."""
+    import requests
+
+    try:
+        with _get_session().post(f"{CHAT_API_BASE}/chat/completions", json={**payload, "stream": True},
+                                 stream=True, timeout=CHAT_TIMEOUT_SECONDS) as resp:
+            if resp.status_code != 200:
+                raise ChatUpstreamError(f"model server returned {resp.status_code}")
+            if not resp.headers.get("content-type", "").startswith("text/event-stream"):
+                message = resp.json().get("choices", [{}])[0].get("message", {})
+                if message.get("content"):
+                    yield message["content"]
+                return
+            for line in resp.iter_lines(decode_unicode=True):
+                if not line or not line.startswith("data:"):
+                    continue
+                data = line[5:].strip()
+                if data == "[DONE]":
+                    return
+                choice = json.loads(data).get("choices", [{}])[0]
+                delta = choice.get("delta", {}).get("content")
+                if delta:
+                    yield delta
+    except requests.RequestException as e:
+        raise ChatUpstreamError(f"model server unreachable: {e}") from e
+
+
+def _sse(data) -> str:
+    return f"data: {json.dumps(data)}\n\n"
+
+
+def stream_chat(email: str, messages: list[dict]):
+    """
+    SSE events for one chat turn: {"delta": ...} per chunk, {"error": ...} on failure, then [DONE].
+    A completed reply is cached under a hash of the full prompt (context included), so an
+    identical question against unchanged statements is answered without calling the model.
+    """
+    payload = {
+        "model": CHAT_MODEL,
+        "messages": [{"role": "system", "content": f"{SYSTEM_PROMPT}\n\n{statement_context(email)}"}, *messages],
+    }
+    key = _prompt_key(payload)
+    cached = _reply_cache.get(key)
+    if cached is not None:
+        yield _sse({"delta": cached, "cached": True})
+        yield "data: [DONE]\n\n"
+        return
+
+    parts = []
+    try:
+        for delta in _upstream_deltas(payload):
+            parts.append(delta)
+            yield _sse({"delta": delta})
+    except (ChatUpstreamError, ValueError) as e:
+        print(f"❌ Chat failed for {email}: {e}")
+        yield _sse({"error": str(e)})
+        yield "data: [DONE]\n\n"
+        return
+    if parts:
+        _reply_cache.set(key, "".join(parts))
+    yield "data: [DONE]\n\n"
+
+
+@router.post("/chat")
+async def chat(payload: dict = Body(...)):
+    """
+    Streams an assistant reply grounded in the user's parsed statements, as text/event-stream.
+    Expected JSON body: { user_email, messages: [{role: "user"|"assistant", content}] }
+    """
+    user_email = payload.get("user_email")
+    if not user_email:
+        raise HTTPException(status_code=400, detail="Missing user_email")
+    messages = _clean_messages(payload.get("messages"))
+    return StreamingResponse(
+        stream_chat(user_email, messages),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -1,11 +1,18 @@
+import os
 import re
 import math
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
 from datetime import datetime
-from pdf2image import convert_from_bytes
+from pdf2image import convert_from_path
 import pytesseract
 from pytesseract import Output
-from PyPDF2 import PdfReader, PdfWriter
+from PyPDF2 import PdfReader
 import io
+from app.issuers import LABELS  # bank-specific label dictionaries
+from app.passwords import DEFAULT_PASSWORDS, decrypt_pdf
 
 
 def _merge_numbers(words):
@@ -60,62 +67,35 @@ def _decrypt_pdf_bytes(file_bytes: bytes, password: str | None = None) -> bytes
     Try to decrypt PDF using provided password or common defaults.
     Returns decrypted PDF bytes, or None if unsuccessful.
     """
-    def write_pdf_bytes(reader: PdfReader) -> bytes:
-        writer = PdfWriter()
-        for page in reader.pages:
-            writer.add_page(page)
-        out_stream = io.BytesIO()
-        writer.write(out_stream)
-        return out_stream.getvalue()
-
     try:
-        reader = PdfReader(io.BytesIO(file_bytes))
-        if reader.is_encrypted:
-            # If password not provided, try common defaults
-            candidate_passwords = [password] if password else ["MRIT2607", "mrit2607"]
-            for candidate in candidate_passwords:
-                if not candidate:
-                    continue
-                temp_reader = PdfReader(io.BytesIO(file_bytes))
-                if temp_reader.decrypt(candidate):
-                    return write_pdf_bytes(temp_reader)
-            # None worked
-            return None
-        # Not encrypted
-        return file_bytes
+        clear_bytes, _ = decrypt_pdf(file_bytes, [password] if password else DEFAULT_PASSWORDS)
+        return clear_bytes
     except Exception:
         return None
 
 
+@contextmanager
+def _pdf_on_disk(pdf_bytes: bytes):
+    """
+    Path of a temp copy of the PDF for the document's page renders. pdf2image's
+    convert_from_bytes writes its own temp file on every call; one copy serves every page.
+    """
+    fd, path = tempfile.mkstemp(suffix=".pdf")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(pdf_bytes)
+        yield path
+    finally:
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
+
+
 # Improved regex patterns
 _AMOUNT_RE = re.compile(r"(?:[₹Rs\.]?\s*)?([0-9]{1,3}(?:,[0-9]{3})*(?:\.[0-9]{1,2})?|[0-9]+\.[0-9]{1,2}|[0-9]+)")
 _DATE_RE = re.compile(r"\b(?:\d{1,2}[/-]\d{1,2}[/-]\d{2,4}|[A-Za-z]{3,9}\s*\d{1,2},?\s*\d{2,4})\b")
 
-# Enhanced bank-specific label dictionaries
-LABELS = {
-    "hdfc": {
-        "total": ["total amount due", "total due", "amount payable", "total payment due"],
-        "minimum": ["minimum amount due", "min due", "minimum payment due"],
-        "duedate": ["due date", "payment due date"],
-    },
-    "icici": {
-        "total": ["total amount due", "total amount", "total payment due"],
-        "minimum": ["minimum amount due", "minimum payment", "minimum payment due"],
-        "duedate": ["payment due date", "due date"],
-    },
-    "axis": {
-        "total": ["total payment due", "amount payable", "total amount due"],
-        "minimum": ["minimum payment due", "minimum due", "minimum amount due"],
-        "duedate": ["payment due date", "due date"],
-    },
-    "generic": {
-        "total": ["total amount due", "total due", "amount due", "total payment due", "amount payable"],
-        "minimum": ["minimum amount due", "minimum due", "minimum payment due"],
-        "duedate": ["due date", "payment due", "payment due date"],
-    },
-}
-
-
 # ---------------- OCR utils ----------------
 def _image_to_words(pil_img):
     data = pytesseract.image_to_data(pil_img, output_type=Output.DICT)
@@ -439,87 +419,156 @@ def _parse_date_string(date_str):
     return None
 
 
-def extract_creditcard_data(file_bytes: bytes, bank_hint: str = "generic", password: str | None = None) -> dict:
-    """Main entrypoint: Extracts total, minimum, due date from credit card PDF."""
+# ---------------- Intra-document page scheduler ----------------
+# Only the first few pages are scanned; payment summaries never sit deeper.
+PAGE_SCAN_LIMIT = int(os.getenv("PAGE_SCAN_LIMIT", "3"))
+PAGE_SCAN_WORKERS = int(os.getenv("PAGE_SCAN_WORKERS", "3"))
+
+# Table hits outrank label-proximity hits; within a tier earlier pages win.
+_TABLE_CONFIDENCE = 2.0
+_LABEL_CONFIDENCE = 1.0
+_PAGE_PENALTY = 0.01
+
+
+def _page_candidates(words, page_num: int, bank_labels: dict) -> dict:
+    """Run table and label extractors over one page. Returns {field: (confidence, value)}."""
+    candidates = {}
+    penalty = page_num * _PAGE_PENALTY
+
+    table_results = _extract_from_payment_table(words)
+    for key, value in table_results.items():
+        if value is None:
+            continue
+        if key == "due_date":
+            value = _parse_date_string(value)
+            if not value:
+                continue
+        candidates[key] = (_TABLE_CONFIDENCE - penalty, value)
+
+    for key, value_type in [("total_amount_due", "total"), ("minimum_amount_due", "minimum"), ("due_date", "duedate")]:
+        if key in candidates:
+            continue
+        value = _find_nearest_value(words, bank_labels[value_type], value_type)
+        if value and value_type == "duedate":
+            value = _parse_date_string(value)
+        if value:
+            candidates[key] = (_LABEL_CONFIDENCE - penalty, value)
+
+    return candidates
+
+
+def _merge_candidates(best: dict, candidates: dict) -> None:
+    """Keep the most confident candidate seen so far for every field."""
+    for key, (confidence, value) in candidates.items():
+        if key not in best or confidence > best[key][0]:
+            best[key] = (confidence, value)
+
+
+def _candidates_settled(best: dict, pending_pages: set[int]) -> bool:
+    """
+    True once no page still pending could outrank any field's best candidate, i.e. every
+    field holds a table hit from a page before all pending ones. Stopping earlier would let
+    page completion order decide the answer.
+    """
+    if not pending_pages:
+        return True
+    ceiling = _TABLE_CONFIDENCE - min(pending_pages) * _PAGE_PENALTY
+    return all(confidence > ceiling for confidence, _ in best.values())
+
+
+def _fields_validated(results: dict) -> bool:
+    """True once total, minimum and due date are present and consistent."""
+    total = results.get("total_amount_due")
+    minimum = results.get("minimum_amount_due")
+    return bool(total and minimum and results.get("due_date")) and minimum <= total
+
+
+def _scan_page(pdf_path: str, page_num: int, bank_labels: dict, stop_event: threading.Event,
+               words_out: dict | None = None) -> dict:
+    """Render and OCR a single page, bailing out early if the document is already solved."""
+    if stop_event.is_set():
+        return {}
+    print(f"\n📄 Processing page {page_num + 1}...")
+    images = convert_from_path(pdf_path, dpi=300, first_page=page_num + 1, last_page=page_num + 1)
+    if not images or stop_event.is_set():
+        return {}
+    words = _image_to_words(images[0])
+    print(f"📝 Extracted {len(words)} words from page {page_num + 1}")
+    if words_out is not None:
+        words_out[page_num] = words
+    return _page_candidates(words, page_num, bank_labels)
+
+
+def extract_creditcard_data(file_bytes: bytes, bank_hint: str = "generic", password: str | None = None,
+                            max_pages: int = PAGE_SCAN_LIMIT, words_out: dict | None = None) -> dict:
+    """Main entrypoint: Extracts total, minimum, due date from credit card PDF.
+
+    The first ``max_pages`` pages are rendered and OCR'd concurrently. Field candidates
+    are merged by confidence as each page finishes, and outstanding pages are cancelled
+    once all three fields validate and none of those pages could outrank them, so the
+    result never depends on which page finished first. With ``words_out``, the OCR words of every
+    scanned page are left there as {page_num: words}, for extract_from_words later.
+    """
     decrypted_bytes = _decrypt_pdf_bytes(file_bytes, password)
     if not decrypted_bytes:
         raise ValueError("PDF is encrypted. Please provide correct password.")
-    
+
     results = {"total_amount_due": None, "minimum_amount_due": None, "due_date": None}
-    
+
     try:
-        pages = convert_from_bytes(decrypted_bytes, dpi=300)
+        page_count = len(PdfReader(io.BytesIO(decrypted_bytes)).pages)
     except Exception as e:
-        print(f"❌ Error converting PDF to images: {e}")
+        print(f"❌ Error reading PDF pages: {e}")
         return results
 
-    # Focus on first page where payment summary is typically located
-    for page_num, page in enumerate(pages[:1]):  # Process first page only
-        print(f"\n📄 Processing page {page_num + 1}...")
-        
+    pages_to_scan = min(page_count, max_pages)
+    if pages_to_scan < 1:
+        return results
+
+    bank_labels = LABELS.get(bank_hint.lower(), LABELS["generic"])
+    best = {}
+    stop_event = threading.Event()
+    # one copy on disk for every page; a render still running when it is removed keeps its open handle
+    with _pdf_on_disk(decrypted_bytes) as pdf_path:
+        executor = ThreadPoolExecutor(max_workers=min(PAGE_SCAN_WORKERS, pages_to_scan))
         try:
-            words = _image_to_words(page)
-            print(f"📝 Extracted {len(words)} words from page {page_num + 1}")
-            
-        except Exception as e:
-            print(f"❌ Error extracting text from page {page_num + 1}: {e}")
-            continue
+            futures = {
+                executor.submit(_scan_page, pdf_path, page_num, bank_labels, stop_event, words_out): page_num
+                for page_num in range(pages_to_scan)
+            }
+            pending_pages = set(futures.values())
+            for future in as_completed(futures):
+                page_num = futures[future]
+                pending_pages.discard(page_num)
+                try:
+                    candidates = future.result()
+                except Exception as e:
+                    print(f"❌ Error extracting text from page {page_num + 1}: {e}")
+                    continue
 
-        # Primary approach: Extract from payment table structure
-        print(f"\n🔍 === Trying improved table-based extraction ===")
-        table_results = _extract_from_payment_table(words)
-        
-        # Use table results if found
-        for key, value in table_results.items():
-            if value is not None:
-                if key == "due_date":
-                    parsed_date = _parse_date_string(value)
-                    if parsed_date:
-                        results["due_date"] = parsed_date
-                        print(f"✅ Table extraction - Due date: {value} -> {parsed_date}")
-                else:
+                _merge_candidates(best, candidates)
+                for key, (_, value) in best.items():
                     results[key] = value
-                    print(f"✅ Table extraction - {key}: {value}")
-
-        # If we found the critical values, we're done
-        if results["total_amount_due"] and results["minimum_amount_due"]:
-            print("🎉 Successfully found all required payment amounts!")
-            break
 
-    # Fallback: only if we're missing critical values and have more pages
-    missing_values = [k for k, v in results.items() if v is None]
-    if missing_values and len(pages) > 1:
-        print(f"\n🔄 === Fallback extraction for missing values: {missing_values} ===")
-        
-        try:
-            page = pages[1]
-            words = _image_to_words(page)
-            print(f"📝 Extracted {len(words)} words from page 2")
-            
-            bank_labels = LABELS.get(bank_hint.lower(), LABELS["generic"])
-            
-            if not results["total_amount_due"]:
-                total = _find_nearest_value(words, bank_labels["total"], "total")
-                if total:
-                    results["total_amount_due"] = total
-                    print(f"✅ Fallback - Total: {total}")
-                    
-            if not results["minimum_amount_due"]:
-                minimum = _find_nearest_value(words, bank_labels["minimum"], "minimum")
-                if minimum:
-                    results["minimum_amount_due"] = minimum
-                    print(f"✅ Fallback - Minimum: {minimum}")
-                    
-            if not results["due_date"]:
-                due_date = _find_nearest_value(words, bank_labels["duedate"], "duedate")
-                if due_date:
-                    parsed_date = _parse_date_string(due_date)
-                    if parsed_date:
-                        results["due_date"] = parsed_date
-                        print(f"✅ Fallback - Due date: {due_date} -> {parsed_date}")
-                        
-        except Exception as e:
-            print(f"❌ Error during fallback extraction: {e}")
+                if _fields_validated(results) and _candidates_settled(best, pending_pages):
+                    print(f"🎉 All fields validated after page {page_num + 1}, cancelling remaining pages")
+                    break
+        finally:
+            # Pages not yet started are dropped; running ones see the event and stop early
+            stop_event.set()
+            executor.shutdown(wait=False, cancel_futures=True)
 
     print(f"\n🎯 Final results: {results}")
     return results
+
+
+def extract_from_words(pages: dict[int, list[dict]], bank_hint: str = "generic") -> dict:
+    """Re-run field extraction over OCR words saved by an earlier scan, without rendering or OCR."""
+    bank_labels = LABELS.get(bank_hint.lower(), LABELS["generic"])
+    best = {}
+    for page_num in sorted(pages):
+        _merge_candidates(best, _page_candidates(pages[page_num], page_num, bank_labels))
+    results = {"total_amount_due": None, "minimum_amount_due": None, "due_date": None}
+    for key, (_, value) in best.items():
+        results[key] = value
+    return results
@@ -1,13 +1,61 @@
 import os
+import threading
 from pymongo import MongoClient
-from dotenv import load_dotenv
 
-load_dotenv()
+DB_NAME = "jrb_gmail_pdf_app"
 
-mongo_uri = os.getenv("MONGO_URI")
-client = MongoClient(mongo_uri)
-db = client["jrb_gmail_pdf_app"]  
-tokens_collection = db["tokens"]
-user_profiles_collection = db["user_profiles"]
+_client: MongoClient | None = None
+_client_lock = threading.Lock()
 
 
+def get_client() -> MongoClient:
+    """The process-wide MongoClient, created on first use (normally by the app lifespan)."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = MongoClient(os.getenv("MONGO_URI"))
+    return _client
+
+
+def get_db():
+    return get_client()[DB_NAME]
+
+
+def close_client() -> None:
+    global _client
+    with _client_lock:
+        if _client is not None:
+            _client.close()
+            _client = None
+
+
+def client_ready() -> bool:
+    return _client is not None
+
+
+class _LazyCollection:
+    """Collection handle that binds to the shared client on first use, so importing never connects."""
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __getattr__(self, attr):
+        return getattr(get_db()[self.name], attr)
+
+    def __repr__(self) -> str:
+        return f"<lazy collection {DB_NAME}.{self.name}>"
+
+
+tokens_collection = _LazyCollection("tokens")
+user_profiles_collection = _LazyCollection("user_profiles")
+# per-user references into the content-addressed blob store
+attachments_collection = _LazyCollection("attachments")
+# per-user sync bookkeeping (synced message ids, scheduler leases)
+sync_state_collection = _LazyCollection("sync_state")
+# per-statement transaction rows extracted from every page
+transactions_collection = _LazyCollection("transactions")
+# per-user monthly statement aggregates, maintained at ingest
+aggregates_collection = _LazyCollection("aggregates")
+# one lease document per background job (e.g. the re-parse), so only one worker process runs it
+jobs_collection = _LazyCollection("jobs")
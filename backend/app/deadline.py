@@ -0,0 +1,52 @@
+# app/deadline.py
+
+import math
+import os
+import time
+
+# Default time budget for one /gmail/list-pdfs response
+LIST_PDFS_BUDGET_SECONDS = float(os.getenv("LIST_PDFS_BUDGET_SECONDS", "20"))
+
+# Minimum budget a stage needs before it is worth starting
+STAGE_SECONDS = {
+    "gmail": float(os.getenv("DEADLINE_GMAIL_SECONDS", "1")),
+    "decrypt": float(os.getenv("DEADLINE_DECRYPT_SECONDS", "0.5")),
+    "ocr": float(os.getenv("DEADLINE_OCR_SECONDS", "5")),
+}
+
+
+class DeadlineExceeded(Exception):
+    """
+    Raised when a stage cannot start (or finish) within the budget.
+    continuing=True means the work is still running and will store its own result.
+    """
+
+    def __init__(self, stage: str, continuing: bool = False):
+        super().__init__(f"budget exhausted before {stage}")
+        self.stage = stage
+        self.continuing = continuing
+
+
+class Deadline:
+    """A point in time that request work must finish by; None means unbounded."""
+
+    def __init__(self, seconds: float | None):
+        self.expires_at = time.monotonic() + seconds if seconds is not None else None
+
+    def remaining(self) -> float:
+        if self.expires_at is None:
+            return math.inf
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def timeout(self) -> float | None:
+        """Remaining budget in the form Future.result(timeout=...) expects."""
+        return None if self.expires_at is None else self.remaining()
+
+    def check(self, stage: str) -> None:
+        """Raise DeadlineExceeded unless enough budget is left to start stage."""
+        if self.remaining() < STAGE_SECONDS.get(stage, 0):
+            raise DeadlineExceeded(stage)
+
+
+# Shared instance for background work with no budget
+UNBOUNDED = Deadline(None)
@@ -0,0 +1,87 @@
+# app/export.py
+
+import io
+import json
+import tempfile
+import zipfile
+from pathlib import Path
+from typing import Callable, Iterable, Iterator
+
+from app.blob_store import blob_path
+
+EXPORT_CHUNK_BYTES = 64 * 1024
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only, unseekable sink; zipfile then streams with data descriptors."""
+
+    def __init__(self):
+        self._chunks: list[bytes] = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, b) -> int:
+        self._chunks.append(bytes(b))
+        return len(b)
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _archive_name(record: dict) -> str:
+    return f"{record['message_id']}_{record['filename']}"
+
+
+def _export_line(record: dict, entry: dict, **extra) -> bytes:
+    line = {**entry, "sha256": record.get("sha256"), **extra}
+    line.pop("saved_path", None)
+    return (json.dumps(line, default=str) + "\n").encode()
+
+
+def iter_jsonl(records: Iterable[dict], to_entry: Callable[[dict], dict]) -> Iterator[bytes]:
+    """One JSON line of parsed fields per record."""
+    for record in records:
+        yield _export_line(record, to_entry(record))
+
+
+def iter_zip(records: Iterable[dict], to_entry: Callable[[dict], dict],
+             decrypt: Callable[[Path], bytes | None] | None = None) -> Iterator[bytes]:
+    """
+    Stream a ZIP of the records' PDFs followed by statements.jsonl with their parsed fields.
+    Blobs are copied in chunks and the JSONL is spooled to disk past 1 MB, so memory stays
+    flat however many statements are exported. With decrypt (called with the blob's path),
+    PDFs it returns clear bytes for are exported decrypted; the rest go in as stored.
+    """
+    sink = _ChunkSink()
+    with tempfile.SpooledTemporaryFile(max_size=1024 * 1024) as jsonl, \
+            zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_STORED) as zf:
+        for record in records:
+            path = blob_path(record["sha256"]) if record.get("sha256") else None
+            if path is None or not path.exists():
+                jsonl.write(_export_line(record, to_entry(record), archived=False))
+                continue
+            name = _archive_name(record)
+            decrypted = False
+            with zf.open(name, "w", force_zip64=True) as dst:
+                clear_bytes = decrypt(path) if decrypt else None
+                if clear_bytes is not None:
+                    # decryption needs the whole document; one statement at a time
+                    decrypted = True
+                    dst.write(clear_bytes)
+                else:
+                    with open(path, "rb") as src:
+                        while chunk := src.read(EXPORT_CHUNK_BYTES):
+                            dst.write(chunk)
+                            yield sink.drain()
+            yield sink.drain()
+            jsonl.write(_export_line(record, to_entry(record), archived=name, decrypted=decrypted))
+
+        jsonl.seek(0)
+        with zf.open("statements.jsonl", "w", force_zip64=True) as dst:
+            while chunk := jsonl.read(EXPORT_CHUNK_BYTES):
+                dst.write(chunk)
+                yield sink.drain()
+    yield sink.drain()
@@ -0,0 +1,280 @@
+# app/fake_gmail.py
+#
+# A local stand-in for the Gmail API, for load tests that must not touch Google (run from backend/):
+#   python -m app.fake_gmail --port 8089 --messages 30 --latency 0.05 --error-rate 0.02 --page-size 10
+# and start the app with GMAIL_API_ROOT=http://127.0.0.1:8089/ so its Gmail client calls this server.
+#
+# Implements users.messages.list (q, maxResults, pageToken), users.messages.get,
+# users.messages.attachments.get and users.history.list. The bearer token names the mailbox:
+# "fake:<email>" reads <email>'s mailbox, generated on first use from the seed.
+
+import argparse
+import base64
+import json
+import random
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from email.utils import format_datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from app.passwords import DEFAULT_PASSWORDS
+from app.statement_fixtures import ISSUER_NAMES, random_statement, text_pdf
+
+TOKEN_PREFIX = "fake:"
+_SENDERS = {
+    "hdfc": "Emailstatements.cards@hdfcbank.net",
+    "icici": "credit_cards@icicibank.com",
+    "axis": "cc.statements@axisbank.com",
+    "sbi": "Statements@sbicard.com",
+    "generic": "statements@examplebank.com",
+}
+
+
+class FakeMailbox:
+    """One user's messages, newest first, with ever-increasing history ids."""
+
+    def __init__(self, email: str, messages: int, seed: int, encrypted_ratio: float, statement_ratio: float):
+        self.email = email
+        self.rng = random.Random(f"{seed}:{email}")
+        self.encrypted_ratio = encrypted_ratio
+        self.statement_ratio = statement_ratio
+        self.messages: list[dict] = []
+        self.by_id: dict[str, dict] = {}
+        self.history_id = 1000
+        self._lock = threading.Lock()
+        for _ in range(messages):
+            self.arrive()
+
+    def arrive(self) -> dict:
+        """Add one message (a statement, an invoice, or a PDF-less notice) at the top of the mailbox."""
+        with self._lock:
+            self.history_id += 1
+            number = len(self.messages)
+            message_id = f"{self.history_id:x}{self.rng.getrandbits(32):08x}"
+            roll = self.rng.random()
+            if roll < self.statement_ratio:
+                issuer = self.rng.choice(list(ISSUER_NAMES))
+                password = DEFAULT_PASSWORDS[0] if self.rng.random() < self.encrypted_ratio else None
+                _, pdf = random_statement(self.rng, issuer, transactions=self.rng.randint(5, 40), password=password)
+                subject = f"Your {ISSUER_NAMES[issuer]} Credit Card Statement"
+                sender, filename = _SENDERS[issuer], f"{issuer}_statement_{number}.pdf"
+            elif roll < self.statement_ratio + (1 - self.statement_ratio) / 2:
+                pdf = text_pdf([["Invoice", f"Order #{number}", f"Amount: Rs. {self.rng.randint(100, 9000)}.00"]])
+                subject, sender, filename = f"Your order #{number} invoice", "orders@shop.example.com", f"invoice_{number}.pdf"
+            else:
+                pdf = None
+                subject, sender, filename = "Your account update", "noreply@examplebank.com", None
+
+            received = datetime.now()
+            headers = [
+                {"name": "Subject", "value": subject},
+                {"name": "From", "value": sender},
+                {"name": "Date", "value": format_datetime(received.astimezone())},
+            ]
+            parts = [{"partId": "0", "mimeType": "text/plain", "filename": "", "body": {"size": 40}}]
+            attachments = {}
+            if pdf is not None:
+                attachment_id = f"att-{message_id}"
+                attachments[attachment_id] = pdf
+                parts.append({"partId": "1", "mimeType": "application/pdf", "filename": filename,
+                              "body": {"attachmentId": attachment_id, "size": len(pdf)}})
+            message = {
+                "id": message_id,
+                "threadId": message_id,
+                "historyId": str(self.history_id),
+                "internalDate": str(int(received.timestamp() * 1000)),
+                "labelIds": ["INBOX"],
+                "payload": {"partId": "", "mimeType": "multipart/mixed", "headers": headers, "parts": parts},
+                "sizeEstimate": sum(len(a) for a in attachments.values()) + 500,
+                "_attachments": attachments,
+            }
+            self.messages.insert(0, message)
+            self.by_id[message_id] = message
+            return message
+
+    def list(self, query: str, max_results: int, page_token: str | None) -> dict:
+        with self._lock:
+            matching = [m for m in self.messages if "filename:pdf" not in query or m["_attachments"]]
+        start = int(page_token or 0)
+        page = matching[start:start + max_results]
+        result = {"messages": [{"id": m["id"], "threadId": m["threadId"]} for m in page],
+                  "resultSizeEstimate": len(matching)}
+        if start + max_results < len(matching):
+            result["nextPageToken"] = str(start + max_results)
+        return result
+
+    def history(self, start_history_id: int, max_results: int) -> dict:
+        with self._lock:
+            added = [m for m in reversed(self.messages) if int(m["historyId"]) > start_history_id][:max_results]
+            current = self.history_id
+        return {
+            "history": [{"id": m["historyId"], "messagesAdded": [{"message": {"id": m["id"], "threadId": m["threadId"]}}]}
+                        for m in added],
+            "historyId": str(current),
+        }
+
+
+class FakeGmail:
+    """Mailboxes plus the fault injection every request goes through."""
+
+    def __init__(self, messages: int = 30, seed: int = 7, latency: float = 0.0, error_rate: float = 0.0,
+                 page_size: int = 100, encrypted_ratio: float = 0.3, statement_ratio: float = 0.6):
+        self.messages = messages
+        self.seed = seed
+        self.latency = latency
+        self.error_rate = error_rate
+        self.page_size = page_size
+        self.encrypted_ratio = encrypted_ratio
+        self.statement_ratio = statement_ratio
+        self.mailboxes: dict[str, FakeMailbox] = {}
+        self.calls = Counter()
+        self.errors = Counter()
+        self.bytes_served = 0
+        self._lock = threading.Lock()
+        self._rng = random.Random(seed)
+
+    def mailbox(self, email: str) -> FakeMailbox:
+        with self._lock:
+            box = self.mailboxes.get(email)
+        if box is None:
+            # generated outside the lock; a racing duplicate is simply discarded
+            box = FakeMailbox(email, self.messages, self.seed, self.encrypted_ratio, self.statement_ratio)
+            with self._lock:
+                box = self.mailboxes.setdefault(email, box)
+        return box
+
+    def inject(self, method: str) -> bool:
+        """Sleep the configured latency (with jitter); True if this call should fail with 429."""
+        with self._lock:
+            self.calls[method] += 1
+            delay = self.latency * (0.5 + self._rng.random()) if self.latency else 0
+            fail = self._rng.random() < self.error_rate
+            if fail:
+                self.errors[method] += 1
+        if delay:
+            time.sleep(delay)
+        return fail
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"mailboxes": len(self.mailboxes), "calls": dict(self.calls),
+                    "injected_429": dict(self.errors), "bytes_served": self.bytes_served}
+
+
+class FakeGmailHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    gmail: FakeGmail = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status: int, body: dict, headers: dict | None = None) -> None:
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=UTF-8")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+        with self.gmail._lock:
+            self.gmail.bytes_served += len(data)
+
+    def _error(self, status: int, message: str, reason: str, headers: dict | None = None) -> None:
+        self._send_json(status, {"error": {"code": status, "message": message,
+                                           "errors": [{"message": message, "domain": "global", "reason": reason}]}}, headers)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = {k: v[0] for k, v in parse_qs(url.query).items()}
+        if url.path == "/_stats":
+            self._send_json(200, self.gmail.stats())
+            return
+
+        # /gmail/v1/users/{userId}/messages[/{id}[/attachments/{attachmentId}]] or /history
+        segments = [s for s in url.path.split("/") if s]
+        if segments[:3] != ["gmail", "v1", "users"] or len(segments) < 5:
+            self._error(404, "Not Found", "notFound")
+            return
+        token = self.headers.get("Authorization", "").removeprefix("Bearer ").strip()
+        if not token.startswith(TOKEN_PREFIX):
+            self._error(401, "Request had invalid authentication credentials.", "authError")
+            return
+        box = self.gmail.mailbox(token[len(TOKEN_PREFIX):])
+        resource = segments[4:]
+
+        if resource == ["messages"]:
+            method = "messages.list"
+        elif resource[0] == "messages" and len(resource) == 2:
+            method = "messages.get"
+        elif resource[0] == "messages" and len(resource) == 4 and resource[2] == "attachments":
+            method = "messages.attachments.get"
+        elif resource == ["history"]:
+            method = "history.list"
+        else:
+            self._error(404, "Not Found", "notFound")
+            return
+        if self.gmail.inject(method):
+            self._error(429, "Quota exceeded for quota metric 'Queries' (injected)", "rateLimitExceeded",
+                        {"Retry-After": "1"})
+            return
+
+        if method == "messages.list":
+            max_results = min(int(params.get("maxResults", 100)), self.gmail.page_size)
+            self._send_json(200, box.list(params.get("q", ""), max_results, params.get("pageToken")))
+        elif method == "history.list":
+            if "startHistoryId" not in params:
+                self._error(400, "Missing startHistoryId", "invalidArgument")
+                return
+            self._send_json(200, box.history(int(params["startHistoryId"]), int(params.get("maxResults", 100))))
+        else:
+            message = box.by_id.get(resource[1])
+            if message is None:
+                self._error(404, "Requested entity was not found.", "notFound")
+            elif method == "messages.get":
+                self._send_json(200, {k: v for k, v in message.items() if not k.startswith("_")})
+            else:
+                data = message["_attachments"].get(resource[3])
+                if data is None:
+                    self._error(400, "Invalid attachment token", "invalidArgument")
+                else:
+                    self._send_json(200, {"size": len(data), "data": base64.urlsafe_b64encode(data).decode()})
+
+
+def serve(gmail: FakeGmail, host: str = "127.0.0.1", port: int = 8089) -> ThreadingHTTPServer:
+    """A fake Gmail server bound to host:port; call serve_forever() (or run it in a thread)."""
+    handler = type("BoundFakeGmailHandler", (FakeGmailHandler,), {"gmail": gmail})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def _deliver_forever(gmail: FakeGmail, every: float) -> None:
+    """A new message in every known mailbox each period, so history and re-syncs see growth."""
+    while True:
+        time.sleep(every)
+        for box in list(gmail.mailboxes.values()):
+            box.arrive()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(prog="python -m app.fake_gmail")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--messages", type=int, default=30, help="messages per mailbox")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--latency", type=float, default=0.0, help="mean seconds added to each call")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of calls answered with 429")
+    parser.add_argument("--page-size", type=int, default=100, help="cap on messages.list page size")
+    parser.add_argument("--encrypted-ratio", type=float, default=0.3)
+    parser.add_argument("--arrival-seconds", type=float, default=0, help="deliver a new message to each mailbox this often")
+    args = parser.parse_args()
+    fake = FakeGmail(args.messages, args.seed, args.latency, args.error_rate, args.page_size, args.encrypted_ratio)
+    if args.arrival_seconds:
+        threading.Thread(target=_deliver_forever, args=(fake, args.arrival_seconds), daemon=True).start()
+    server = serve(fake, args.host, args.port)
+    print(f"📬 Fake Gmail on http://{args.host}:{args.port}/ (set GMAIL_API_ROOT to this)")
+    server.serve_forever()
@@ -0,0 +1,25 @@
+# app/fileio.py
+
+import os
+import threading
+from pathlib import Path
+
+
+def write_atomic(path: Path, data: bytes, fsync: bool = False) -> None:
+    """
+    Write data to path via a hidden temp file in the same directory, renamed into place,
+    so readers (and other processes) never see a partial file. The temp name starts with
+    a dot, which the blob GC and cache scans treat as an interrupted write.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+            if fsync:
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    finally:
+        if tmp_path.exists():
+            tmp_path.unlink()
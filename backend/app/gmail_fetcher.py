@@ -1,25 +1,29 @@
 # app/gmail_fetcher.py
 
+import base64
 import datetime
 import os
-from dotenv import load_dotenv
-from pymongo import MongoClient
-from google.oauth2.credentials import Credentials
-from google.auth.transport.requests import Request
+from typing import TYPE_CHECKING
 from app.db import tokens_collection
+from app.rate_limit import gmail_execute
 
-# Load environment variables
-load_dotenv()
+if TYPE_CHECKING:
+    from google.oauth2.credentials import Credentials
 
 CLIENT_ID = os.getenv("GOOGLE_CLIENT_ID")
 CLIENT_SECRET = os.getenv("GOOGLE_CLIENT_SECRET")
 TOKEN_URI = os.getenv("GOOGLE_TOKEN_URI")
 SCOPES = os.getenv("GOOGLE_SCOPES")
+# Points the Gmail client somewhere other than Google, e.g. the load-test fake (python -m app.fake_gmail)
+GMAIL_API_ROOT = os.getenv("GMAIL_API_ROOT")
 
-def get_user_credentials(user_email: str) -> Credentials:
+def get_user_credentials(user_email: str) -> "Credentials":
     """
     Retrieve and refresh Gmail OAuth2 credentials for a user.
     """
+    # google-auth (and requests, for the refresh) load on first use, not at worker boot
+    from google.oauth2.credentials import Credentials
+    from google.auth.transport.requests import Request
 
     user_token = tokens_collection.find_one({"email": user_email})
     if not user_token:
@@ -47,3 +51,64 @@ def get_user_credentials(user_email: str) -> Credentials:
         )
 
     return creds
+
+
+def gmail_service(creds):
+    """Gmail API client for creds; googleapiclient is imported on first use."""
+    from googleapiclient.discovery import build
+    if GMAIL_API_ROOT:
+        return build('gmail', 'v1', credentials=creds, client_options={"api_endpoint": GMAIL_API_ROOT})
+    return build('gmail', 'v1', credentials=creds)
+
+
+def iter_pdf_parts(payload: dict, _seen: set | None = None):
+    """
+    Walk a Gmail message payload depth-first, through any nesting of multiparts
+    (multipart/mixed -> multipart/alternative -> ...), yielding every PDF part exactly once.
+    The payload itself is checked too, for single-part messages that are just a PDF.
+    """
+    seen = set() if _seen is None else _seen
+    filename = (payload.get("filename") or "").lower()
+    if filename.endswith(".pdf") or payload.get("mimeType") == "application/pdf":
+        body = payload.get("body", {})
+        key = payload.get("partId") or body.get("attachmentId") or filename
+        if key not in seen:
+            seen.add(key)
+            yield payload
+    for child in payload.get("parts") or []:
+        yield from iter_pdf_parts(child, seen)
+
+
+def pdf_part_filename(part: dict) -> str:
+    return part.get("filename") or f"attachment-{part.get('partId') or '0'}.pdf"
+
+
+def fetch_part_bytes(service, message_id: str, part: dict, user_email: str) -> bytes | None:
+    """
+    Return the decoded bytes of a message part, preferring data already in hand:
+    inline body.data is used as-is, attachmentId costs one attachments.get, and an
+    inline part whose data was left out of a masked fetch costs one full messages.get.
+    """
+    body = part.get("body", {})
+    if body.get("data"):
+        return base64.urlsafe_b64decode(body["data"])
+
+    if body.get("attachmentId"):
+        attachment = gmail_execute(service.users().messages().attachments().get(
+            userId='me',
+            messageId=message_id,
+            id=body["attachmentId"]
+        ), user_email, "messages.attachments.get")
+        return base64.urlsafe_b64decode(attachment.get("data", ""))
+
+    if body.get("size") and part.get("partId") is not None:
+        msg = gmail_execute(
+            service.users().messages().get(userId='me', id=message_id, format='full'),
+            user_email, "messages.get"
+        )
+        for full_part in iter_pdf_parts(msg.get("payload", {})):
+            if full_part.get("partId") == part["partId"]:
+                data = full_part.get("body", {}).get("data")
+                return base64.urlsafe_b64decode(data) if data else None
+
+    return None
@@ -1,381 +1,626 @@
 # app/gmail_routes.py
 
-from fastapi import APIRouter, Query
-from googleapiclient.discovery import build
-from app.gmail_fetcher import get_user_credentials
-
-import base64
+from fastapi import APIRouter, Query, Request
+from app.gmail_fetcher import get_user_credentials, gmail_service, iter_pdf_parts, pdf_part_filename, fetch_part_bytes
+from app.issuers import detect_issuer, is_likely_statement
+from app.sync import SingleFlight, SYNC_FRESHNESS_SECONDS, known_message_ids, mark_message_synced, update_sync_progress, get_sync_progress, get_revision, record_listing, get_listing_state
+from app.blob_store import put_blob, blob_path, add_reference, resolve_reference
+from app.records import upsert_record, get_record, list_records, iter_records
+from app.export import iter_zip, iter_jsonl
+from app.aggregates import apply_record, get_summary
+from app.reminders import reminder_scheduler, upcoming_dues
+from app.rate_limit import gmail_execute
+from app.passwords import DEFAULT_PASSWORDS, looks_encrypted
+from app.admission import gmail_pool, decrypt_pool, ocr_pool, render_pool, Saturated
+from app.render_cache import RENDER_FORMATS, render_key, get_render, put_render, render_page
+from app.deadline import Deadline, DeadlineExceeded, UNBOUNDED, LIST_PDFS_BUDGET_SECONDS
+from app.cache import cache_namespace
+from app.chat import forget_context
+from app.sidecars import PARSER_VERSION, has_sidecar, put_text
+from app.parsing import OCR_FALLBACK_ENABLED, try_read_pdf_bytes, decrypt_and_extract_text, ocr_statement_fields, parse_credit_card_fields
+from app.reparse import start_reparse, get_progress as get_reparse_progress
+
+import hashlib
 import io
-from PyPDF2 import PdfReader
+import os
 
 from fastapi import HTTPException
 
 from pathlib import Path
-from fastapi.responses import FileResponse
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from fastapi.responses import FileResponse, StreamingResponse
 from fastapi import Body
-from fastapi.responses import Response
-from PyPDF2 import PdfWriter
+from fastapi.responses import JSONResponse, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.encoders import jsonable_encoder
 from datetime import datetime, date
-import re
+from functools import partial
 
 router = APIRouter()
 
-def _try_read_pdf_bytes(file_bytes: bytes, password: str | None = None) -> tuple[bytes | None, bool]:
-    """Attempt to read and (if needed) decrypt a PDF. Returns (pdf_bytes, password_required)."""
+# Only the newest messages are synced per run
+SYNC_MESSAGE_LIMIT = int(os.getenv("SYNC_MESSAGE_LIMIT", "20"))
+
+# One sync per user at a time; recent results are reused for SYNC_FRESHNESS_SECONDS,
+# by this process and, through the shared cache, by the other workers
+_list_pdfs_flight = SingleFlight(freshness_seconds=SYNC_FRESHNESS_SECONDS, shared=cache_namespace("list-pdfs"))
+
+
+# Warm-start syncs from the OAuth callback and work left pending by budgeted requests
+_background_sync_executor = ThreadPoolExecutor(max_workers=int(os.getenv("BACKGROUND_SYNC_WORKERS", "2")), thread_name_prefix="warm-sync")
+
+
+def run_user_sync(user_email: str, force: bool = False, creds=None, deadline: Deadline = UNBOUNDED) -> dict:
+    """
+    Sync a user through the single-flight, so API and scheduled syncs never overlap.
+    Joining a sync already in flight (e.g. the unbounded OAuth warm-start) waits only for
+    the caller's own budget; after that the stored records are served with the rest pending.
+    """
     try:
-        reader = PdfReader(io.BytesIO(file_bytes))
-        if reader.is_encrypted:
-            if password:
-                if not reader.decrypt(password):
-                    return None, True
-            else:
-                # Try defaults
-                for candidate in ["MRIT2607", "mrit2607"]:
-                    temp_reader = PdfReader(io.BytesIO(file_bytes))
-                    if temp_reader.decrypt(candidate):
-                        reader = temp_reader
-                        break
-                else:
-                    return None, True
-        # Write clear bytes
-        writer = PdfWriter()
-        for page in reader.pages:
-            writer.add_page(page)
-        out_stream = io.BytesIO()
-        writer.write(out_stream)
-        out_stream.seek(0)
-        return out_stream.read(), False
+        return _list_pdfs_flight.do(user_email, lambda: sync_user_pdfs(user_email, creds, deadline),
+                                    force=force, timeout=deadline.timeout())
+    except TimeoutError:
+        return _listing_while_syncing(user_email)
+
+
+def _listing_while_syncing(user_email: str) -> dict:
+    """The stored listing, with messages the running sync has not finished marked pending."""
+    progress = get_sync_progress(user_email) or {}
+    synced = known_message_ids(user_email)
+    pending_ids = [m for m in progress.get("message_ids", []) if m not in synced]
+    listing = get_listing_state(user_email)
+    records = list_records(user_email)
+    window = list(dict.fromkeys(r["message_id"] for r in records))[:SYNC_MESSAGE_LIMIT]
+    entries = []
+    for record in records:
+        if record["message_id"] not in window:
+            continue
+        entry = _record_to_entry(record)
+        if record["message_id"] in pending_ids:
+            entry["status"] = "pending"
+        entries.append(entry)
+    return {
+        "pdf_attachments": entries,
+        "pending_message_ids": [m for m in pending_ids if m not in window],
+        "sync_stats": {"pending": len(pending_ids)},
+        "revision": listing["revision"],
+        "listing_ids": listing["listing_ids"],
+    }
+
+
+def start_background_sync(user_email: str, creds=None) -> None:
+    """Queue a non-blocking sync; progress is reported by /gmail/sync-status."""
+    update_sync_progress(user_email, state="queued", processed=0, total=None, error=None)
+
+    def _run():
+        try:
+            run_user_sync(user_email, force=True, creds=creds)
+        except Exception as e:
+            print(f"❌ Background sync failed for {user_email}: {e}")
+
+    _background_sync_executor.submit(_run)
+
+
+# An If-None-Match is answered from the last sync's state when that sync is younger than this
+LIST_PDFS_REVALIDATE_SECONDS = float(os.getenv("LIST_PDFS_REVALIDATE_SECONDS", "900"))
+
+
+def _refresh_quietly(user_email: str) -> None:
+    """A non-forced sync behind a 304, so the next load sees anything new."""
+    try:
+        run_user_sync(user_email)
+    except Exception as e:
+        print(f"❌ Background refresh failed for {user_email}: {e}")
+
+
+def _listing_cursor(revision: int) -> str:
+    # days_left is computed at read time, so a listing only stays current for the day it was made
+    return f"{revision}-{date.today().isoformat()}"
+
+
+def _cursor_revision(cursor: str, current: int) -> int | None:
+    """The revision in a cursor from today, not ahead of current; None means send everything."""
+    revision, _, day = cursor.partition("-")
+    if not revision.isdigit() or day != date.today().isoformat() or int(revision) > current:
+        return None
+    return int(revision)
+
+
+def _listing_etag(cursor: str, listing_ids: list[str]) -> str:
+    # the revision misses messages leaving the Gmail window, so the window itself is part of the tag
+    window = hashlib.sha1(",".join(listing_ids).encode()).hexdigest()[:12]
+    return f'W/"{cursor}-{window}"'
+
+
+def _etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return "*" in tags or etag.removeprefix("W/") in tags
+
+
+@router.get("/gmail/list-pdfs")
+async def list_pdf_attachments(request: Request, user_email: str = Query(...), refresh: bool = Query(False),
+                               budget_seconds: float = Query(LIST_PDFS_BUDGET_SECONDS, gt=0),
+                               since: str | None = Query(None)):
+    """
+    Lists Gmail messages with PDF attachments for a user and downloads them locally.
+    Concurrent calls for the same user attach to the sync already in flight, and a
+    recently finished result is served without touching Gmail unless refresh=true.
+    Runs on the Gmail I/O pool; answers 503 with Retry-After when that pool is full.
+    Anything not finished within budget_seconds comes back as "pending" and completes
+    in the background.
+
+    The response carries an ETag naming the user's listing revision and Gmail window, and a
+    matching If-None-Match gets a bodiless 304 straight from the last sync's state while that
+    sync is recent (a background sync then picks up anything new). It also carries a "cursor"; passing that back as since= returns only the entries
+    added or changed after it, with "delta": true and the current message_ids order.
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and not refresh:
+        # revalidation against the last sync (the scheduler keeps it recent): no Gmail round-trip
+        listing = await run_in_threadpool(get_listing_state, user_email)
+        age = (datetime.utcnow() - listing["listed_at"]).total_seconds() if listing["listed_at"] else None
+        if age is not None and age < LIST_PDFS_REVALIDATE_SECONDS:
+            headers = {"ETag": _listing_etag(_listing_cursor(listing["revision"]), listing["listing_ids"]),
+                       "Cache-Control": "private, no-cache"}
+            if _etag_matches(if_none_match, headers["ETag"]):
+                if age >= SYNC_FRESHNESS_SECONDS:
+                    _background_sync_executor.submit(_refresh_quietly, user_email)
+                return Response(status_code=304, headers=headers)
+
+    deadline = Deadline(budget_seconds)
+    result = dict(await gmail_pool.run(run_user_sync, user_email, refresh, None, deadline))
+    revision = result.pop("revision", 0)
+    cursor = _listing_cursor(revision)
+    headers = {"ETag": _listing_etag(cursor, result.pop("listing_ids", [])), "Cache-Control": "private, no-cache"}
+    if _etag_matches(if_none_match, headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+
+    since_revision = _cursor_revision(since, revision) if since else None
+    if since_revision is None:
+        return JSONResponse(content=jsonable_encoder({**result, "cursor": cursor}), headers=headers)
+    message_ids = list(dict.fromkeys(entry["message_id"] for entry in result["pdf_attachments"]))
+    changed = await run_in_threadpool(list_records, user_email, message_ids, since_revision)
+    return JSONResponse(content=jsonable_encoder({
+        **result,
+        "pdf_attachments": [_record_to_entry(r) for r in changed],
+        "message_ids": message_ids,
+        "cursor": cursor,
+        "delta": True,
+    }), headers=headers)
+
+
+@router.get("/gmail/summary")
+def statement_summary(user_email: str = Query(...)):
+    """
+    Monthly total and minimum due per card, the minimum-due ratio, and upcoming dues.
+    Served from aggregates maintained at ingest, so the cost does not grow with history.
+    """
+    return get_summary(user_email)
+
+
+@router.post("/gmail/reparse")
+def reparse_statements(payload: dict = Body(default={})):
+    """
+    Start re-extracting fields for records parsed by an older parser version, from the text and
+    OCR sidecars stored at ingest. Optional JSON body: { user_email } to limit it to one user.
+    Answers 409 while a job is already running; poll GET /gmail/reparse for progress.
+    """
+    if not start_reparse(payload.get("user_email")):
+        return JSONResponse(status_code=409, content={"detail": "A re-parse is already running", "progress": get_reparse_progress()})
+    return JSONResponse(status_code=202, content={"started": True, "parser_version": PARSER_VERSION})
+
+
+@router.get("/gmail/reparse")
+def reparse_progress():
+    """Progress of the current or last re-parse job."""
+    return get_reparse_progress() or {"state": "idle", "parser_version": PARSER_VERSION}
+
+
+@router.get("/gmail/upcoming-dues")
+def get_upcoming_dues(user_email: str = Query(...), within_days: int = Query(7, ge=0, le=366)):
+    """Statements due in the next within_days days, soonest first, from the due-date index."""
+    return {"dues": upcoming_dues(within_days, user_email)}
+
+
+@router.get("/gmail/sync-status")
+def sync_status(user_email: str = Query(...)):
+    """Progress of the user's current or last sync (queued, running, done or failed)."""
+    return {
+        "in_flight": _list_pdfs_flight.in_flight(user_email),
+        "progress": get_sync_progress(user_email),
+    }
+
+
+def _parts_mask(depth: int) -> str:
+    fields = "partId,mimeType,filename,body(attachmentId,size)"
+    return f"{fields},parts({_parts_mask(depth - 1)})" if depth > 1 else fields
+
+
+# Partial-response mask for triage: headers and the part tree (nested multiparts
+# included), never body data. Field masks cannot recurse, so nest a fixed depth.
+_TRIAGE_FIELDS = f"id,payload(headers,{_parts_mask(5)})"
+
+# Message headers and part trees never change, so triage responses are shared across workers
+GMAIL_TRIAGE_CACHE_SECONDS = float(os.getenv("GMAIL_TRIAGE_CACHE_SECONDS", str(7 * 24 * 3600)))
+_triage_cache = cache_namespace("gmail-triage", ttl=GMAIL_TRIAGE_CACHE_SECONDS)
+
+
+def _triage_message(service, user_email: str, message_id: str) -> dict:
+    """Headers and part tree of a message (no bodies), from the shared cache when another worker fetched it."""
+    return _triage_cache.get_or_compute(f"{user_email}:{message_id}", lambda: gmail_execute(
+        service.users().messages().get(userId='me', id=message_id, format='full', fields=_TRIAGE_FIELDS),
+        user_email, "messages.get",
+    ))
+
+
+def _user_download_dir(user_email: str) -> Path:
+    user_dir_safe = user_email.replace("@", "_at_").replace("/", "_")
+    return Path("downloads") / user_dir_safe
+
+
+def _header(headers: list[dict], name: str, default: str = "") -> str:
+    return next((h["value"] for h in headers if h["name"] == name), default)
+
+
+def _days_left(due_date: str | None) -> int | None:
+    if not due_date:
+        return None
+    try:
+        return (datetime.strptime(due_date, "%Y-%m-%d").date() - date.today()).days
     except Exception:
-        return None, False
+        return None
+
+
+def _record_to_entry(record: dict) -> dict:
+    """Shape a stored attachment record like the list-pdfs response always has."""
+    is_credit = record.get("is_credit", False)
+    parsed = record.get("parsed", False)
+    return {
+        "subject": record.get("subject", "No Subject"),
+        "filename": record["filename"],
+        "message_id": record["message_id"],
+        "saved_path": str(blob_path(record["sha256"])) if record.get("sha256") else None,
+        **({"total_amount_due": record.get("total_amount_due") if record.get("total_amount_due") is not None else 0} if is_credit else {}),
+        **({"minimum_amount_due": record.get("minimum_amount_due") if record.get("minimum_amount_due") is not None else 0} if is_credit else {}),
+        **({"due_date": record.get("due_date")} if is_credit and parsed else {}),
+        # days_left is computed at read time so stored records never go stale
+        **({"days_left": _days_left(record.get("due_date"))} if is_credit and parsed else {}),
+        **({"password_required": True} if is_credit and record.get("password_required") else {}),
+        **({"issuer": record.get("issuer")} if is_credit else {}),
+        **({"status": "pending"} if record.get("status") == "pending" else {}),
+    }
+
 
-def _extract_text_from_pdf_bytes(pdf_bytes: bytes, max_pages: int = 3) -> str:
+def _store_ocr_result(user_email: str, message_id: str, filename: str, record: dict, future) -> None:
+    """Completion callback for OCR that outlived the request budget."""
     try:
-        reader = PdfReader(io.BytesIO(pdf_bytes))
-        text = ""
-        for idx, page in enumerate(reader.pages):
-            if idx >= max_pages:
-                break
-            text += page.extract_text() or ""
-        return text
+        record.update(parsed=True, ocr=True, status="done", parser_version=PARSER_VERSION, **future.result())
     except Exception:
-        return ""
-
-# Amount patterns
-_amount_core_pattern = r"(?:[₹Rr][sS]?\.?\s*)?([0-9]{1,3}(?:,[0-9]{3})*(?:\.[0-9]{1,2})?|[0-9]+(?:\.[0-9]{1,2})?)\s*(?:Dr|Cr)?"
-# Strict: must contain a comma group or a decimal
-_amount_core_pattern_strict = r"(?:[₹Rr][sS]?\.?\s*)?((?:[0-9]{1,3}(?:,[0-9]{3})+)|(?:[0-9]+\.[0-9]{1,2}))\s*(?:Dr|Cr)?"
-
-# Header-row based parsing for common statement layout
-_date_token_pattern = r"(\d{1,2}[\-/]\d{1,2}[\-/]\d{2,4}|\d{1,2}\s*[A-Za-z]{3,9}\s*\d{2,4}|[A-Za-z]{3,9}\s*\d{1,2},?\s*\d{2,4}|\d{4}[\-/]\d{1,2}[\-/]\d{1,2})"
-
-# ---------- Replace the following functions in your file ----------
-
-def _find_amounts_in_string(s: str, strict: bool = True) -> list[float]:
-    """Return list of parsed amounts found in string s. strict=True prefers comma-grouped or decimal amounts."""
-    strict_re = re.compile(r"(?:[₹Rr][sS]?\.?\s*)?((?:\d{1,3}(?:,\d{3})+)|\d+\.\d{1,2})\s*(?:Dr|Cr)?", re.IGNORECASE)
-    loose_re = re.compile(r"(?:[₹Rr][sS]?\.?\s*)?([0-9]{1,3}(?:,[0-9]{3})*(?:\.[0-9]{1,2})?|[0-9]+(?:\.[0-9]{1,2})?)\s*(?:Dr|Cr)?", re.IGNORECASE)
-    regex = strict_re if strict else loose_re
-    results = []
-    for m in regex.finditer(s):
-        amt = m.group(1)
-        try:
-            results.append(float(amt.replace(",", "")))
-        except Exception:
-            continue
-    return results
+        record["status"] = "failed"
+    save_record(user_email, message_id, filename, record)
+    _list_pdfs_flight.forget(user_email)
+
 
-def _parse_table_row_if_present(text: str) -> dict | None:
+def save_record(user_email: str, message_id: str, filename: str, record: dict) -> None:
+    """Store an ingested record; a parsed statement also updates aggregates, due-date reminders and chat context."""
+    upsert_record(user_email, message_id, filename, **record)
+    stored = {**record, "message_id": message_id, "filename": filename}
+    apply_record(user_email, stored)
+    reminder_scheduler.schedule_record(user_email, stored)
+    forget_context(user_email)
+
+
+def _ingest_part(service, user_email: str, message_id: str, part_index: int, part: dict,
+                 subject: str, sender: str, sync_stats: dict, deadline: Deadline = UNBOUNDED) -> str:
     """
-    Try to detect a header row like:
-      Total Amount Due | Minimum Payment Due | Payment Due Date
-    and read the next block of lines to extract values.
+    Triage, store and parse one PDF part, saving the outcome as an attachment record.
+    Every expensive stage checks the remaining budget first; when it runs out the record
+    is saved as "pending". Returns "done", "pending", "continuing" (OCR still running and
+    will store its own result) or "failed" (retried on the next sync).
     """
-    lines = [ln.rstrip() for ln in text.splitlines()]
-    for i, line in enumerate(lines):
-        header = line.lower()
-        # look for headers that include words for total & minimum & due date
-        if ("total" in header and ("amount" in header or "payment" in header)) and ("minimum" in header or "min" in header) and ("due" in header):
-            # take a small block after the header (some statements place values in the next 1-4 lines or columns)
-            block_lines = []
-            for j in range(i + 1, min(i + 6, len(lines))):
-                if lines[j].strip() == "":
-                    continue
-                block_lines.append(lines[j])
-            block = " ".join(block_lines)
-            # strict amount extraction first
-            amounts = _find_amounts_in_string(block, strict=True)
-            if len(amounts) < 2:
-                amounts = _find_amounts_in_string(block, strict=False)
-            # extract dates in the block
-            dates = [m.group(1) for m in re.finditer(_date_token_pattern, block)]
-            total_due = None
-            min_due = None
-            due_dt = None
-            if len(amounts) >= 1:
-                total_due = amounts[0]
-            if len(amounts) >= 2:
-                min_due = amounts[1]
-            # choose a sensible date candidate - often the payment due date is present in the block
-            if dates:
-                # prefer the last date in the block (often due date in rightmost column)
-                cand = dates[-1]
-                for fmt in [
-                    "%d-%m-%Y", "%d/%m/%Y", "%d-%m-%y", "%d/%m/%y",
-                    "%d %b %Y", "%d %B %Y", "%b %d %Y", "%B %d %Y",
-                    "%b %d, %Y", "%B %d, %Y", "%d %b, %Y", "%d %B, %Y",
-                    "%Y-%m-%d", "%Y/%m/%d",
-                ]:
+    filename = pdf_part_filename(part)
+    existing = get_record(user_email, message_id, filename)
+    if existing and existing.get("status", "done") == "done":
+        return "done"
+
+    body = part.get("body", {})
+    has_bytes = bool(body.get("attachmentId") or body.get("size"))
+    issuer = detect_issuer(sender, subject, filename)
+    # If looks like credit card, attempt parsing
+    is_credit = (
+        ("credit" in subject.lower()) or
+        ("card" in subject.lower()) or
+        ("credit" in filename.lower())
+    )
+    record = {
+        "part_index": part_index,
+        "subject": subject,
+        "sender": sender,
+        "is_credit": is_credit,
+        "issuer": issuer,
+        "parsed": False,
+        "password_required": False,
+        "status": "done",
+    }
+
+    if has_bytes and is_likely_statement(sender, subject, filename):
+        try:
+            stored_path = resolve_reference(user_email, message_id, filename)
+            if stored_path:
+                file_data = stored_path.read_bytes()
+                digest = stored_path.name
+                sync_stats["reused"] += 1
+            else:
+                deadline.check("gmail")
+                file_data = fetch_part_bytes(service, message_id, part, user_email)
+                if file_data is None:
+                    raise ValueError("Attachment has no data")
+                sync_stats["downloaded"] += 1
+                sync_stats["bytes_downloaded"] += len(file_data)
+                digest = put_blob(file_data)
+                add_reference(user_email, message_id, filename, digest, len(file_data))
+            if is_credit:
+                # CPU-bound stages queue on their own pools (blocking, not rejecting)
+                deadline.check("decrypt")
+                try:
+                    text, pw_required = decrypt_pool.submit(
+                        decrypt_and_extract_text, file_data, block=True, timeout=deadline.timeout()
+                    ).result(timeout=deadline.timeout())
+                except (Saturated, FutureTimeout):
+                    raise DeadlineExceeded("decrypt")
+                record["password_required"] = pw_required
+                if text is not None and not text.strip() and OCR_FALLBACK_ENABLED:
+                    deadline.check("ocr")
                     try:
-                        due_dt = datetime.strptime(cand, fmt)
-                        break
-                    except Exception:
-                        continue
-            if total_due is not None or min_due is not None or due_dt is not None:
-                return {
-                    "total_amount_due": total_due,
-                    "minimum_amount_due": min_due,
-                    "due_date": due_dt.strftime("%Y-%m-%d") if due_dt else None,
-                }
-    return None
+                        future = ocr_pool.submit(ocr_statement_fields, file_data, issuer, digest, block=True, timeout=deadline.timeout())
+                    except Saturated:
+                        raise DeadlineExceeded("ocr")
+                    try:
+                        parsed_fields = future.result(timeout=deadline.timeout())
+                    except FutureTimeout:
+                        # let the OCR finish in the background and store its own result
+                        future.add_done_callback(partial(_store_ocr_result, user_email, message_id, filename, dict(record)))
+                        raise DeadlineExceeded("ocr", continuing=True)
+                    record.update(parsed=True, ocr=True, parser_version=PARSER_VERSION, **parsed_fields)
+                elif text is not None:
+                    # keep the text layer, so a parser upgrade can re-extract fields without this PDF
+                    if not has_sidecar(digest, "text"):
+                        put_text(digest, text)
+                    if issuer == "generic":
+                        record["issuer"] = issuer = detect_issuer(first_page_text=text)
+                    parsed_fields = parse_credit_card_fields(text, issuer)
+                    record.update(
+                        parsed=True,
+                        parser_version=PARSER_VERSION,
+                        total_amount_due=parsed_fields.get("total_amount_due"),
+                        minimum_amount_due=parsed_fields.get("minimum_amount_due"),
+                        due_date=parsed_fields.get("due_date"),
+                    )
+        except DeadlineExceeded as e:
+            record["status"] = "pending"
+            upsert_record(user_email, message_id, filename, **record)
+            return "continuing" if e.continuing else "pending"
+        except Exception:
+            record["status"] = "failed"
+    else:
+        # Not a statement: list it, fetch bytes only if the user opens it
+        record["skipped"] = True
+        sync_stats["skipped"] += 1
+        sync_stats["bytes_skipped"] += body.get("size", 0)
+
+    save_record(user_email, message_id, filename, record)
+    return record["status"]
 
 
-def _extract_amount_near_label(text: str, label_variants: list[str]) -> float | None:
+def _ingest_message(service, user_email: str, message_id: str, sync_stats: dict,
+                    deadline: Deadline = UNBOUNDED) -> str:
     """
-    Improved approach:
-    - Find a line matching the label.
-    - Search the same line and the next up-to-5 lines for strict amounts first, then fallback to loose.
-    - If nothing found, search the whole document for 'label' as inline pattern.
-    - Final fallback: return the largest currency-like amount in the top portion of the doc.
+    Triage one message from headers and its part tree, then ingest each PDF part.
+    Returns the worst part outcome: "failed", then "pending", "continuing", "done".
     """
-    lines = [ln for ln in text.splitlines()]
-    n = len(lines)
-    for label in label_variants:
-        label_re = re.compile(rf"\b{label}\b", re.IGNORECASE)
-        for i, ln in enumerate(lines):
-            if label_re.search(ln):
-                # scan this line + a small window below (accounts for column layout where value sits below header)
-                window = " ".join(lines[i : min(i + 6, n)])  # current line + next 5 lines
-                # strict first
-                amounts = _find_amounts_in_string(window, strict=True)
-                if not amounts:
-                    amounts = _find_amounts_in_string(window, strict=False)
-                if amounts:
-                    return amounts[0]
-                # also try a small window above (sometimes label and value are above/below)
-                window_up = " ".join(lines[max(0, i - 3) : i + 1])
-                amounts = _find_amounts_in_string(window_up, strict=True)
-                if not amounts:
-                    amounts = _find_amounts_in_string(window_up, strict=False)
-                if amounts:
-                    return amounts[0]
-    # next try inline patterns (same-line patterns across the whole text)
-    for label in label_variants:
-        regex_line_strict = re.compile(rf"\b{label}\b\s*[:\-]?\s*{_amount_core_pattern_strict}", re.IGNORECASE)
-        m = regex_line_strict.search(text)
-        if m:
-            try:
-                return float(m.group(1).replace(",", ""))
-            except Exception:
-                pass
-        regex_line_loose = re.compile(rf"\b{label}\b\s*[:\-]?\s*{_amount_core_pattern}", re.IGNORECASE)
-        m2 = regex_line_loose.search(text)
-        if m2:
-            try:
-                return float(m2.group(1).replace(",", ""))
-            except Exception:
-                pass
-    # Final fallback: find the largest amount in the first 3000 chars (big printed totals are usually the largest value)
-    head = text[:5000]  # limit
-    all_amounts = _find_amounts_in_string(head, strict=False)
-    if all_amounts:
-        # return the largest sensible amount (likely the total)
-        return max(all_amounts)
-    return None
+    deadline.check("gmail")
+    msg_data = _triage_message(service, user_email, message_id)
+    sync_stats["messages"] += 1
+    headers = msg_data.get("payload", {}).get("headers", [])
+    subject = _header(headers, "Subject", "No Subject")
+    sender = _header(headers, "From")
+    outcomes = set()
+    for part_index, part in enumerate(iter_pdf_parts(msg_data.get("payload", {}))):
+        sync_stats["pdf_attachments"] += 1
+        outcomes.add(_ingest_part(service, user_email, message_id, part_index, part, subject, sender, sync_stats, deadline))
+    for outcome in ("failed", "pending", "continuing"):
+        if outcome in outcomes:
+            return outcome
+    return "done"
+
+
+def _resume_sync(user_email: str, creds) -> None:
+    """
+    Finish what a budgeted sync left pending with an unbounded sync through the single-flight,
+    so it never runs alongside another sync of the same user. It is queued while the sync that
+    left the work is still in flight, so joining that one (or any other) leads to another try.
+    """
+    ran = []
 
+    def resume():
+        ran.append(True)
+        return sync_user_pdfs(user_email, creds)
 
-def _extract_date_near_label(text: str, label_variants: list[str]) -> datetime | None:
+    while not ran:
+        try:
+            _list_pdfs_flight.do(user_email, resume, force=True)
+        except Exception as e:
+            if ran:
+                print(f"❌ Background resume failed for {user_email}: {e}")
+
+
+def sync_user_pdfs(user_email: str, creds=None, deadline: Deadline = UNBOUNDED) -> dict:
     """
-    Look for the given label and then search a few lines around it for date tokens.
-    Fall back to inline search.
+    Incrementally syncs the user's PDF attachments from Gmail and returns the listing.
+    Messages ingested by an earlier sync are served from their stored records; new ones are
+    triaged from headers and part filenames first (no body data is transferred), and
+    attachment bytes are only downloaded for PDFs that look like statements.
+    Bytes go to the content-addressed blob store. creds may be passed in by callers that
+    already hold fresh credentials (the OAuth callback), saving a token lookup.
+    Work that does not fit in the deadline is reported as pending and finished in the background.
     """
-    lines = [ln for ln in text.splitlines()]
-    n = len(lines)
-    for label in label_variants:
-        label_re = re.compile(rf"\b{label}\b", re.IGNORECASE)
-        for i, ln in enumerate(lines):
-            if label_re.search(ln):
-                # search the line and nearby lines for date tokens
-                window_lines = lines[max(0, i - 2) : min(n, i + 6)]
-                window_text = " ".join(window_lines)
-                m = re.search(_date_token_pattern, window_text)
-                if m:
-                    cand = m.group(1).strip()
-                    for fmt in [
-                        "%d-%m-%Y", "%d/%m/%Y", "%d-%m-%y", "%d/%m/%y",
-                        "%d %b %Y", "%d %B %Y", "%b %d %Y", "%B %d %Y",
-                        "%b %d, %Y", "%B %d, %Y", "%d %b, %Y", "%d %B, %Y",
-                        "%Y-%m-%d", "%Y/%m/%d",
-                    ]:
-                        try:
-                            return datetime.strptime(cand, fmt)
-                        except Exception:
-                            continue
-    # inline fallback
-    m2 = re.search(rf"({'|'.join([re.escape(l) for l in label_variants])}).{{0,60}}{_date_token_pattern}", text, re.IGNORECASE)
-    if m2:
-        cand = m2.group(1).strip()
-        # attempt parsing from the matched groups (m2.group(2) or similar)
-        # safer: search for any date token in the entire doc and return the first plausible match
-        mdate = re.search(_date_token_pattern, text)
-        if mdate:
-            cand = mdate.group(1)
-            for fmt in [
-                "%d-%m-%Y", "%d/%m/%Y", "%d-%m-%y", "%d/%m/%y",
-                "%d %b %Y", "%d %B %Y", "%b %d %Y", "%B %d %Y",
-                "%b %d, %Y", "%B %d, %Y", "%d %b, %Y", "%d %B, %Y",
-                "%Y-%m-%d", "%Y/%m/%d",
-            ]:
-                try:
-                    return datetime.strptime(cand, fmt)
-                except Exception:
-                    continue
-    return None
-
-# ---------- End replacement code ----------
+    update_sync_progress(user_email, state="running", processed=0, total=None, error=None,
+                         started_at=datetime.utcnow(), finished_at=None)
+    try:
+        result = _sync_user_pdfs(user_email, creds, deadline)
+    except Exception as e:
+        update_sync_progress(user_email, state="failed", error=str(e), finished_at=datetime.utcnow())
+        raise
+    update_sync_progress(user_email, state="done", finished_at=datetime.utcnow())
+    return result
 
 
-def _parse_credit_card_fields(text: str) -> dict:
-    # First, try header-row mapping approach
-    header_result = _parse_table_row_if_present(text)
-    if header_result:
-        total_due = header_result.get("total_amount_due")
-        min_due = header_result.get("minimum_amount_due")
-        due_dt_str = header_result.get("due_date")
-        due_dt = datetime.strptime(due_dt_str, "%Y-%m-%d") if due_dt_str else None
-    else:
-        # Fallback to label-near parsing
-        total_due = _extract_amount_near_label(text, [
-            r"Total\s*Payment\s*Due",
-            r"Total\s*Amount\s*Due",
-            r"Amount\s*Due",
-            r"Total\s*Due",
-        ])
-        min_due = _extract_amount_near_label(text, [
-            r"Minimum\s*Payment\s*Due",
-            r"Minimum\s*Amount\s*Due",
-            r"Min\.?\s*Amt\.?\s*Due",
-            r"Minimum\s*Due",
-        ])
-        # specifically target Payment Due Date; avoid Statement Period
-        due_dt = _extract_date_near_label(text, [
-            r"Payment\s*Due\s*Date",
-            r"Due\s*Date"
-        ])
-    result = {
-        "total_amount_due": total_due,
-        "minimum_amount_due": min_due,
-        "due_date": due_dt.strftime("%Y-%m-%d") if due_dt else (header_result.get("due_date") if header_result else None),
-        "days_left": None
+def _list_pdf_message_ids(service, user_email: str) -> list[str]:
+    """Ids of the newest SYNC_MESSAGE_LIMIT messages with PDFs, following pages when Gmail returns short ones."""
+    message_ids = []
+    page_token = None
+    while len(message_ids) < SYNC_MESSAGE_LIMIT:
+        results = gmail_execute(service.users().messages().list(
+            userId='me',
+            q="has:attachment filename:pdf",
+            maxResults=SYNC_MESSAGE_LIMIT - len(message_ids),
+            pageToken=page_token
+        ), user_email, "messages.list")
+        message_ids += [m['id'] for m in results.get('messages', [])]
+        page_token = results.get('nextPageToken')
+        if not page_token:
+            break
+    return message_ids[:SYNC_MESSAGE_LIMIT]
+
+
+def _sync_user_pdfs(user_email: str, creds, deadline: Deadline) -> dict:
+    if creds is None:
+        creds = get_user_credentials(user_email)
+    service = gmail_service(creds)
+
+    message_ids = _list_pdf_message_ids(service, user_email)
+    record_listing(user_email, message_ids)
+    sync_stats = {
+        "messages": 0,
+        "unchanged": 0,
+        "pdf_attachments": 0,
+        "downloaded": 0,
+        "reused": 0,
+        "skipped": 0,
+        "pending": 0,
+        "bytes_downloaded": 0,
+        "bytes_skipped": 0,
     }
-    if (due_dt_str := result.get("due_date")):
+
+    synced = known_message_ids(user_email)
+    new_ids = [m for m in message_ids if m not in synced]
+    sync_stats["unchanged"] = len(message_ids) - len(new_ids)
+    # followers that time out waiting on this sync report these as pending
+    update_sync_progress(user_email, total=len(new_ids), message_ids=new_ids)
+    needs_resume = False
+    pending_ids = []
+    for processed, message_id in enumerate(new_ids, start=1):
         try:
-            dt = datetime.strptime(due_dt_str, "%Y-%m-%d")
-            result["days_left"] = (dt.date() - date.today()).days
-        except Exception:
-            pass
-    return result
+            outcome = _ingest_message(service, user_email, message_id, sync_stats, deadline)
+        except DeadlineExceeded:
+            outcome = "pending"
+            pending_ids.append(message_id)
+        if outcome == "done":
+            mark_message_synced(user_email, message_id)
+        elif outcome == "pending":
+            needs_resume = True
+        if outcome in ("pending", "continuing"):
+            sync_stats["pending"] += 1
+        update_sync_progress(user_email, processed=processed)
+
+    if needs_resume:
+        _background_sync_executor.submit(_resume_sync, user_email, creds)
+
+    # read before the records, so a change landing in between is re-sent rather than missed
+    revision = get_revision(user_email)
+    records = list_records(user_email, message_ids)
+    return {
+        "pdf_attachments": [_record_to_entry(r) for r in records],
+        # messages the budget did not reach at all; they appear once the background pass lands
+        "pending_message_ids": pending_ids,
+        "sync_stats": sync_stats,
+        "revision": revision,
+        "listing_ids": message_ids,
+    }
 
-@router.get("/gmail/list-pdfs")
-def list_pdf_attachments(user_email: str = Query(...)):
+
+def _saved_pdf_path(user_email: str, message_id: str, filename: str) -> Path | None:
     """
-    Lists Gmail messages with PDF attachments for a user and downloads them locally.
-    Files are saved under downloads/{user_email}/ with message_id prefixed to avoid collisions.
+    Resolve a user's attachment to its blob in the store. Files saved by older versions
+    under downloads/{user_email}/ are moved into the store, and attachments skipped during
+    triage are fetched from Gmail on first access. Returns None if the message has no such PDF;
+    only a known, skipped attachment ever costs a Gmail call.
     """
-    creds = get_user_credentials(user_email)
-    service = build('gmail', 'v1', credentials=creds)
+    record = get_record(user_email, message_id, filename)
+    if record and record.get("sha256"):
+        stored_path = blob_path(record["sha256"])
+        if stored_path.exists():
+            return stored_path
 
-    results = service.users().messages().list(
-        userId='me',
-        q="has:attachment filename:pdf"
-    ).execute()
+    legacy_path = _user_download_dir(user_email) / f"{message_id}_{filename}"
+    file_data = None
+    if legacy_path.exists():
+        file_data = legacy_path.read_bytes()
+    elif record and _was_skipped(record):
+        file_data = _fetch_skipped_part(user_email, message_id, filename)
+    if not file_data:
+        return None
 
-    messages = results.get('messages', [])
-    pdfs = []
+    digest = put_blob(file_data)
+    add_reference(user_email, message_id, filename, digest, len(file_data))
+    if legacy_path.exists():
+        legacy_path.unlink()
+    return blob_path(digest)
 
-    # Prepare download directory per user
-    user_dir_safe = user_email.replace("@", "_at_").replace("/", "_")
-    download_dir = Path("downloads") / user_dir_safe
-    download_dir.mkdir(parents=True, exist_ok=True)
-
-    for msg in messages[:20]:  # Limit to latest 100
-        msg_data = service.users().messages().get(userId='me', id=msg['id']).execute()
-        subject = next((h["value"] for h in msg_data.get("payload", {}).get("headers", []) if h["name"] == "Subject"), "No Subject")
-        for part in msg_data.get("payload", {}).get("parts", []):
-            filename = part.get("filename")
-            if filename and filename.lower().endswith(".pdf"):
-                body = part.get("body", {})
-                attachment_id = body.get("attachmentId")
-                saved_path = None
-                parsed_fields = {}
-                password_required = False
-                if attachment_id:
-                    attachment = service.users().messages().attachments().get(
-                        userId='me',
-                        messageId=msg['id'],
-                        id=attachment_id
-                    ).execute()
-                    try:
-                        file_data = base64.urlsafe_b64decode(attachment.get("data", ""))
-                        # Prefix with message id to avoid clashes
-                        dest_path = download_dir / f"{msg['id']}_{filename}"
-                        with open(dest_path, "wb") as f:
-                            f.write(file_data)
-                        saved_path = str(dest_path)
-                        # If looks like credit card, attempt parsing
-                        is_credit = (
-                            ("credit" in subject.lower()) or
-                            ("card" in subject.lower()) or
-                            ("credit" in filename.lower())
-                        )
-                        if is_credit:
-                            read_bytes, pw_required = _try_read_pdf_bytes(file_data)
-                            password_required = pw_required
-                            if read_bytes:
-                                text = _extract_text_from_pdf_bytes(read_bytes)
-                                parsed_fields = _parse_credit_card_fields(text)
-                    except Exception:
-                        saved_path = None
-
-                pdfs.append({
-                    "subject": subject,
-                    "filename": filename,
-                    "message_id": msg['id'],
-                    "saved_path": saved_path,
-                    **({"total_amount_due": parsed_fields.get("total_amount_due") if parsed_fields and parsed_fields.get("total_amount_due") is not None else 0} if is_credit else {}),
-                    **({"minimum_amount_due": parsed_fields.get("minimum_amount_due") if parsed_fields and parsed_fields.get("minimum_amount_due") is not None else 0} if is_credit else {}),
-                    **({"due_date": parsed_fields.get("due_date")} if is_credit and parsed_fields else {}),
-                    **({"days_left": parsed_fields.get("days_left")} if is_credit and parsed_fields else {}),
-                    **({"password_required": password_required} if is_credit and password_required else {}),
-                })
-
-    return {"pdf_attachments": pdfs}
+
+def _was_skipped(record: dict) -> bool:
+    # records from before the flag: a finished record with no blob was skipped at triage
+    return record.get("skipped", not record.get("sha256") and record.get("status", "done") == "done")
+
+
+def _fetch_skipped_part(user_email: str, message_id: str, filename: str) -> bytes | None:
+    """The part's bytes from Gmail, or None if the user is no longer connected or the message is gone."""
+    from googleapiclient.errors import HttpError
+
+    try:
+        creds = get_user_credentials(user_email)
+    except Exception as e:
+        print(f"❌ No Gmail credentials for {user_email}: {e}")
+        return None
+    service = gmail_service(creds)
+    try:
+        msg_data = _triage_message(service, user_email, message_id)
+        for part in iter_pdf_parts(msg_data.get("payload", {})):
+            if pdf_part_filename(part) == filename:
+                return fetch_part_bytes(service, message_id, part, user_email)
+    except HttpError as e:
+        if e.resp.status == 404:
+            return None
+        raise
+    return None
 
 
 @router.get("/gmail/download")
-def download_saved_pdf(user_email: str = Query(...), message_id: str = Query(...), filename: str = Query(...)):
+async def download_saved_pdf(user_email: str = Query(...), message_id: str = Query(...), filename: str = Query(...)):
     """
     Returns a previously saved PDF attachment as a downloadable file.
-    The file is expected at downloads/{sanitized_email}/{message_id}_{filename}.
+    The file is resolved through the blob store, and fetched from Gmail first if the sync skipped it.
     """
-    user_dir_safe = user_email.replace("@", "_at_").replace("/", "_")
-    file_path = Path("downloads") / user_dir_safe / f"{message_id}_{filename}"
-    if not file_path.exists():
+    file_path = await gmail_pool.run(_saved_pdf_path, user_email, message_id, filename)
+    if not file_path:
         raise HTTPException(status_code=404, detail="File not found")
     return FileResponse(path=str(file_path), media_type="application/pdf", filename=filename)
 
 
 @router.post("/gmail/preview")
-def preview_pdf(payload: dict = Body(...)):
+async def preview_pdf(payload: dict = Body(...)):
     """
     Returns the PDF bytes for inline preview. If the PDF is encrypted and a password is provided,
     it will be decrypted on-the-fly. If encrypted and password missing/wrong, returns 401.
@@ -389,11 +634,16 @@ def preview_pdf(payload: dict = Body(...)):
     if not (user_email and message_id and filename):
         raise HTTPException(status_code=400, detail="Missing required fields")
 
-    user_dir_safe = user_email.replace("@", "_at_").replace("/", "_")
-    file_path = Path("downloads") / user_dir_safe / f"{message_id}_{filename}"
-    if not file_path.exists():
+    file_path = await gmail_pool.run(_saved_pdf_path, user_email, message_id, filename)
+    if not file_path:
         raise HTTPException(status_code=404, detail="File not found")
 
+    return await decrypt_pool.run(_preview_response, file_path, filename, password)
+
+
+def _preview_response(file_path: Path, filename: str, password: str | None) -> Response:
+    from PyPDF2 import PdfReader, PdfWriter
+
     with open(file_path, "rb") as f:
         file_bytes = f.read()
 
@@ -413,7 +663,7 @@ def preview_pdf(payload: dict = Body(...)):
             # If no password provided, try common defaults first
             tried_candidates = []
             if not password:
-                candidate_passwords = ["MRIT2607", "mrit2607"]
+                candidate_passwords = DEFAULT_PASSWORDS
                 for candidate in candidate_passwords:
                     temp_reader = PdfReader(io.BytesIO(file_bytes))
                     result = temp_reader.decrypt(candidate)
@@ -439,48 +689,218 @@ def preview_pdf(payload: dict = Body(...)):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+# Renders never change for a given blob, page and width; "private" keeps shared caches out
+RENDER_CACHE_CONTROL = os.getenv("RENDER_CACHE_CONTROL", "private, max-age=604800, immutable")
+
+
+@router.get("/gmail/page-render")
+async def page_render(request: Request,
+                      user_email: str = Query(...), message_id: str = Query(...), filename: str = Query(...),
+                      page: int = Query(1, ge=1), width: int = Query(480, ge=64, le=2048),
+                      format: str = Query("webp", pattern="^(png|webp)$"),
+                      password: str | None = Query(None)):
+    """
+    Returns one page of a saved PDF as a PNG/WebP image scaled to width pixels.
+    Renders are cached on disk by content hash, page and width, and sent with an ETag
+    so browsers revalidate with a 304 instead of downloading the image again.
+    """
+    file_path = await gmail_pool.run(_saved_pdf_path, user_email, message_id, filename)
+    if not file_path:
+        raise HTTPException(status_code=404, detail="File not found")
+
+    # blob files are named by their sha256
+    key = render_key(file_path.name, page, width, format)
+    etag = f'"{key}"'
+    headers = {"ETag": etag, "Cache-Control": RENDER_CACHE_CONTROL}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+
+    return await render_pool.run(_page_render_response, file_path, key, page, width, format, password, headers)
+
+
+def _pdf_unlocks(file_bytes: bytes, password: str | None) -> bool:
+    """True if the PDF is unencrypted or opens with password (or a default one)."""
+    from PyPDF2 import PdfReader
+
+    reader = PdfReader(io.BytesIO(file_bytes))
+    if not reader.is_encrypted:
+        return True
+    candidates = [password] if password else DEFAULT_PASSWORDS
+    return any(PdfReader(io.BytesIO(file_bytes)).decrypt(c) for c in candidates)
+
+
+# Whether a blob opens with a given password never changes; keyed by digest and a hash of the password
+_unlock_cache = cache_namespace("pdf-unlock")
+
+
+def _unlock_key(digest: str, password: str | None) -> str:
+    return f"{digest}:{hashlib.sha256((password or '').encode()).hexdigest()}"
+
+
+def _blob_unlocks(file_path: Path, password: str | None) -> bool:
+    """_pdf_unlocks for a blob, remembered so render-cache hits never open the PDF again."""
+    return _unlock_cache.get_or_compute(_unlock_key(file_path.name, password),
+                                        lambda: _pdf_unlocks(file_path.read_bytes(), password))
+
+
+def _page_render_response(file_path: Path, key: str, page: int, width: int, fmt: str,
+                          password: str | None, headers: dict) -> Response:
+    cached = get_render(key)
+    if cached:
+        # cached renders are decrypted, so the caller must still be able to open the PDF
+        if not _blob_unlocks(file_path, password):
+            raise HTTPException(status_code=401, detail="PASSWORD_INCORRECT" if password else "PASSWORD_REQUIRED")
+        return Response(content=cached.read_bytes(), media_type=RENDER_FORMATS[fmt], headers=headers)
+
+    pdf_bytes, pw_required = try_read_pdf_bytes(file_path.read_bytes(), password)
+    if pdf_bytes is None:
+        if pw_required:
+            raise HTTPException(status_code=401, detail="PASSWORD_INCORRECT" if password else "PASSWORD_REQUIRED")
+        raise HTTPException(status_code=422, detail="Unreadable PDF")
+    _unlock_cache.set(_unlock_key(file_path.name, password), True)
+    try:
+        image = render_page(pdf_bytes, page, width, fmt)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    if image is None:
+        raise HTTPException(status_code=404, detail="Page not found")
+    put_render(key, image)
+    return Response(content=image, media_type=RENDER_FORMATS[fmt], headers=headers)
+
+
+def _decrypt_for_export(file_path: Path) -> bytes | None:
+    """
+    Clear bytes for an encrypted PDF that opens with a default password, else None. Only a
+    PDF whose trailer names an /Encrypt dictionary is read whole, and it is decrypted on
+    decrypt_pool (waiting for a slot, since the response is already streaming).
+    """
+    if not looks_encrypted(file_path):
+        return None
+    return decrypt_pool.call(_decrypt_blob, file_path)
+
+
+def _decrypt_blob(file_path: Path) -> bytes | None:
+    from PyPDF2 import PdfReader
+
+    file_bytes = file_path.read_bytes()
+    try:
+        if not PdfReader(io.BytesIO(file_bytes)).is_encrypted:
+            return None
+    except Exception:
+        return None
+    pdf_bytes, _ = try_read_pdf_bytes(file_bytes)
+    return pdf_bytes
+
+
+@router.get("/gmail/export")
+def export_statements(user_email: str = Query(...),
+                      format: str = Query("zip", pattern="^(zip|jsonl)$"),
+                      message_id: list[str] | None = Query(None),
+                      credit_only: bool = Query(False),
+                      decrypt: bool = Query(False)):
+    """
+    Streams a user's saved statements in one response: a ZIP of the PDFs (decrypted
+    where a default password opens them, if decrypt=true) with statements.jsonl of
+    parsed fields, or just the JSONL. Select messages with repeated message_id params.
+    The body is generated while it is sent, so memory does not grow with the export.
+    """
+    filters = {"is_credit": True} if credit_only else {}
+    records = iter_records(user_email, message_id, **filters)
+    stamp = datetime.utcnow().strftime("%Y%m%d")
+    if format == "jsonl":
+        return StreamingResponse(
+            iter_jsonl(records, _record_to_entry),
+            media_type="application/x-ndjson",
+            headers={"Content-Disposition": f"attachment; filename=statements-{stamp}.jsonl"},
+        )
+    return StreamingResponse(
+        iter_zip(records, _record_to_entry, _decrypt_for_export if decrypt else None),
+        media_type="application/zip",
+        headers={"Content-Disposition": f"attachment; filename=statements-{stamp}.zip"},
+    )
+
+
+def _extract_transactions(user_email: str, message_id: str, filename: str, password: str | None) -> dict:
+    # imported here so pdf2image/pytesseract load only when transactions are requested
+    from app.transactions import extract_and_store_transactions
+
+    file_path = _saved_pdf_path(user_email, message_id, filename)
+    if not file_path:
+        raise HTTPException(status_code=404, detail="File not found")
+    try:
+        count = extract_and_store_transactions(user_email, message_id, filename, file_path.read_bytes(), password)
+    except ValueError:
+        raise HTTPException(status_code=401, detail="PASSWORD_INCORRECT" if password else "PASSWORD_REQUIRED")
+    upsert_record(user_email, message_id, filename, transaction_count=count)
+    forget_context(user_email)
+    return {"message_id": message_id, "filename": filename, "transactions": count}
+
+
+@router.post("/gmail/transactions/extract")
+async def extract_transactions(payload: dict = Body(...)):
+    """
+    Extracts every transaction row (date, description, amount, Dr/Cr) from all pages of a
+    saved statement and stores them. Pages are processed one at a time and rows are written
+    in bulk batches, so long statements run in bounded memory.
+    Expected JSON body: { user_email, message_id, filename, password? }
+    """
+    user_email = payload.get("user_email")
+    message_id = payload.get("message_id")
+    filename = payload.get("filename")
+    if not (user_email and message_id and filename):
+        raise HTTPException(status_code=400, detail="Missing required fields")
+    return await ocr_pool.run(_extract_transactions, user_email, message_id, filename, payload.get("password"))
+
+
+@router.get("/gmail/transactions")
+def get_transactions(user_email: str = Query(...), message_id: str | None = Query(None),
+                     skip: int = Query(0, ge=0), limit: int = Query(500, ge=1, le=5000)):
+    """Stored transaction rows for a user (optionally one statement), oldest first."""
+    from app.transactions import list_transactions
+    return {"transactions": list_transactions(user_email, message_id, skip, limit)}
+
+
 @router.get("/gmail/download-parse-pdf")
-def download_and_parse_pdf(user_email: str, message_id: str, password: str = None):
-    creds = get_user_credentials(user_email)
-    service = build('gmail', 'v1', credentials=creds)
+async def download_and_parse_pdf(user_email: str, message_id: str, password: str = None):
+    return await gmail_pool.run(_download_and_parse_pdf, user_email, message_id, password)
 
-    # Get full message
-    msg = service.users().messages().get(userId='me', id=message_id).execute()
-    parts = msg.get("payload", {}).get("parts", [])
 
-    for part in parts:
-        filename = part.get("filename", "")
-        body = part.get("body", {})
-        attachment_id = body.get("attachmentId")
-        if not attachment_id:
-            continue
+def _read_text_snippet(file_data: bytes, password: str | None) -> str:
+    from PyPDF2 import PdfReader
 
-        attachment = service.users().messages().attachments().get(
-            userId='me',
-            messageId=message_id,
-            id=attachment_id
-        ).execute()
+    reader = PdfReader(io.BytesIO(file_data))
 
-        file_data = base64.urlsafe_b64decode(attachment["data"])
+    if reader.is_encrypted:
+        if not password:
+            raise HTTPException(status_code=400, detail="PDF is encrypted. Please provide password.")
+        reader.decrypt(password)
 
-        try:
-            pdf_stream = io.BytesIO(file_data)
-            reader = PdfReader(pdf_stream)
+    text = ""
+    for page in reader.pages:
+        text += page.extract_text() or ""
+    return text[:2000]  # First 2k chars
 
-            if reader.is_encrypted:
-                if not password:
-                    raise HTTPException(status_code=400, detail="PDF is encrypted. Please provide password.")
-                reader.decrypt(password)
 
-            text = ""
-            for page in reader.pages:
-                text += page.extract_text() or ""
+def _download_and_parse_pdf(user_email: str, message_id: str, password: str | None) -> dict:
+    creds = get_user_credentials(user_email)
+    service = gmail_service(creds)
 
+    # Get full message; small PDFs arrive inline and need no attachment call
+    msg = gmail_execute(service.users().messages().get(userId='me', id=message_id), user_email, "messages.get")
+
+    for part in iter_pdf_parts(msg.get("payload", {})):
+        filename = pdf_part_filename(part)
+        file_data = fetch_part_bytes(service, message_id, part, user_email)
+        if not file_data:
+            continue
+
+        try:
             return {
                 "filename": filename,
-                "parsed_text_snippet": text[:2000]  # First 2k chars
+                "parsed_text_snippet": decrypt_pool.call(_read_text_snippet, file_data, password)
             }
-
+        except HTTPException:
+            raise
         except Exception as e:
             raise HTTPException(status_code=500, detail=str(e))
 
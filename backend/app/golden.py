@@ -0,0 +1,191 @@
+# app/golden.py
+#
+# Golden-set accuracy and latency gate for the statement parsers (run from backend/):
+#   python -m app.golden golden/                        # exit 1 if accuracy or p95 latency regressed
+#   python -m app.golden golden/ --update-baseline      # record the current numbers
+# backend/golden/ is committed: the fixed-date synthetic set from `python -m app.statement_fixtures golden/`
+# and its baseline.json. The baseline covers the text parser only; run with --parsers text,ocr
+# --update-baseline on a machine with poppler and tesseract to gate OCR too. Real labelled PDFs
+# can be added alongside.
+#
+# golden/labels.jsonl holds one line per fixture:
+#   {"file": "x.pdf", "issuer": "hdfc", "total_amount_due": 22838.3, "minimum_amount_due": 1150.0,
+#    "due_date": "2025-09-04", "password": "optional"}
+
+import argparse
+import json
+import math
+import sys
+import time
+from collections import defaultdict
+from pathlib import Path
+
+from app.passwords import candidate_passwords, decrypt_pdf
+
+FIELDS = ("total_amount_due", "minimum_amount_due", "due_date")
+PARSERS = ("text", "ocr")
+# Allowed drift before the gate fails: absolute accuracy points, and relative p95 growth plus a floor
+ACCURACY_TOLERANCE = 0.0
+LATENCY_TOLERANCE = 0.5
+LATENCY_FLOOR_MS = 50.0
+
+
+def _parse_text(file_bytes: bytes, label: dict, filename: str) -> dict:
+    from app.parsing import extract_text_from_pdf_bytes, parse_credit_card_fields
+    from app.issuers import detect_issuer
+
+    clear_bytes, _ = decrypt_pdf(file_bytes, candidate_passwords([label["password"]] if label.get("password") else None))
+    if clear_bytes is None:
+        raise ValueError("PASSWORD_REQUIRED")
+    text = extract_text_from_pdf_bytes(clear_bytes)
+    return parse_credit_card_fields(text, detect_issuer(filename=filename, first_page_text=text))
+
+
+def _parse_ocr(file_bytes: bytes, label: dict, filename: str) -> dict:
+    from app.creditcard_parser import extract_creditcard_data
+    from app.issuers import detect_issuer
+
+    return extract_creditcard_data(file_bytes, bank_hint=detect_issuer(filename=filename), password=label.get("password"))
+
+
+_PARSER_FUNCS = {"text": _parse_text, "ocr": _parse_ocr}
+
+
+def _field_correct(field: str, expected, actual) -> bool:
+    if expected is None:
+        return actual is None
+    if actual is None:
+        return False
+    if field == "due_date":
+        return str(actual) == str(expected)
+    try:
+        return abs(float(actual) - float(expected)) < 0.01
+    except (TypeError, ValueError):
+        return False
+
+
+def _percentile(values: list[float], pct: float) -> float | None:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)]
+
+
+def load_labels(directory: Path) -> list[dict]:
+    with open(directory / "labels.jsonl", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def evaluate(directory: Path, parsers: list[str] = list(PARSERS)) -> dict:
+    """
+    Run each parser over every labelled fixture and report, per parser and per issuer,
+    field and document accuracy plus p50/p95 latency in milliseconds.
+    """
+    labels = load_labels(directory)
+    report = {}
+    for parser in parsers:
+        parse = _PARSER_FUNCS[parser]
+        outcomes = defaultdict(list)
+        if labels:
+            # untimed first run, so lazy imports do not land in one fixture's latency
+            try:
+                parse((directory / labels[0]["file"]).read_bytes(), labels[0], labels[0]["file"])
+            except Exception:
+                pass
+        for label in labels:
+            file_bytes = (directory / label["file"]).read_bytes()
+            started = time.perf_counter()
+            try:
+                result = parse(file_bytes, label, label["file"])
+                error = None
+            except Exception as e:
+                result, error = {}, f"{type(e).__name__}: {e}"
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            correct = {field: _field_correct(field, label.get(field), result.get(field)) for field in FIELDS}
+            outcome = {"file": label["file"], "ms": elapsed_ms, "correct": correct, "error": error}
+            outcomes[label.get("issuer", "generic")].append(outcome)
+            outcomes["all"].append(outcome)
+
+        per_issuer = {}
+        for issuer, rows in sorted(outcomes.items()):
+            latencies = [row["ms"] for row in rows]
+            per_issuer[issuer] = {
+                "documents": len(rows),
+                "accuracy": round(sum(all(row["correct"].values()) for row in rows) / len(rows), 4),
+                "field_accuracy": {
+                    field: round(sum(row["correct"][field] for row in rows) / len(rows), 4) for field in FIELDS
+                },
+                "errors": sum(1 for row in rows if row["error"]),
+                "p50_ms": round(_percentile(latencies, 50), 2),
+                "p95_ms": round(_percentile(latencies, 95), 2),
+                "failures": [row["file"] for row in rows if not all(row["correct"].values())][:20],
+            }
+        report[parser] = per_issuer
+    return report
+
+
+def compare(report: dict, baseline: dict, accuracy_tolerance: float = ACCURACY_TOLERANCE,
+            latency_tolerance: float = LATENCY_TOLERANCE) -> list[str]:
+    """Regressions of report against baseline, for every parser and issuer present in both."""
+    regressions = []
+    for parser, issuers in baseline.items():
+        for issuer, base in issuers.items():
+            current = report.get(parser, {}).get(issuer)
+            if current is None:
+                continue
+            if current["accuracy"] < base["accuracy"] - accuracy_tolerance:
+                regressions.append(f"{parser}/{issuer}: accuracy {base['accuracy']:.2%} -> {current['accuracy']:.2%}")
+            limit = base["p95_ms"] * (1 + latency_tolerance) + LATENCY_FLOOR_MS
+            if current["p95_ms"] > limit:
+                regressions.append(f"{parser}/{issuer}: p95 {base['p95_ms']:.1f} ms -> {current['p95_ms']:.1f} ms (limit {limit:.1f} ms)")
+    return regressions
+
+
+def _print_table(report: dict) -> None:
+    for parser, issuers in report.items():
+        print(f"\n[{parser}]")
+        print(f"  {'issuer':<10}{'docs':>6}{'accuracy':>10}{'total':>8}{'min':>8}{'due':>8}{'p50 ms':>10}{'p95 ms':>10}")
+        for issuer, stats in issuers.items():
+            fa = stats["field_accuracy"]
+            print(f"  {issuer:<10}{stats['documents']:>6}{stats['accuracy']:>10.2%}{fa['total_amount_due']:>8.0%}"
+                  f"{fa['minimum_amount_due']:>8.0%}{fa['due_date']:>8.0%}{stats['p50_ms']:>10.1f}{stats['p95_ms']:>10.1f}")
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m app.golden", description="Golden-set accuracy and latency gate.")
+    parser.add_argument("directory", type=Path)
+    parser.add_argument("--baseline", type=Path, help="defaults to <directory>/baseline.json")
+    parser.add_argument("--parsers", default=",".join(PARSERS), help="comma-separated: text,ocr")
+    parser.add_argument("--update-baseline", action="store_true")
+    parser.add_argument("--accuracy-tolerance", type=float, default=ACCURACY_TOLERANCE)
+    parser.add_argument("--latency-tolerance", type=float, default=LATENCY_TOLERANCE)
+    parser.add_argument("--report", type=Path, help="also write the full report JSON here")
+    args = parser.parse_args(argv)
+
+    parsers = [p for p in args.parsers.split(",") if p in _PARSER_FUNCS]
+    report = evaluate(args.directory, parsers)
+    _print_table(report)
+    if args.report:
+        args.report.write_text(json.dumps(report, indent=2))
+
+    baseline_path = args.baseline or args.directory / "baseline.json"
+    if args.update_baseline:
+        baseline_path.write_text(json.dumps(report, indent=2))
+        print(f"\n📌 Baseline written to {baseline_path}")
+        return 0
+    if not baseline_path.exists():
+        print(f"\n⚠️  No baseline at {baseline_path}; run with --update-baseline first")
+        return 1
+
+    regressions = compare(report, json.loads(baseline_path.read_text()), args.accuracy_tolerance, args.latency_tolerance)
+    if regressions:
+        print("\n❌ Regressions against baseline:")
+        for line in regressions:
+            print(f"  - {line}")
+        return 1
+    print("\n✅ No regressions against baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
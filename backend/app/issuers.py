@@ -0,0 +1,140 @@
+# app/issuers.py
+
+import re
+from typing import Callable
+
+# Bank-specific fingerprints and label tables.
+# "senders" are matched against the From domain, "keywords" against subject,
+# filename and the first page of text. "layout" tells the text-layer extractor
+# whether the summary is printed as a header row with values beneath it or as
+# label/value pairs.
+ISSUERS = {
+    "hdfc": {
+        "senders": ["hdfcbank.net", "hdfcbank.com"],
+        "keywords": ["hdfc bank", "hdfc"],
+        "layout": "header_row",
+        "labels": {
+            "total": ["total amount due", "total due", "amount payable", "total payment due", "total dues"],
+            "minimum": ["minimum amount due", "min due", "minimum payment due"],
+            "duedate": ["payment due date", "due date"],
+        },
+    },
+    "icici": {
+        "senders": ["icicibank.com"],
+        "keywords": ["icici bank", "icici"],
+        "layout": "label",
+        "labels": {
+            "total": ["total amount due", "total payment due", "total amount"],
+            "minimum": ["minimum amount due", "minimum payment due", "minimum payment"],
+            "duedate": ["payment due date", "due date"],
+        },
+    },
+    "axis": {
+        "senders": ["axisbank.com"],
+        "keywords": ["axis bank", "axis"],
+        "layout": "header_row",
+        "labels": {
+            "total": ["total payment due", "amount payable", "total amount due"],
+            "minimum": ["minimum payment due", "minimum due", "minimum amount due"],
+            "duedate": ["payment due date", "due date"],
+        },
+    },
+    "sbi": {
+        "senders": ["sbicard.com"],
+        "keywords": ["sbi card", "sbicard"],
+        "layout": "label",
+        "labels": {
+            "total": ["total amount due", "total outstanding"],
+            "minimum": ["minimum amount due"],
+            "duedate": ["payment due date", "due date"],
+        },
+    },
+    "generic": {
+        "senders": [],
+        "keywords": [],
+        "layout": "label",
+        "labels": {
+            "total": ["total amount due", "total due", "amount due", "total payment due", "amount payable"],
+            "minimum": ["minimum amount due", "minimum due", "minimum payment due"],
+            "duedate": ["due date", "payment due", "payment due date"],
+        },
+    },
+}
+
+# Plain lowercase phrases, used by the OCR extractor for substring matching
+LABELS = {name: profile["labels"] for name, profile in ISSUERS.items()}
+
+
+def _phrase_to_regex(phrase: str) -> re.Pattern:
+    words = [re.escape(w) for w in phrase.split()]
+    return re.compile(r"\b" + r"\s*".join(words) + r"\b", re.IGNORECASE)
+
+
+# Precompiled once at import so per-document extraction never compiles labels
+COMPILED_LABELS = {
+    name: {field: [_phrase_to_regex(p) for p in phrases] for field, phrases in profile["labels"].items()}
+    for name, profile in ISSUERS.items()
+}
+
+_KEYWORD_RES = {
+    name: re.compile(r"\b(?:" + "|".join(re.escape(k) for k in profile["keywords"]) + r")\b", re.IGNORECASE)
+    for name, profile in ISSUERS.items()
+    if profile["keywords"]
+}
+
+_SENDER_DOMAIN_RE = re.compile(r"@([A-Za-z0-9.\-]+)")
+
+
+def _sender_domain(sender: str) -> str:
+    m = _SENDER_DOMAIN_RE.search(sender or "")
+    return m.group(1).lower() if m else ""
+
+
+def detect_issuer(sender: str = "", subject: str = "", filename: str = "", first_page_text: str = "") -> str:
+    """
+    Identify the card issuer, cheapest signal first:
+    sender domain, then subject/filename keywords, then the head of the first page.
+    Returns an ISSUERS key, "generic" when nothing matches.
+    """
+    domain = _sender_domain(sender)
+    if domain:
+        for name, profile in ISSUERS.items():
+            if any(domain == d or domain.endswith("." + d) for d in profile["senders"]):
+                return name
+
+    for haystack in (f"{subject} {filename}", (first_page_text or "")[:2000]):
+        if not haystack.strip():
+            continue
+        for name, keyword_re in _KEYWORD_RES.items():
+            if keyword_re.search(haystack):
+                return name
+
+    return "generic"
+
+
+_STATEMENT_KEYWORD_RE = re.compile(r"statement|credit|card|e-?stmt|bill", re.IGNORECASE)
+
+
+def is_likely_statement(sender: str = "", subject: str = "", filename: str = "") -> bool:
+    """Cheap triage from message metadata: known issuer sender, or statement words in subject/filename."""
+    if detect_issuer(sender, subject, filename) != "generic":
+        return True
+    return bool(_STATEMENT_KEYWORD_RE.search(f"{subject} {filename}"))
+
+
+# ---------------- Extractor plugin registry ----------------
+# Maps issuer name -> callable(StatementDocument, issuer) -> {"total_amount_due", "minimum_amount_due", "due_date"}
+_EXTRACTORS: dict[str, Callable] = {}
+
+
+def register_extractor(issuer: str):
+    """Decorator registering a text-layer extractor for one issuer."""
+    def decorator(fn: Callable) -> Callable:
+        _EXTRACTORS[issuer] = fn
+        return fn
+    return decorator
+
+
+def get_extractor(issuer: str) -> Callable:
+    """Return the extractor registered for issuer, falling back to the generic one."""
+    return _EXTRACTORS.get(issuer) or _EXTRACTORS["generic"]
@@ -1,9 +1,8 @@
 # test_parser.py
 
 from pathlib import Path
-# from app.creditcard_parser import extract_creditcard_data
-# jrb_test.py
-from creditcard_parser import extract_creditcard_data   # ✅ no "app." prefix
+# jrb_test.py  (run from backend/: python -m app.jrb_test)
+from app.creditcard_parser import extract_creditcard_data
 
 
 pdf_path = Path("/Users/mrityunjay.tiwari/Desktop/MAHADEV/jrb_credit_card/backe/downloads/m.tiwari9889_at_gmail.com/198ae87f73fea86f_Credit Card Statement.pdf")
@@ -11,7 +10,7 @@ pdf_path = Path("/Users/mrityunjay.tiwari/Desktop/MAHADEV/jrb_credit_card/backe/
 with open(pdf_path, "rb") as f:
     pdf_bytes = f.read()
 
-# You can pass bank_hint="hdfc", "icici", or "generic"
+# You can pass bank_hint="hdfc", "icici", "axis", "sbi" or "generic" (see app/issuers.py)
 result = extract_creditcard_data(pdf_bytes, bank_hint="generic")
 
 
@@ -0,0 +1,81 @@
+# app/llm_stub.py
+#
+# A stand-in OpenAI-compatible model server for exercising /chat locally (run from backend/):
+#   python -m app.llm_stub --port 8087 --delay 0.05
+# It answers POST /v1/chat/completions by echoing the question and the size of the system
+# context, word by word when stream=true. GET /stats reports how many completions it served.
+
+import argparse
+import json
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class StubModelHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    delay = 0.0
+    completions = 0
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status: int, body: dict) -> None:
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if self.path == "/stats":
+            self._send_json(200, {"completions": StubModelHandler.completions})
+        else:
+            self._send_json(404, {"error": "not found"})
+
+    def do_POST(self):
+        if not self.path.endswith("/chat/completions"):
+            self._send_json(404, {"error": "not found"})
+            return
+        request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        StubModelHandler.completions += 1
+        messages = request.get("messages", [])
+        context = next((m["content"] for m in messages if m.get("role") == "system"), "")
+        question = next((m["content"] for m in reversed(messages) if m.get("role") == "user"), "")
+        reply = f"Stub answer to: {question} (context {len(context)} chars, {context.count(chr(10) + '- ')} statements)"
+
+        if not request.get("stream"):
+            self._send_json(200, {"choices": [{"index": 0, "message": {"role": "assistant", "content": reply}, "finish_reason": "stop"}]})
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        words = reply.split(" ")
+        for i, word in enumerate(words):
+            chunk = {"choices": [{"index": 0, "delta": {"content": word if i == 0 else " " + word}}]}
+            self._write_chunk(f"data: {json.dumps(chunk)}\n\n".encode())
+            time.sleep(self.delay)
+        self._write_chunk(b"data: [DONE]\n\n")
+        self._write_chunk(b"")
+
+    def _write_chunk(self, data: bytes) -> None:
+        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+
+def serve(host: str = "127.0.0.1", port: int = 8087, delay: float = 0.0) -> ThreadingHTTPServer:
+    """A started-on-demand stub server; call serve_forever() (or run it in a thread)."""
+    StubModelHandler.delay = delay
+    return ThreadingHTTPServer((host, port), StubModelHandler)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(prog="python -m app.llm_stub")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8087)
+    parser.add_argument("--delay", type=float, default=0.0, help="seconds between streamed words")
+    args = parser.parse_args()
+    server = serve(args.host, args.port, args.delay)
+    print(f"🤖 Stub model server on http://{args.host}:{args.port}/v1")
+    server.serve_forever()
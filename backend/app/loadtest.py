@@ -0,0 +1,335 @@
+# app/loadtest.py
+#
+# Drive simulated users through the real app against the fake Gmail server (run from backend/, with MONGO_URI set):
+#   python -m app.loadtest --users 50 --concurrency 16 --rounds 3 --latency 0.05 --error-rate 0.02 --page-size 10
+# The simulated users (token documents, everything the run stores for them, their blobs, sidecars,
+# download dirs and shared-cache entries) are deleted when the run ends; pass --keep-users to
+# inspect them afterwards.
+# By default the fake Gmail server and the driver run in this process and the app runs in a child
+# uvicorn process, so the memory figures are the app's alone and the app does not share a GIL with
+# the load it is measured under. To load an app you started yourself (with GMAIL_API_ROOT pointing
+# at `python -m app.fake_gmail`), pass --app-url, --gmail-url and --app-pid.
+#
+# Each user, each round: GET /gmail/list-pdfs, then POST /gmail/preview and GET /gmail/download for
+# up to --files-per-user of the PDFs it returned. Reports throughput, latency percentiles per
+# endpoint, status counts, and resident memory.
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from app.golden import _percentile
+
+USER_TEMPLATE = "loadtest-{:04d}@example.com"
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _rss_mb(pid: int) -> tuple[float | None, float | None]:
+    """(current, peak) resident set size of pid in MB, from /proc."""
+    try:
+        status = Path(f"/proc/{pid}/status").read_text()
+    except OSError:
+        return None, None
+    values = {}
+    for line in status.splitlines():
+        key, _, rest = line.partition(":")
+        if key in ("VmRSS", "VmHWM"):
+            values[key] = int(rest.split()[0]) / 1024
+    return values.get("VmRSS"), values.get("VmHWM")
+
+
+class _MemorySampler(threading.Thread):
+    def __init__(self, pid: int, every: float = 0.5):
+        super().__init__(daemon=True)
+        self.pid = pid
+        self.every = every
+        self.samples: list[float] = []
+        self._done = threading.Event()
+
+    def run(self):
+        while not self._done.is_set():
+            rss, _ = _rss_mb(self.pid)
+            if rss is not None:
+                self.samples.append(rss)
+            self._done.wait(self.every)
+
+    def stop(self) -> dict:
+        self._done.set()
+        self.join()
+        rss, peak = _rss_mb(self.pid)
+        return {
+            "pid": self.pid,
+            "rss_start_mb": round(self.samples[0], 1) if self.samples else None,
+            "rss_end_mb": round(rss, 1) if rss else None,
+            "rss_max_sampled_mb": round(max(self.samples), 1) if self.samples else None,
+            "rss_peak_mb": round(peak, 1) if peak else None,
+        }
+
+
+class LoadDriver:
+    """Runs user scenarios on a thread pool and records (endpoint, status, seconds) per request."""
+
+    def __init__(self, app_url: str, files_per_user: int, timeout: float):
+        self.app_url = app_url.rstrip("/")
+        self.files_per_user = files_per_user
+        self.timeout = timeout
+        self.latencies = defaultdict(list)
+        self.statuses = defaultdict(Counter)
+        self.bytes_received = 0
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def _session(self):
+        session = getattr(self._local, "session", None)
+        if session is None:
+            import requests
+            session = self._local.session = requests.Session()
+        return session
+
+    def _call(self, endpoint: str, method: str, path: str, **kwargs):
+        import requests
+
+        started = time.perf_counter()
+        try:
+            resp = self._session().request(method, self.app_url + path, timeout=self.timeout, **kwargs)
+            status, size = resp.status_code, len(resp.content)
+        except requests.RequestException as e:
+            resp, status, size = None, type(e).__name__, 0
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            self.latencies[endpoint].append(elapsed)
+            self.statuses[endpoint][str(status)] += 1
+            self.bytes_received += size
+        return resp
+
+    def user_round(self, email: str, refresh: bool) -> None:
+        resp = self._call("list-pdfs", "GET", "/gmail/list-pdfs", params={"user_email": email, "refresh": str(refresh).lower()})
+        if resp is None or resp.status_code != 200:
+            return
+        files = [f for f in resp.json().get("pdf_attachments", []) if f.get("saved_path")][:self.files_per_user]
+        for entry in files:
+            self._call("preview", "POST", "/gmail/preview",
+                       json={"user_email": email, "message_id": entry["message_id"], "filename": entry["filename"]})
+            self._call("download", "GET", "/gmail/download",
+                       params={"user_email": email, "message_id": entry["message_id"], "filename": entry["filename"]})
+
+    def run(self, users: list[str], rounds: int, concurrency: int, refresh_every_round: bool) -> float:
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="load") as pool:
+            for round_number in range(rounds):
+                refresh = refresh_every_round and round_number > 0
+                list(pool.map(lambda email: self.user_round(email, refresh), users))
+                print(f"⏱️  Round {round_number + 1}/{rounds} done at {time.perf_counter() - started:.1f}s", file=sys.stderr)
+        return time.perf_counter() - started
+
+    def report(self, elapsed: float) -> dict:
+        endpoints = {}
+        for endpoint, values in sorted(self.latencies.items()):
+            endpoints[endpoint] = {
+                "requests": len(values),
+                "statuses": dict(self.statuses[endpoint]),
+                "mean_ms": round(sum(values) / len(values) * 1000, 1),
+                **{f"p{pct}_ms": round(_percentile(values, pct) * 1000, 1) for pct in (50, 90, 95, 99)},
+                "max_ms": round(max(values) * 1000, 1),
+            }
+        total = sum(len(v) for v in self.latencies.values())
+        ok = sum(c.get("200", 0) for c in self.statuses.values())
+        return {
+            "seconds": round(elapsed, 2),
+            "requests": total,
+            "ok": ok,
+            "requests_per_second": round(total / elapsed, 2) if elapsed else None,
+            "mb_received": round(self.bytes_received / 1e6, 2),
+            "endpoints": endpoints,
+        }
+
+
+def _start_fake_gmail(args) -> str:
+    from app.fake_gmail import FakeGmail, serve
+
+    fake = FakeGmail(args.messages, args.seed, args.latency, args.error_rate, args.page_size, args.encrypted_ratio)
+    server = serve(fake, "127.0.0.1", _free_port())
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{server.server_address[1]}/"
+
+
+def _start_app(gmail_url: str, timeout: float = 60.0) -> subprocess.Popen:
+    """Start the app under uvicorn in a child process; returns once its /ready answers 200."""
+    import requests
+
+    port = _free_port()
+    env = {
+        **os.environ,
+        "GMAIL_API_ROOT": gmail_url,
+        # the schedulers would sync every stored account (not just the simulated ones) and skew the numbers
+        "SYNC_SCHEDULER_ENABLED": "0",
+        "REMINDER_SCHEDULER_ENABLED": "0",
+    }
+    proc = subprocess.Popen([sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1",
+                             "--port", str(port), "--log-level", "warning"], env=env)
+    proc.url = f"http://127.0.0.1:{port}"
+    started = time.monotonic()
+    while time.monotonic() - started < timeout:
+        if proc.poll() is not None:
+            raise RuntimeError(f"app exited with status {proc.returncode} before it was ready")
+        try:
+            if requests.get(proc.url + "/ready", timeout=2).status_code == 200:
+                return proc
+        except requests.RequestException:
+            pass
+        time.sleep(0.2)
+    _stop_app(proc)
+    raise RuntimeError(f"app not ready after {timeout:.0f}s (is MONGO_URI reachable?)")
+
+
+def _stop_app(proc: subprocess.Popen) -> None:
+    proc.terminate()
+    try:
+        proc.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+        proc.wait()
+
+
+def seed_users(count: int) -> list[str]:
+    """Token documents for count simulated users; the fake Gmail server reads the mailbox from the token."""
+    from app.db import tokens_collection
+    from app.fake_gmail import TOKEN_PREFIX
+
+    users = [USER_TEMPLATE.format(i) for i in range(count)]
+    for email in users:
+        tokens_collection.update_one(
+            {"email": email},
+            {"$set": {"access_token": TOKEN_PREFIX + email, "refresh_token": "loadtest", "expiry": None}},
+            upsert=True,
+        )
+    return users
+
+
+def remove_users(users: list[str]) -> int:
+    """
+    Delete the simulated users' tokens and everything the run stored for them: records, sync
+    state, transactions, aggregates, shared-cache entries, legacy download dirs, and blobs (with
+    their sidecars) no remaining record points at. Returns tokens removed.
+    """
+    from app.db import (tokens_collection, attachments_collection, sync_state_collection,
+                        transactions_collection, aggregates_collection)
+    from app.blob_store import delete_blob
+
+    query = {"email": {"$in": users}}
+    records = list(attachments_collection.find(query, {"email": 1, "message_id": 1, "sha256": 1, "issuer": 1}))
+    states = list(sync_state_collection.find(query, {"email": 1, "message_ids": 1, "listing_ids": 1}))
+    _forget_cached(users, records, states)
+    for collection in (attachments_collection, sync_state_collection, transactions_collection, aggregates_collection):
+        collection.delete_many(query)
+    for digest in {r["sha256"] for r in records if r.get("sha256")}:
+        # blobs are shared by content, so another user's record may still need this one
+        if attachments_collection.find_one({"sha256": digest}, {"_id": 1}) is None:
+            delete_blob(digest)
+    for email in users:
+        shutil.rmtree(Path("downloads") / email.replace("@", "_at_").replace("/", "_"), ignore_errors=True)
+    return tokens_collection.delete_many(query).deleted_count
+
+
+def _forget_cached(users: list[str], records: list[dict], states: list[dict]) -> None:
+    """Drop the shared-cache entries the app keyed by these users, their messages or their PDFs."""
+    from app.blob_store import blob_path
+    from app.cache import cache_namespace, content_key
+
+    for name in ("list-pdfs", "chat-context"):
+        namespace = cache_namespace(name)
+        for email in users:
+            namespace.delete(email)
+    triage = cache_namespace("gmail-triage")
+    messages = {(r["email"], r["message_id"]) for r in records}
+    for state in states:
+        messages.update((state["email"], m) for m in state.get("message_ids", []) + state.get("listing_ids", []))
+    for email, message_id in messages:
+        triage.delete(f"{email}:{message_id}")
+    text, ocr, unlock = cache_namespace("pdf-text"), cache_namespace("pdf-ocr"), cache_namespace("pdf-unlock")
+    no_password = hashlib.sha256(b"").hexdigest()
+    for record in records:
+        digest = record.get("sha256")
+        if not digest or not blob_path(digest).exists():
+            continue
+        data = blob_path(digest).read_bytes()
+        text.delete(content_key(data))
+        ocr.delete(content_key(data, record.get("issuer") or "generic"))
+        unlock.delete(f"{digest}:{no_password}")
+
+
+def _gmail_stats(gmail_url: str) -> dict | None:
+    import requests
+    try:
+        return requests.get(gmail_url.rstrip("/") + "/_stats", timeout=5).json()
+    except (requests.RequestException, ValueError):
+        return None
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m app.loadtest", description="Load-test the app against a fake Gmail server.")
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--rounds", type=int, default=2)
+    parser.add_argument("--files-per-user", type=int, default=3)
+    parser.add_argument("--refresh", action="store_true", help="force a Gmail re-sync on every round after the first")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--app-url", help="load a running app instead of starting one in a child process")
+    parser.add_argument("--app-pid", type=int, help="pid of the running app, for memory figures")
+    parser.add_argument("--gmail-url", help="a running fake Gmail server instead of starting one")
+    parser.add_argument("--messages", type=int, default=30, help="messages per fake mailbox")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--latency", type=float, default=0.02, help="mean seconds added to each Gmail call")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of Gmail calls answered with 429")
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("--encrypted-ratio", type=float, default=0.3)
+    parser.add_argument("--report", type=Path, help="also write the report JSON here")
+    parser.add_argument("--keep-users", action="store_true", help="leave the simulated users in Mongo after the run")
+    args = parser.parse_args(argv)
+
+    gmail_url = args.gmail_url or _start_fake_gmail(args)
+    app_proc = None if args.app_url else _start_app(gmail_url)
+    app_url = args.app_url or app_proc.url
+    app_pid = args.app_pid or (app_proc.pid if app_proc else None)
+    users = seed_users(args.users)
+    print(f"🚀 {len(users)} users x {args.rounds} rounds against {app_url} (Gmail at {gmail_url})", file=sys.stderr)
+
+    sampler = _MemorySampler(app_pid) if app_pid else None
+    if sampler:
+        sampler.start()
+    try:
+        driver = LoadDriver(app_url, args.files_per_user, args.timeout)
+        elapsed = driver.run(users, args.rounds, args.concurrency, args.refresh)
+        report = driver.report(elapsed)
+        report["memory"] = sampler.stop() if sampler else None
+        report["gmail"] = _gmail_stats(gmail_url)
+    finally:
+        if app_proc:
+            _stop_app(app_proc)
+        if not args.keep_users:
+            print(f"🧹 Removed {remove_users(users)} simulated users", file=sys.stderr)
+    report["config"] = {k: v for k, v in vars(args).items() if k != "report" and v is not None}
+
+    print(json.dumps(report, indent=2, default=str))
+    if args.report:
+        args.report.write_text(json.dumps(report, indent=2, default=str))
+    return 0 if report["ok"] == report["requests"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
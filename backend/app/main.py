@@ -1,9 +1,40 @@
+from contextlib import asynccontextmanager
+
+import asyncio
+
 from fastapi import FastAPI
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from app.auth import router as auth_router
 from app.gmail_routes import router as gmail_router 
+from app.chat import router as chat_router
+from app.scheduler import sync_scheduler, SYNC_SCHEDULER_ENABLED
+from app.admission import Saturated, saturated_handler, pool_stats
+from app.reminders import reminder_scheduler, REMINDER_SCHEDULER_ENABLED
+from app.db import get_client, close_client, client_ready
+from app.cache import cache_backend
+from app.subsystems import warm_in_background, status as subsystem_status
+
+READY_TIMEOUT_SECONDS = 2.0
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # one MongoClient per process; it connects in the background, so boot never blocks on Mongo
+    get_client()
+    warm_in_background()
+    if SYNC_SCHEDULER_ENABLED:
+        sync_scheduler.start()
+    if REMINDER_SCHEDULER_ENABLED:
+        reminder_scheduler.start()
+    yield
+    sync_scheduler.stop()
+    reminder_scheduler.stop()
+    close_client()
 
-app = FastAPI()
+
+app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -13,5 +44,47 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+app.add_exception_handler(Saturated, saturated_handler)
+
 app.include_router(auth_router)
 app.include_router(gmail_router)
+app.include_router(chat_router)
+
+
+@app.get("/metrics/queues")
+def queue_metrics():
+    """Queue depth and activity gauges for the heavy-work pools."""
+    return pool_stats()
+
+
+@app.get("/metrics/reminders")
+def reminder_metrics():
+    """Pending and fired due-date reminders in this process."""
+    return reminder_scheduler.stats()
+
+
+@app.get("/metrics/cache")
+def cache_metrics():
+    """Entries and hit counts for this worker's memory tier and the shared cache file."""
+    return cache_backend.stats()
+
+
+def _ping_mongo() -> None:
+    get_client().admin.command("ping")
+
+
+@app.get("/ready")
+async def ready():
+    """
+    Readiness probe: 200 once Mongo answers, 503 otherwise. Also reports which lazily
+    loaded subsystems (Gmail, OAuth, PDF, OCR) are already warm in this worker.
+    """
+    mongo = {"connected": client_ready()}
+    try:
+        await asyncio.wait_for(run_in_threadpool(_ping_mongo), READY_TIMEOUT_SECONDS)
+        mongo["reachable"] = True
+    except Exception as e:
+        mongo["reachable"] = False
+        mongo["error"] = str(e) or type(e).__name__
+    body = {"ready": mongo["reachable"], "mongo": mongo, "subsystems": subsystem_status()}
+    return JSONResponse(status_code=200 if body["ready"] else 503, content=body)
@@ -0,0 +1,270 @@
+# app/parsing.py
+#
+# Statement parsing shared by ingestion (app.gmail_routes) and the offline tools
+# (batch_parse, golden, reparse): decrypt, pull the text layer, OCR scanned statements,
+# and extract the card fields.
+
+import io
+import os
+import re
+from datetime import datetime, date
+from functools import lru_cache
+
+from app.cache import cache_namespace, content_key
+from app.issuers import ISSUERS, COMPILED_LABELS, register_extractor, get_extractor
+from app.passwords import DEFAULT_PASSWORDS, decrypt_pdf
+from app.sidecars import has_sidecar, put_ocr_words
+from app.statement_document import StatementDocument, DATE_TOKEN_RE, parse_date_token
+
+
+def try_read_pdf_bytes(file_bytes: bytes, password: str | None = None) -> tuple[bytes | None, bool]:
+    """Attempt to read and (if needed) decrypt a PDF. Returns (pdf_bytes, password_required)."""
+    try:
+        clear_bytes, _ = decrypt_pdf(file_bytes, [password] if password else DEFAULT_PASSWORDS)
+    except Exception:
+        return None, False
+    # no password opened it
+    return clear_bytes, clear_bytes is None
+
+def extract_text_from_pdf_bytes(pdf_bytes: bytes, max_pages: int = 3) -> str:
+    from PyPDF2 import PdfReader
+
+    try:
+        reader = PdfReader(io.BytesIO(pdf_bytes))
+        text = ""
+        for idx, page in enumerate(reader.pages):
+            if idx >= max_pages:
+                break
+            text += page.extract_text() or ""
+        return text
+    except Exception:
+        return ""
+
+# Parse results are keyed by the PDF's sha256, so every worker process shares them
+_text_cache = cache_namespace("pdf-text")
+_ocr_cache = cache_namespace("pdf-ocr")
+
+
+def decrypt_and_extract_text(file_bytes: bytes) -> tuple[str | None, bool]:
+    """Decrypt (trying defaults) and pull the text layer. Returns (text, password_required)."""
+    def extract():
+        read_bytes, pw_required = try_read_pdf_bytes(file_bytes)
+        if not read_bytes:
+            return None, pw_required
+        return extract_text_from_pdf_bytes(read_bytes), False
+    return _text_cache.get_or_compute(content_key(file_bytes), extract)
+
+
+# Scanned statements have no text layer; OCR them instead
+OCR_FALLBACK_ENABLED = os.getenv("OCR_FALLBACK_ENABLED", "1") == "1"
+
+
+def ocr_statement_fields(file_bytes: bytes, issuer: str, digest: str | None = None) -> dict:
+    """OCR the statement's fields. With the blob digest, the OCR words are also kept as a sidecar for re-parses."""
+    key = content_key(file_bytes, issuer)
+    # a cached result is only enough once the words it came from are on disk
+    if digest is None or has_sidecar(digest, "ocr"):
+        cached = _ocr_cache.get(key)
+        if cached is not None:
+            return dict(cached)
+    # imported here so pdf2image/pytesseract load only when a scanned statement shows up
+    from app.creditcard_parser import extract_creditcard_data
+    words = {}
+    fields = extract_creditcard_data(file_bytes, bank_hint=issuer, words_out=words)
+    if digest and words:
+        put_ocr_words(digest, dict(words))
+    # an all-empty result usually means OCR itself failed; leave it uncached so a retry runs again
+    if any(value is not None for value in fields.values()):
+        _ocr_cache.set(key, fields)
+    return fields
+
+# Amount patterns (inline "label: amount" matching; line tokens live in StatementDocument)
+_amount_core_pattern = r"(?:[₹Rr][sS]?\.?\s*)?([0-9]{1,3}(?:,[0-9]{3})*(?:\.[0-9]{1,2})?|[0-9]+(?:\.[0-9]{1,2})?)\s*(?:Dr|Cr)?"
+# Strict: must contain a comma group or a decimal
+_amount_core_pattern_strict = r"(?:[₹Rr][sS]?\.?\s*)?((?:[0-9]{1,3}(?:,[0-9]{3})+(?:\.[0-9]{1,2})?)|(?:[0-9]+\.[0-9]{1,2}))\s*(?:Dr|Cr)?"
+
+
+def _label_re(label: str | re.Pattern) -> re.Pattern:
+    """Labels are either raw regex strings or precompiled issuer patterns."""
+    if isinstance(label, re.Pattern):
+        return label
+    return re.compile(rf"\b{label}\b", re.IGNORECASE)
+
+
+@lru_cache(maxsize=256)
+def _inline_amount_res(label_src: str) -> tuple[re.Pattern, re.Pattern]:
+    return (
+        re.compile(rf"{label_src}\s*[:\-]?\s*{_amount_core_pattern_strict}", re.IGNORECASE),
+        re.compile(rf"{label_src}\s*[:\-]?\s*{_amount_core_pattern}", re.IGNORECASE),
+    )
+
+
+def _parse_table_row_if_present(doc: StatementDocument) -> dict | None:
+    """
+    Try to detect a header row like:
+      Total Amount Due | Minimum Payment Due | Payment Due Date
+    and read the next block of lines to extract values.
+    """
+    for i, header in enumerate(doc.lower_lines):
+        # look for headers that include words for total & minimum & due date
+        if ("total" in header and ("amount" in header or "payment" in header)) and ("minimum" in header or "min" in header) and ("due" in header):
+            # take a small block after the header (some statements place values in the next 1-4 lines or columns)
+            # strict amount extraction first
+            amounts = doc.amounts(i + 1, i + 6, strict=True)
+            if len(amounts) < 2:
+                amounts = doc.amounts(i + 1, i + 6, strict=False)
+            # the due date comes from the value row under the header only; lines further down
+            # are usually the transaction table, whose dates would win otherwise
+            value_row = next((j for j in range(i + 1, min(i + 6, len(doc.lower_lines)))
+                              if doc.amounts(j, j + 1, strict=False) or doc.dates(j, j + 1)), None)
+            dates = doc.dates(value_row, value_row + 1) if value_row is not None else []
+            total_due = None
+            min_due = None
+            due_dt = None
+            if len(amounts) >= 1:
+                total_due = amounts[0]
+            if len(amounts) >= 2:
+                min_due = amounts[1]
+            # choose a sensible date candidate - often the payment due date is present in the block
+            if dates:
+                # prefer the last date on the row (often due date in rightmost column)
+                due_dt = parse_date_token(dates[-1])
+            if total_due is not None or min_due is not None or due_dt is not None:
+                return {
+                    "total_amount_due": total_due,
+                    "minimum_amount_due": min_due,
+                    "due_date": due_dt.strftime("%Y-%m-%d") if due_dt else None,
+                }
+    return None
+
+
+def _extract_amount_near_label(doc: StatementDocument, label_variants: list, fallback_to_largest: bool = True) -> float | None:
+    """
+    Improved approach:
+    - Find a line matching the label.
+    - Search the same line and the next up-to-5 lines for strict amounts first, then fallback to loose.
+    - If nothing found, search the whole document for 'label' as inline pattern.
+    - Final fallback: return the largest currency-like amount in the top portion of the doc
+      (skipped for issuer-specific extractors, which trust their own labels).
+    """
+    for label in label_variants:
+        for i in doc.find_label(_label_re(label)):
+            # scan this line + a small window below (accounts for column layout where value sits below header)
+            amounts = doc.amounts(i, i + 6, strict=True) or doc.amounts(i, i + 6, strict=False)
+            if amounts:
+                return amounts[0]
+            # also try a small window above (sometimes label and value are above/below)
+            amounts = doc.amounts(i - 3, i + 1, strict=True) or doc.amounts(i - 3, i + 1, strict=False)
+            if amounts:
+                return amounts[0]
+    # next try inline patterns (same-line patterns across the whole text)
+    for label in label_variants:
+        for regex in _inline_amount_res(_label_re(label).pattern):
+            m = regex.search(doc.text)
+            if m:
+                try:
+                    return float(m.group(1).replace(",", ""))
+                except Exception:
+                    pass
+    if not fallback_to_largest:
+        return None
+    # Final fallback: the largest amount in the top of the doc (big printed totals are usually the largest value)
+    all_amounts = doc.head_amounts(5000)
+    if all_amounts:
+        # return the largest sensible amount (likely the total)
+        return max(all_amounts)
+    return None
+
+
+def _extract_date_near_label(doc: StatementDocument, label_variants: list) -> datetime | None:
+    """
+    Look for the given label and then search a few lines around it for date tokens.
+    Fall back to inline search.
+    """
+    for label in label_variants:
+        for i in doc.find_label(_label_re(label)):
+            # search the line and nearby lines for date tokens
+            dates = doc.dates(i - 2, i + 6)
+            if dates:
+                parsed = parse_date_token(dates[0])
+                if parsed:
+                    return parsed
+    # inline fallback
+    label_alternation = "|".join(l.pattern if isinstance(l, re.Pattern) else re.escape(l) for l in label_variants)
+    if re.search(rf"({label_alternation}).{{0,60}}{DATE_TOKEN_RE.pattern}", doc.text, re.IGNORECASE):
+        # safer: take the first date token in the entire doc
+        cand = doc.first_date()
+        if cand:
+            return parse_date_token(cand)
+    return None
+
+
+@register_extractor("generic")
+def _extract_generic_fields(doc: StatementDocument, issuer: str = "generic") -> dict:
+    """Full heuristic cascade for statements from unknown issuers."""
+    # First, try header-row mapping approach
+    header_result = _parse_table_row_if_present(doc)
+    if header_result:
+        return header_result
+    # Fallback to label-near parsing
+    total_due = _extract_amount_near_label(doc, [
+        r"Total\s*Payment\s*Due",
+        r"Total\s*Amount\s*Due",
+        r"Amount\s*Due",
+        r"Total\s*Due",
+    ])
+    min_due = _extract_amount_near_label(doc, [
+        r"Minimum\s*Payment\s*Due",
+        r"Minimum\s*Amount\s*Due",
+        r"Min\.?\s*Amt\.?\s*Due",
+        r"Minimum\s*Due",
+    ])
+    # specifically target Payment Due Date; avoid Statement Period
+    due_dt = _extract_date_near_label(doc, [
+        r"Payment\s*Due\s*Date",
+        r"Due\s*Date"
+    ])
+    return {
+        "total_amount_due": total_due,
+        "minimum_amount_due": min_due,
+        "due_date": due_dt.strftime("%Y-%m-%d") if due_dt else None,
+    }
+
+
+def _extract_issuer_fields(doc: StatementDocument, issuer: str) -> dict:
+    """Targeted extractor: one issuer's precompiled labels and its known layout only."""
+    labels = COMPILED_LABELS[issuer]
+    result = {"total_amount_due": None, "minimum_amount_due": None, "due_date": None}
+    if ISSUERS[issuer]["layout"] == "header_row":
+        result.update(_parse_table_row_if_present(doc) or {})
+    if result["total_amount_due"] is None:
+        result["total_amount_due"] = _extract_amount_near_label(doc, labels["total"], fallback_to_largest=False)
+    if result["minimum_amount_due"] is None:
+        result["minimum_amount_due"] = _extract_amount_near_label(doc, labels["minimum"], fallback_to_largest=False)
+    if result["due_date"] is None:
+        due_dt = _extract_date_near_label(doc, labels["duedate"])
+        result["due_date"] = due_dt.strftime("%Y-%m-%d") if due_dt else None
+    return result
+
+
+for _issuer in ISSUERS:
+    if _issuer != "generic":
+        register_extractor(_issuer)(_extract_issuer_fields)
+
+
+def parse_credit_card_fields(text: str | StatementDocument, issuer: str = "generic") -> dict:
+    doc = text if isinstance(text, StatementDocument) else StatementDocument(text)
+    fields = get_extractor(issuer)(doc, issuer)
+    result = {
+        "total_amount_due": fields.get("total_amount_due"),
+        "minimum_amount_due": fields.get("minimum_amount_due"),
+        "due_date": fields.get("due_date"),
+        "days_left": None
+    }
+    if (due_dt_str := result.get("due_date")):
+        try:
+            dt = datetime.strptime(due_dt_str, "%Y-%m-%d")
+            result["days_left"] = (dt.date() - date.today()).days
+        except Exception:
+            pass
+    return result
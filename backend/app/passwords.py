@@ -0,0 +1,92 @@
+# app/passwords.py
+
+import io
+import re
+from datetime import datetime
+from pathlib import Path
+
+# Passwords the app has always tried for statements nobody supplied one for
+DEFAULT_PASSWORDS = ["MRIT2607", "mrit2607"]
+
+# An encrypted PDF names its /Encrypt dictionary in the trailer: at the end of the file, or
+# near the start for a linearized one
+_TRAILER_SCAN_BYTES = 64 * 1024
+
+_DOB_FORMATS = ["%Y-%m-%d", "%d-%m-%Y", "%d/%m/%Y", "%d%m%Y", "%d-%m-%y", "%d/%m/%y"]
+
+
+def _parse_dob(dob: str | None) -> datetime | None:
+    if not dob:
+        return None
+    for fmt in _DOB_FORMATS:
+        try:
+            return datetime.strptime(dob.strip(), fmt)
+        except ValueError:
+            continue
+    return None
+
+
+def profile_passwords(profile: dict) -> list[str]:
+    """
+    Statement passwords derived from a user profile (name, dob, pan, card_last4), in the
+    conventions Indian issuers use: first four letters of the name + DDMM of birth
+    (both cases), DDMMYYYY, PAN, and card last four + DDMM.
+    """
+    letters = re.sub(r"[^A-Za-z]", "", profile.get("name") or "")
+    dob = _parse_dob(profile.get("dob"))
+    pan = (profile.get("pan") or "").strip()
+    last4 = (profile.get("card_last4") or "").strip()
+
+    candidates = []
+    if letters and dob:
+        ddmm = dob.strftime("%d%m")
+        candidates += [letters[:4].upper() + ddmm, letters[:4].lower() + ddmm]
+    if dob:
+        candidates += [dob.strftime("%d%m%Y"), dob.strftime("%d%m%y")]
+    if pan:
+        candidates += [pan.upper(), pan.lower()]
+    if last4 and dob:
+        candidates.append(last4 + dob.strftime("%d%m"))
+    if letters and last4:
+        candidates.append(letters[:4].upper() + last4)
+    return candidates
+
+
+def candidate_passwords(supplied: list[str] | None = None, profile: dict | None = None) -> list[str]:
+    """Supplied passwords first, then profile-derived ones, then the defaults; no repeats."""
+    ordered = list(supplied or []) + (profile_passwords(profile) if profile else []) + DEFAULT_PASSWORDS
+    return list(dict.fromkeys(p for p in ordered if p))
+
+
+def decrypt_pdf(file_bytes: bytes, passwords: list[str]) -> tuple[bytes | None, int | None]:
+    """
+    Clear PDF bytes and the index of the password that opened them (None if the PDF is
+    not encrypted). (None, None) if no password worked. Raises on an unreadable PDF.
+    """
+    from PyPDF2 import PdfReader, PdfWriter
+
+    if not PdfReader(io.BytesIO(file_bytes)).is_encrypted:
+        return file_bytes, None
+    for index, password in enumerate(passwords):
+        reader = PdfReader(io.BytesIO(file_bytes))
+        if password and reader.decrypt(password):
+            writer = PdfWriter()
+            for page in reader.pages:
+                writer.add_page(page)
+            out = io.BytesIO()
+            writer.write(out)
+            return out.getvalue(), index
+    return None, None
+
+
+def looks_encrypted(path: Path) -> bool:
+    """
+    Whether the PDF at path may be encrypted, from its first and last few KB only. False
+    means it certainly opens without a password; True still needs PdfReader to confirm.
+    """
+    with open(path, "rb") as f:
+        head = f.read(_TRAILER_SCAN_BYTES)
+        f.seek(0, 2)
+        f.seek(max(0, f.tell() - _TRAILER_SCAN_BYTES))
+        tail = f.read()
+    return b"/Encrypt" in head or b"/Encrypt" in tail
@@ -0,0 +1,91 @@
+# app/rate_limit.py
+
+import os
+import random
+import threading
+import time
+
+# Gmail API quota units per call (https://developers.google.com/gmail/api/reference/quota)
+GMAIL_QUOTA_UNITS = {
+    "messages.list": 5,
+    "messages.get": 5,
+    "messages.attachments.get": 5,
+    "history.list": 2,
+    "getProfile": 1,
+}
+
+# Gmail allows 250 units/s per user and 1,200,000 units/min per project
+GMAIL_USER_UNITS_PER_SECOND = float(os.getenv("GMAIL_USER_UNITS_PER_SECOND", "250"))
+GMAIL_PROJECT_UNITS_PER_SECOND = float(os.getenv("GMAIL_PROJECT_UNITS_PER_SECOND", str(1_200_000 / 60)))
+GMAIL_MAX_RETRIES = int(os.getenv("GMAIL_MAX_RETRIES", "5"))
+
+_RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+
+class TokenBucket:
+    """Thread-safe token bucket: refills at rate tokens/s, holds at most capacity."""
+
+    def __init__(self, rate: float, capacity: float | None = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else rate
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, tokens: float = 1) -> None:
+        """Block until tokens are available, then take them."""
+        tokens = min(tokens, self.capacity)
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                wait = (tokens - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+_project_bucket = TokenBucket(GMAIL_PROJECT_UNITS_PER_SECOND)
+_user_buckets: dict[str, TokenBucket] = {}
+_user_buckets_lock = threading.Lock()
+
+
+def _user_bucket(user_email: str) -> TokenBucket:
+    with _user_buckets_lock:
+        bucket = _user_buckets.get(user_email)
+        if bucket is None:
+            bucket = _user_buckets[user_email] = TokenBucket(GMAIL_USER_UNITS_PER_SECOND)
+        return bucket
+
+
+def _retry_after(error) -> float | None:
+    try:
+        return float(error.resp.get("retry-after"))
+    except (TypeError, ValueError, AttributeError):
+        return None
+
+
+def gmail_execute(request, user_email: str, method: str):
+    """
+    Execute a Gmail API request under the per-user and per-project quota buckets,
+    retrying 429/5xx responses with exponential backoff (honouring Retry-After).
+    """
+    # loaded with the request object's own library, never at import
+    from googleapiclient.errors import HttpError
+
+    units = GMAIL_QUOTA_UNITS.get(method, 5)
+    for attempt in range(GMAIL_MAX_RETRIES + 1):
+        _user_bucket(user_email).acquire(units)
+        _project_bucket.acquire(units)
+        try:
+            return request.execute()
+        except HttpError as e:
+            if e.resp.status not in _RETRYABLE_STATUS or attempt == GMAIL_MAX_RETRIES:
+                raise
+            delay = _retry_after(e) or min(32.0, 2 ** attempt) + random.random()
+            time.sleep(delay)
@@ -0,0 +1,77 @@
+# app/records.py
+
+from datetime import datetime
+
+from pymongo import ASCENDING, DESCENDING
+from app.db import attachments_collection
+from app.sync import next_revision
+
+# One document per (email, message_id, filename): blob reference plus triage
+# and parse results, so listings are served without touching Gmail or the PDF.
+
+_indexes_ready = False
+
+
+def ensure_indexes() -> None:
+    global _indexes_ready
+    if not _indexes_ready:
+        attachments_collection.create_index(
+            [("email", ASCENDING), ("message_id", ASCENDING), ("filename", ASCENDING)],
+            unique=True,
+        )
+        attachments_collection.create_index([("sha256", ASCENDING)])
+        # range queries for upcoming dues across all users
+        attachments_collection.create_index([("due_date", ASCENDING)], sparse=True)
+        # one user's upcoming dues (/gmail/upcoming-dues?user_email=): equality on email, then the date range and sort
+        attachments_collection.create_index([("email", ASCENDING), ("due_date", ASCENDING)])
+        _indexes_ready = True
+
+
+def upsert_record(email: str, message_id: str, filename: str, **fields) -> None:
+    """
+    Insert or update a record, then stamp it with a new user revision (see sync.next_revision).
+    The revision moves only after the write, so a listing that names revision N already
+    holds every write stamped N or lower, and a since=N cursor never skips one.
+    """
+    ensure_indexes()
+    now = datetime.utcnow()
+    key = {"email": email, "message_id": message_id, "filename": filename}
+    attachments_collection.update_one(
+        key,
+        {"$set": {**fields, "updated_at": now}, "$setOnInsert": {"stored_at": now}},
+        upsert=True,
+    )
+    # $max: a slower writer of the same record never stamps it back to an older revision
+    attachments_collection.update_one(key, {"$max": {"revision": next_revision(email)}})
+
+
+def get_record(email: str, message_id: str, filename: str) -> dict | None:
+    return attachments_collection.find_one({"email": email, "message_id": message_id, "filename": filename})
+
+
+def list_records(email: str, message_ids: list[str] | None = None, since_revision: int | None = None) -> list[dict]:
+    """
+    A user's records. With message_ids, only those messages, in that order
+    (Gmail returns newest first); parts keep their order within a message.
+    With since_revision, only records changed after that revision.
+    """
+    query = {"email": email}
+    if message_ids is not None:
+        query["message_id"] = {"$in": message_ids}
+    if since_revision is not None:
+        query["revision"] = {"$gt": since_revision}
+    records = list(attachments_collection.find(query))
+    if message_ids is None:
+        records.sort(key=lambda r: (r.get("stored_at") or datetime.min, r.get("part_index", 0)), reverse=True)
+        return records
+    order = {message_id: i for i, message_id in enumerate(message_ids)}
+    records.sort(key=lambda r: (order.get(r["message_id"], len(order)), r.get("part_index", 0)))
+    return records
+
+
+def iter_records(email: str, message_ids: list[str] | None = None, **filters):
+    """Stream a user's records newest first from a cursor, for exports that must not load them all."""
+    query = {"email": email, **filters}
+    if message_ids is not None:
+        query["message_id"] = {"$in": message_ids}
+    return attachments_collection.find(query).sort([("stored_at", DESCENDING), ("part_index", ASCENDING)])
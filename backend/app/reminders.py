@@ -0,0 +1,200 @@
+# app/reminders.py
+
+import heapq
+import itertools
+import os
+import threading
+import time
+from datetime import date, datetime, timedelta
+from typing import Callable
+
+from app.db import attachments_collection
+from app.records import ensure_indexes
+
+# Reminders fire this many days before a statement's due date, at REMINDER_HOUR local time
+REMINDER_SCHEDULER_ENABLED = os.getenv("REMINDER_SCHEDULER_ENABLED", "1") == "1"
+REMINDER_DAYS = sorted({int(d) for d in os.getenv("REMINDER_DAYS", "7,3,1,0").split(",")}, reverse=True)
+REMINDER_HOUR = int(os.getenv("REMINDER_HOUR", "9"))
+# How often the due-date window is reloaded from Mongo (picks up other processes' ingests)
+REMINDER_RELOAD_SECONDS = float(os.getenv("REMINDER_RELOAD_SECONDS", "21600"))
+
+
+def days_left(due_date: str, today: date | None = None) -> int:
+    return (date.fromisoformat(due_date) - (today or date.today())).days
+
+
+def upcoming_dues(within_days: int, email: str | None = None, today: date | None = None) -> list[dict]:
+    """
+    Parsed statements due between today and within_days from now, soonest first.
+    One range query on the due_date index; days_left is derived from the stored date.
+    """
+    ensure_indexes()
+    today = today or date.today()
+    query = {
+        "due_date": {"$gte": today.isoformat(), "$lte": (today + timedelta(days=within_days)).isoformat()},
+        "is_credit": True,
+        "parsed": True,
+    }
+    if email:
+        query["email"] = email
+    fields = {"_id": 0, "email": 1, "message_id": 1, "filename": 1, "issuer": 1,
+              "due_date": 1, "total_amount_due": 1, "minimum_amount_due": 1}
+    dues = list(attachments_collection.find(query, fields).sort("due_date", 1))
+    for due in dues:
+        due["days_left"] = days_left(due["due_date"], today)
+    return dues
+
+
+def _fire_time(due_date: str, days_before: int) -> float:
+    fire_day = date.fromisoformat(due_date) - timedelta(days=days_before)
+    return datetime(fire_day.year, fire_day.month, fire_day.day, REMINDER_HOUR).timestamp()
+
+
+def _claim_reminder(event: dict) -> bool:
+    """
+    Mark a reminder sent; only one process (and one pass) wins for each statement, due date
+    and offset. Fails too if a re-parse has since moved the statement's due date. Sent
+    reminders are keyed "<due_date>:<days_before>", so ones sent for a date a re-parse
+    corrected never block the reminders for the real one.
+    """
+    sent_key = f"{event['due_date']}:{event['days_before']}"
+    result = attachments_collection.update_one(
+        {"email": event["email"], "message_id": event["message_id"], "filename": event["filename"],
+         "due_date": event["due_date"], "reminders_sent": {"$ne": sent_key}},
+        {"$addToSet": {"reminders_sent": sent_key}},
+    )
+    return result.modified_count == 1
+
+
+def log_reminder(event: dict) -> None:
+    print(f"⏰ {event['email']}: {event.get('issuer') or 'card'} payment of "
+          f"{event.get('total_amount_due')} due {event['due_date']} ({event['days_left']} days left)")
+
+
+class ReminderScheduler:
+    """
+    Min-heap of pending reminder events ordered by fire time. Upcoming dues are loaded
+    with one range query on start and every reload interval, and statements ingested in
+    between are pushed directly, so each event costs O(log n) to schedule and to fire.
+    """
+
+    def __init__(self, days_before: list[int] = REMINDER_DAYS, reload_seconds: float = REMINDER_RELOAD_SECONDS):
+        self.days_before = days_before
+        self.reload_seconds = reload_seconds
+        self._heap: list[tuple[float, int, dict]] = []
+        self._scheduled: set[tuple] = set()
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._handlers: list[Callable[[dict], None]] = [log_reminder]
+        self.fired = 0
+
+    def on_reminder(self, handler: Callable[[dict], None]) -> Callable[[dict], None]:
+        """Register a callable(event) run for every reminder fired; usable as a decorator."""
+        self._handlers.append(handler)
+        return handler
+
+    def schedule(self, email: str, message_id: str, filename: str, due_date: str, **details) -> int:
+        """Queue the reminders for one due date that are still ahead. Returns how many were added."""
+        today = date.today()
+        added = 0
+        with self._cond:
+            for days_before in self.days_before:
+                key = (email, message_id, filename, due_date, days_before)
+                # a reminder whose day is today but hour has passed still goes out now
+                if key in self._scheduled or date.fromisoformat(due_date) - timedelta(days=days_before) < today:
+                    continue
+                fire_at = _fire_time(due_date, days_before)
+                event = {"email": email, "message_id": message_id, "filename": filename,
+                         "due_date": due_date, "days_before": days_before, **details}
+                heapq.heappush(self._heap, (fire_at, next(self._seq), event))
+                self._scheduled.add(key)
+                added += 1
+            if added:
+                self._cond.notify()
+        return added
+
+    def schedule_record(self, email: str, record: dict) -> int:
+        """Schedule reminders for a freshly stored attachment record, if it is a parsed statement."""
+        if not (record.get("is_credit") and record.get("parsed") and record.get("due_date")):
+            return 0
+        return self.schedule(email, record["message_id"], record["filename"], record["due_date"],
+                             issuer=record.get("issuer"), total_amount_due=record.get("total_amount_due"),
+                             minimum_amount_due=record.get("minimum_amount_due"))
+
+    def load(self) -> int:
+        """Schedule everything due within the reminder horizon with one range query."""
+        added = 0
+        for due in upcoming_dues(max(self.days_before) + 1):
+            email = due.pop("email")
+            due.pop("days_left")
+            added += self.schedule(email, due.pop("message_id"), due.pop("filename"), due.pop("due_date"), **due)
+        return added
+
+    def _pop_due(self, reload_at: float) -> dict | None:
+        """Wait for the next event to come due; None when stopped or once reload_at (monotonic) passes."""
+        with self._cond:
+            while not self._stop.is_set():
+                now = time.time()
+                if self._heap and self._heap[0][0] <= now:
+                    _, _, event = heapq.heappop(self._heap)
+                    self._scheduled.discard((event["email"], event["message_id"], event["filename"],
+                                             event["due_date"], event["days_before"]))
+                    return event
+                wait = reload_at - time.monotonic()
+                if wait <= 0:
+                    return None
+                if self._heap:
+                    wait = min(wait, self._heap[0][0] - now)
+                self._cond.wait(timeout=wait)
+        return None
+
+    def _fire(self, event: dict) -> None:
+        if not _claim_reminder(event):
+            return
+        event["days_left"] = days_left(event["due_date"])
+        self.fired += 1
+        for handler in self._handlers:
+            try:
+                handler(event)
+            except Exception as e:
+                print(f"❌ Reminder handler failed for {event['email']}: {e}")
+
+    def _loop(self) -> None:
+        next_reload = 0.0
+        while not self._stop.is_set():
+            if time.monotonic() >= next_reload:
+                try:
+                    self.load()
+                except Exception as e:
+                    print(f"❌ Loading upcoming dues failed: {e}")
+                next_reload = time.monotonic() + self.reload_seconds
+            event = self._pop_due(next_reload)
+            if event:
+                self._fire(event)
+
+    def start(self) -> None:
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="reminder-scheduler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        with self._cond:
+            self._cond.notify_all()
+        if self._thread:
+            self._thread.join(timeout=5)
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "pending": len(self._heap),
+                "next_fire_at": datetime.fromtimestamp(self._heap[0][0]).isoformat() if self._heap else None,
+                "fired": self.fired,
+            }
+
+
+reminder_scheduler = ReminderScheduler()
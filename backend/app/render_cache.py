@@ -0,0 +1,99 @@
+# app/render_cache.py
+
+import io
+import os
+import threading
+from pathlib import Path
+
+from app.fileio import write_atomic
+
+# Page renders are cached as renders/ab/<sha256>_p<page>_w<width>.<format>, keyed by the
+# blob's content hash so every user referencing the same PDF shares them.
+RENDER_CACHE_ROOT = Path(os.getenv("RENDER_CACHE_ROOT", "downloads/renders"))
+RENDER_CACHE_MAX_BYTES = int(os.getenv("RENDER_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+
+RENDER_FORMATS = {"png": "image/png", "webp": "image/webp"}
+
+_lock = threading.Lock()
+_total_bytes: int | None = None
+
+
+def render_key(digest: str, page: int, width: int, fmt: str) -> str:
+    return f"{digest}_p{page}_w{width}.{fmt}"
+
+
+def _render_path(key: str) -> Path:
+    return RENDER_CACHE_ROOT / key[:2] / key
+
+
+def _cache_files() -> list[Path]:
+    if not RENDER_CACHE_ROOT.exists():
+        return []
+    return [p for p in RENDER_CACHE_ROOT.glob("*/*") if p.is_file() and not p.name.startswith(".")]
+
+
+def _current_total() -> int:
+    """Bytes in the cache; scanned once per process, then tracked on put/evict."""
+    global _total_bytes
+    if _total_bytes is None:
+        _total_bytes = sum(p.stat().st_size for p in _cache_files())
+    return _total_bytes
+
+
+def get_render(key: str) -> Path | None:
+    """Cached render path, or None. A hit bumps mtime, which is the LRU clock."""
+    path = _render_path(key)
+    try:
+        os.utime(path)
+    except FileNotFoundError:
+        return None
+    return path
+
+
+def put_render(key: str, data: bytes) -> Path:
+    """Store a render atomically, then evict least recently used renders beyond the size bound."""
+    global _total_bytes
+    path = _render_path(key)
+    existed = path.exists()
+    write_atomic(path, data)
+    with _lock:
+        _total_bytes = _current_total() + (0 if existed else len(data))
+        if _total_bytes > RENDER_CACHE_MAX_BYTES:
+            _evict_locked(keep=path)
+    return path
+
+
+def _evict_locked(keep: Path) -> None:
+    """Drop oldest-used renders until the cache is back under 90% of its bound."""
+    global _total_bytes
+    target = RENDER_CACHE_MAX_BYTES * 0.9
+    entries = []
+    for p in _cache_files():
+        try:
+            stat = p.stat()
+        except FileNotFoundError:
+            continue
+        entries.append((stat.st_mtime, stat.st_size, p))
+    entries.sort()
+    total = sum(size for _, size, _ in entries)
+    for _, size, p in entries:
+        if total <= target:
+            break
+        if p == keep:
+            continue
+        p.unlink(missing_ok=True)
+        total -= size
+    _total_bytes = total
+
+
+def render_page(pdf_bytes: bytes, page: int, width: int, fmt: str) -> bytes | None:
+    """Render one page (1-based) scaled to width pixels. Returns None if the page does not exist."""
+    from pdf2image import convert_from_bytes
+
+    # pdf2image clamps last_page to the page count, so a page past the end yields no images
+    images = convert_from_bytes(pdf_bytes, first_page=page, last_page=page, size=(width, None))
+    if not images:
+        return None
+    out = io.BytesIO()
+    images[0].save(out, format=fmt.upper())
+    return out.getvalue()
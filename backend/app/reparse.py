@@ -0,0 +1,255 @@
+# app/reparse.py
+#
+# Re-extract statement fields for records parsed by an older parser version (run from backend/):
+#   python -m app.reparse [--email user@example.com] [--workers 4] [--batch-size 200]
+# Fields come from the text and OCR-word sidecars kept at ingest, so nothing is fetched
+# from Gmail, decrypted or OCR'd again. The same job runs in the app via POST /gmail/reparse.
+
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+
+from pymongo.errors import DuplicateKeyError
+
+from app.sidecars import PARSER_VERSION, get_ocr_words, get_text, put_text
+
+REPARSE_BATCH_SIZE = int(os.getenv("REPARSE_BATCH_SIZE", "200"))
+REPARSE_WORKERS = int(os.getenv("REPARSE_WORKERS", str(os.cpu_count() or 2)))
+# A running job renews its lease at least this often; an older lease belongs to a dead job
+REPARSE_STALE_SECONDS = float(os.getenv("REPARSE_STALE_SECONDS", "120"))
+
+_FIELDS = ("total_amount_due", "minimum_amount_due", "due_date")
+# One Mongo document holds the job: the lease to run it, claimed atomically, and its
+# progress, so every worker process reports the same job the moment it moves
+_JOB_ID = "reparse"
+
+
+def stale_query(email: str | None = None) -> dict:
+    query = {
+        "parsed": True,
+        "sha256": {"$exists": True},
+        "$or": [{"parser_version": {"$exists": False}}, {"parser_version": {"$lt": PARSER_VERSION}}],
+    }
+    if email:
+        query["email"] = email
+    return query
+
+
+def reparse_fields(digest: str, issuer: str, backfill: bool = True) -> dict:
+    """
+    Fields for one blob from its sidecars. Runs in a worker process. Without a text sidecar,
+    backfill extracts (and stores) the text layer from the local blob; OCR words are never
+    recomputed, so a scanned statement with no OCR sidecar comes back as "missing_sidecar".
+    """
+    # the parsing stack loads once per worker process
+    from app.parsing import decrypt_and_extract_text, parse_credit_card_fields
+    from app.creditcard_parser import extract_from_words
+    from app.blob_store import blob_path
+    from app.issuers import detect_issuer
+
+    try:
+        text = get_text(digest)
+        if text is None and backfill and blob_path(digest).exists():
+            text, _ = decrypt_and_extract_text(blob_path(digest).read_bytes())
+            if text and text.strip():
+                put_text(digest, text)
+        if text and text.strip():
+            if issuer == "generic":
+                issuer = detect_issuer(first_page_text=text)
+            fields = parse_credit_card_fields(text, issuer)
+            return {"status": "ok", "issuer": issuer, **{k: fields.get(k) for k in _FIELDS}}
+        pages = get_ocr_words(digest)
+        if pages:
+            return {"status": "ok", "issuer": issuer, **extract_from_words(pages, issuer)}
+        return {"status": "missing_sidecar"}
+    except Exception as e:
+        return {"status": "failed", "error": f"{type(e).__name__}: {e}"}
+
+
+def _apply(record: dict, result: dict, stats: dict) -> None:
+    from app.gmail_routes import save_record
+    from app.records import upsert_record
+
+    email, message_id, filename = record["email"], record["message_id"], record["filename"]
+    if result["status"] != "ok":
+        stats[result["status"]] += 1
+        return
+    updates = {"issuer": result["issuer"], **{k: result[k] for k in _FIELDS}}
+    if all(record.get(k) == v for k, v in updates.items()):
+        # same answer: only the version moves, aggregates and reminders stay as they are
+        upsert_record(email, message_id, filename, parser_version=PARSER_VERSION)
+        stats["unchanged"] += 1
+        return
+    stored = {k: v for k, v in record.items() if k not in ("_id", "email", "message_id", "filename", "stored_at", "updated_at")}
+    save_record(email, message_id, filename, {**stored, **updates, "parser_version": PARSER_VERSION})
+    stats["updated"] += 1
+
+
+def _publish(progress: dict) -> None:
+    from app.db import jobs_collection
+
+    progress["updated_at"] = time.time()
+    jobs_collection.update_one({"_id": _JOB_ID}, {"$set": {"progress": dict(progress)}}, upsert=True)
+
+
+def get_progress() -> dict | None:
+    from app.db import jobs_collection
+
+    job = jobs_collection.find_one({"_id": _JOB_ID}, {"progress": 1, "lease_until": 1})
+    if not job or not job.get("progress"):
+        return None
+    progress = job["progress"]
+    if progress.get("state") == "running" and not (job.get("lease_until") and job["lease_until"] > datetime.utcnow()):
+        # the worker running it died without finishing
+        progress["state"] = "abandoned"
+    return progress
+
+
+def claim_job(owner: str) -> bool:
+    """Atomically take the job lease unless a live one is held (by any worker process)."""
+    from app.db import jobs_collection
+
+    now = datetime.utcnow()
+    try:
+        # matches only a free or expired lease; otherwise the upsert collides on _id
+        jobs_collection.update_one(
+            {"_id": _JOB_ID, "$or": [{"lease_until": {"$exists": False}}, {"lease_until": {"$lte": now}}]},
+            {"$set": {"owner": owner, "lease_until": now + timedelta(seconds=REPARSE_STALE_SECONDS)}},
+            upsert=True,
+        )
+    except DuplicateKeyError:
+        # the lease document exists and someone else's lease is live
+        return False
+    return True
+
+
+def _renew_job(owner: str) -> None:
+    from app.db import jobs_collection
+
+    jobs_collection.update_one({"_id": _JOB_ID, "owner": owner},
+                               {"$set": {"lease_until": datetime.utcnow() + timedelta(seconds=REPARSE_STALE_SECONDS)}})
+
+
+def release_job(owner: str) -> None:
+    from app.db import jobs_collection
+
+    jobs_collection.update_one({"_id": _JOB_ID, "owner": owner}, {"$set": {"lease_until": datetime.utcnow()}})
+
+
+def job_running() -> bool:
+    from app.db import jobs_collection
+
+    lease = jobs_collection.find_one({"_id": _JOB_ID})
+    return bool(lease and lease.get("lease_until") and lease["lease_until"] > datetime.utcnow())
+
+
+def run_reparse(email: str | None = None, workers: int = REPARSE_WORKERS, batch_size: int = REPARSE_BATCH_SIZE,
+                backfill: bool = True, on_progress=None, owner: str | None = None) -> dict:
+    """
+    Re-parse every stale record (optionally one user's), batch_size records at a time, with
+    each batch's extraction spread over a process pool. Records are walked in _id order, so
+    ones that stay stale (no sidecar) are not revisited. Progress is published (and owner's
+    job lease renewed) after each batch.
+    """
+    from app.db import attachments_collection
+
+    query = stale_query(email)
+    progress = {
+        "state": "running",
+        "parser_version": PARSER_VERSION,
+        "email": email,
+        "total": attachments_collection.count_documents(query),
+        "processed": 0,
+        "updated": 0,
+        "unchanged": 0,
+        "missing_sidecar": 0,
+        "failed": 0,
+        "started_at": datetime.utcnow().isoformat(),
+    }
+    _publish(progress)
+    last_id = None
+    started = time.perf_counter()
+    # spawned, not forked: the parent holds Mongo and pool threads
+    with ProcessPoolExecutor(max_workers=max(1, workers), mp_context=multiprocessing.get_context("spawn")) as pool:
+        try:
+            while True:
+                batch_query = {**query, "_id": {"$gt": last_id}} if last_id is not None else query
+                batch = list(attachments_collection.find(batch_query).sort("_id", 1).limit(batch_size))
+                if not batch:
+                    break
+                last_id = batch[-1]["_id"]
+                results = pool.map(reparse_fields, [r["sha256"] for r in batch],
+                                   [r.get("issuer") or "generic" for r in batch], [backfill] * len(batch),
+                                   chunksize=max(1, len(batch) // (max(1, workers) * 4)))
+                for record, result in zip(batch, results):
+                    _apply(record, result, progress)
+                    progress["processed"] += 1
+                progress["records_per_second"] = round(progress["processed"] / (time.perf_counter() - started), 1)
+                _publish(progress)
+                if owner:
+                    _renew_job(owner)
+                if on_progress:
+                    on_progress(progress)
+        except Exception as e:
+            progress.update(state="failed", error=f"{type(e).__name__}: {e}")
+            _publish(progress)
+            raise
+    progress.update(state="done", finished_at=datetime.utcnow().isoformat(), seconds=round(time.perf_counter() - started, 2))
+    _publish(progress)
+    return progress
+
+
+def start_reparse(email: str | None = None) -> bool:
+    """Run the job on a background thread unless one is already running (in any worker). False if it was."""
+    owner = uuid.uuid4().hex
+    if not claim_job(owner):
+        return False
+    # published before the thread starts, so a status request right behind this one sees it
+    _publish({"state": "running", "parser_version": PARSER_VERSION, "email": email, "processed": 0})
+
+    def _run():
+        try:
+            run_reparse(email, owner=owner)
+        except Exception as e:
+            print(f"❌ Re-parse failed: {e}")
+        finally:
+            release_job(owner)
+
+    threading.Thread(target=_run, name="reparse", daemon=True).start()
+    return True
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m app.reparse", description="Re-parse records from an older parser version.")
+    parser.add_argument("--email", help="only this user's records")
+    parser.add_argument("-w", "--workers", type=int, default=REPARSE_WORKERS)
+    parser.add_argument("--batch-size", type=int, default=REPARSE_BATCH_SIZE)
+    parser.add_argument("--no-backfill", action="store_true", help="skip records with no text sidecar instead of reading the blob")
+    args = parser.parse_args(argv)
+
+    def report(progress):
+        print(f"🔁 {progress['processed']}/{progress['total']} re-parsed ({progress['updated']} updated, "
+              f"{progress['missing_sidecar']} without sidecars, {progress['failed']} failed)", file=sys.stderr)
+
+    owner = uuid.uuid4().hex
+    if not claim_job(owner):
+        print("⚠️  A re-parse is already running", file=sys.stderr)
+        return 1
+    try:
+        summary = run_reparse(args.email, args.workers, args.batch_size, backfill=not args.no_backfill,
+                              on_progress=report, owner=owner)
+    finally:
+        release_job(owner)
+    print(json.dumps(summary, indent=2))
+    return 0 if summary["failed"] == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,84 @@
+# app/scheduler.py
+
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from app.db import tokens_collection
+from app.gmail_routes import run_user_sync
+from app.sync import claim_sync_lease
+
+# Background sync of every connected account, so logins find parsed statements waiting
+SYNC_SCHEDULER_ENABLED = os.getenv("SYNC_SCHEDULER_ENABLED", "1") == "1"
+SYNC_INTERVAL_SECONDS = float(os.getenv("SYNC_INTERVAL_SECONDS", "900"))
+SYNC_CONCURRENCY = int(os.getenv("SYNC_CONCURRENCY", "4"))
+
+
+class SyncScheduler:
+    """
+    Walks tokens_collection every interval seconds and runs an incremental sync per user,
+    at most concurrency at a time. Gmail quota is enforced by app.rate_limit inside the sync.
+    """
+
+    def __init__(self, interval: float = SYNC_INTERVAL_SECONDS, concurrency: int = SYNC_CONCURRENCY):
+        self.interval = interval
+        self.concurrency = concurrency
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self.last_run: dict = {}
+
+    def start(self) -> None:
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="sync-scheduler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+
+    def _loop(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.run_once()
+            except Exception as e:
+                print(f"❌ Scheduled sync pass failed: {e}")
+            self._stop.wait(self.interval)
+
+    def _sync_one(self, email: str) -> bool:
+        if self._stop.is_set() or not claim_sync_lease(email, self.interval):
+            # another worker process has this user for the current period
+            return False
+        run_user_sync(email, force=True)
+        return True
+
+    def run_once(self) -> dict:
+        """One pass over all accounts. Returns counts of synced, skipped and failed users."""
+        started = time.monotonic()
+        emails = [t["email"] for t in tokens_collection.find({}, {"email": 1}) if t.get("email")]
+        synced = skipped = failed = 0
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="sync") as executor:
+            futures = {executor.submit(self._sync_one, email): email for email in emails}
+            for future, email in futures.items():
+                try:
+                    if future.result():
+                        synced += 1
+                    else:
+                        skipped += 1
+                except Exception as e:
+                    failed += 1
+                    print(f"❌ Scheduled sync failed for {email}: {e}")
+        self.last_run = {
+            "users": len(emails),
+            "synced": synced,
+            "skipped": skipped,
+            "failed": failed,
+            "seconds": round(time.monotonic() - started, 2),
+        }
+        return self.last_run
+
+
+sync_scheduler = SyncScheduler()
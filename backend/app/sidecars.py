@@ -0,0 +1,70 @@
+# app/sidecars.py
+
+import json
+import os
+import zlib
+from pathlib import Path
+
+from app.fileio import write_atomic
+
+# Bump whenever parse_credit_card_fields or the OCR field extraction changes what it returns;
+# records parsed under an older version are picked up by `python -m app.reparse`.
+PARSER_VERSION = 1
+
+# Extraction inputs kept next to the blobs, keyed by the PDF's sha256 and compressed:
+#   sidecars/ab/cd/<sha256>.text.json.z  -> the decrypted text layer
+#   sidecars/ab/cd/<sha256>.ocr.json.z   -> OCR words per page, as rows of _WORD_KEYS
+# so fields can be re-extracted without Gmail, decryption or OCR.
+SIDECAR_ROOT = Path(os.getenv("SIDECAR_ROOT", "downloads/sidecars"))
+SIDECAR_KINDS = ("text", "ocr")
+_WORD_KEYS = ("text", "x", "y", "w", "h", "conf")
+
+
+def sidecar_path(digest: str, kind: str) -> Path:
+    return SIDECAR_ROOT / digest[:2] / digest[2:4] / f"{digest}.{kind}.json.z"
+
+
+def has_sidecar(digest: str, kind: str) -> bool:
+    return sidecar_path(digest, kind).exists()
+
+
+def put_sidecar(digest: str, kind: str, payload) -> None:
+    """Write payload as compressed JSON, via a temp file renamed into place like blobs are."""
+    data = zlib.compress(json.dumps(payload, separators=(",", ":")).encode(), 6)
+    write_atomic(sidecar_path(digest, kind), data)
+
+
+def get_sidecar(digest: str, kind: str):
+    try:
+        with open(sidecar_path(digest, kind), "rb") as f:
+            return json.loads(zlib.decompress(f.read()))
+    except FileNotFoundError:
+        return None
+    except (zlib.error, ValueError) as e:
+        print(f"❌ Unreadable {kind} sidecar for {digest}: {e}")
+        return None
+
+
+def put_text(digest: str, text: str) -> None:
+    put_sidecar(digest, "text", {"text": text})
+
+
+def get_text(digest: str) -> str | None:
+    payload = get_sidecar(digest, "text")
+    return payload["text"] if payload else None
+
+
+def put_ocr_words(digest: str, pages: dict[int, list[dict]]) -> None:
+    """OCR words per page ({page_num: [{text, x, y, w, h, conf}]}), stored as compact rows."""
+    put_sidecar(digest, "ocr", {
+        "keys": _WORD_KEYS,
+        "pages": {str(page): [[word[k] for k in _WORD_KEYS] for word in words] for page, words in pages.items()},
+    })
+
+
+def get_ocr_words(digest: str) -> dict[int, list[dict]] | None:
+    payload = get_sidecar(digest, "ocr")
+    if not payload:
+        return None
+    keys = payload["keys"]
+    return {int(page): [dict(zip(keys, row)) for row in rows] for page, rows in payload["pages"].items()}
@@ -0,0 +1,104 @@
+# app/statement_document.py
+
+import re
+from datetime import datetime
+
+# Amount tokens. Strict requires a comma group or decimals so bare integers
+# (card digits, page numbers, years) are ignored unless nothing better exists.
+AMOUNT_STRICT_RE = re.compile(r"(?:[₹Rr][sS]?\.?\s*)?((?:\d{1,3}(?:,\d{3})+(?:\.\d{1,2})?)|\d+\.\d{1,2})\s*(?:Dr|Cr)?", re.IGNORECASE)
+AMOUNT_LOOSE_RE = re.compile(r"(?:[₹Rr][sS]?\.?\s*)?([0-9]{1,3}(?:,[0-9]{3})*(?:\.[0-9]{1,2})?|[0-9]+(?:\.[0-9]{1,2})?)\s*(?:Dr|Cr)?", re.IGNORECASE)
+DATE_TOKEN_RE = re.compile(r"(\d{1,2}[\-/]\d{1,2}[\-/]\d{2,4}|\d{1,2}\s*[A-Za-z]{3,9}\s*\d{2,4}|[A-Za-z]{3,9}\s*\d{1,2},?\s*\d{2,4}|\d{4}[\-/]\d{1,2}[\-/]\d{1,2})")
+
+DATE_FORMATS = [
+    "%d-%m-%Y", "%d/%m/%Y", "%d-%m-%y", "%d/%m/%y",
+    "%d %b %Y", "%d %B %Y", "%b %d %Y", "%B %d %Y",
+    "%b %d, %Y", "%B %d, %Y", "%d %b, %Y", "%d %B, %Y",
+    "%Y-%m-%d", "%Y/%m/%d",
+]
+
+
+def parse_date_token(cand: str) -> datetime | None:
+    """Parse a date token found by DATE_TOKEN_RE, or None if no format fits."""
+    cand = cand.strip()
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(cand, fmt)
+        except ValueError:
+            continue
+    return None
+
+
+def _parse_amounts(regex: re.Pattern, line: str, line_offset: int) -> list[tuple[int, float]]:
+    found = []
+    for m in regex.finditer(line):
+        try:
+            found.append((line_offset + m.end(1), float(m.group(1).replace(",", ""))))
+        except ValueError:
+            continue
+    return found
+
+
+class StatementDocument:
+    """
+    Pre-tokenized view of a statement's text layer, built once per PDF.
+
+    Lines, lowercase lines, line offsets and the amount/date tokens on each
+    line are all computed in a single pass, so extractors query windows of
+    lines instead of re-splitting and re-scanning the raw text.
+    """
+
+    def __init__(self, text: str):
+        self.text = text
+        self.lines: list[str] = []
+        self.lower_lines: list[str] = []
+        self.offsets: list[int] = []
+        # per line: [(end offset in text, value)]
+        self._strict: list[list[tuple[int, float]]] = []
+        self._loose: list[list[tuple[int, float]]] = []
+        # per line: [date token]
+        self._dates: list[list[str]] = []
+
+        offset = 0
+        for raw in text.splitlines(keepends=True):
+            line = raw.rstrip()
+            self.lines.append(line)
+            self.lower_lines.append(line.lower())
+            self.offsets.append(offset)
+            self._strict.append(_parse_amounts(AMOUNT_STRICT_RE, line, offset))
+            self._loose.append(_parse_amounts(AMOUNT_LOOSE_RE, line, offset))
+            self._dates.append([m.group(1) for m in DATE_TOKEN_RE.finditer(line)])
+            offset += len(raw)
+
+    def __len__(self) -> int:
+        return len(self.lines)
+
+    def find_label(self, label_re: re.Pattern) -> list[int]:
+        """Indices of lines matching label_re."""
+        return [i for i, ln in enumerate(self.lines) if label_re.search(ln)]
+
+    def amounts(self, start: int, end: int, strict: bool = True) -> list[float]:
+        """Amounts on lines [start, end), in reading order."""
+        table = self._strict if strict else self._loose
+        start = max(0, start)
+        return [value for line_tokens in table[start:end] for _, value in line_tokens]
+
+    def head_amounts(self, limit_chars: int, strict: bool = False) -> list[float]:
+        """Amounts that end within the first limit_chars characters of the text."""
+        table = self._strict if strict else self._loose
+        found = []
+        for i, line_tokens in enumerate(table):
+            if self.offsets[i] >= limit_chars:
+                break
+            found.extend(value for end, value in line_tokens if end <= limit_chars)
+        return found
+
+    def dates(self, start: int, end: int) -> list[str]:
+        """Date tokens on lines [start, end), in reading order."""
+        start = max(0, start)
+        return [token for line_tokens in self._dates[start:end] for token in line_tokens]
+
+    def first_date(self) -> str | None:
+        for line_tokens in self._dates:
+            if line_tokens:
+                return line_tokens[0]
+        return None
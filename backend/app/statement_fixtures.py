@@ -0,0 +1,146 @@
+# app/statement_fixtures.py
+#
+# Synthetic statement PDFs with known field values, for the golden-set gate and load tests.
+#   python -m app.statement_fixtures golden/ --count 20
+# Golden sets are dated from GOLDEN_ANCHOR_DATE, so the committed golden/ (fixtures, labels
+# and baseline.json) regenerates byte-for-byte on any day.
+
+import argparse
+import io
+import json
+import random
+from datetime import date, timedelta
+from pathlib import Path
+
+from app.issuers import ISSUERS
+
+ISSUER_NAMES = {
+    "hdfc": "HDFC Bank",
+    "icici": "ICICI Bank",
+    "axis": "Axis Bank",
+    "sbi": "SBI Card",
+    "generic": "Credit Card",
+}
+_MERCHANTS = ["AMAZON PAY INDIA", "SWIGGY BANGALORE", "UBER INDIA", "IRCTC", "BIGBASKET", "FLIPKART", "ZOMATO"]
+_LINES_PER_PAGE = 50
+GOLDEN_ANCHOR_DATE = date(2025, 9, 1)
+
+
+def _money(amount: float) -> str:
+    return f"{amount:,.2f}"
+
+
+def _escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def text_pdf(pages: list[list[str]]) -> bytes:
+    """A minimal PDF with a Helvetica text layer: one list of lines per page."""
+    page_count = len(pages)
+    font_id = 3 + 2 * page_count
+    objects = [
+        "<< /Type /Catalog /Pages 2 0 R >>",
+        "<< /Type /Pages /Kids [%s] /Count %d >>" % (" ".join(f"{3 + 2 * i} 0 R" for i in range(page_count)), page_count),
+    ]
+    for i, lines in enumerate(pages):
+        content = "BT /F1 10 Tf 40 800 Td 14 TL " + " ".join(f"({_escape(line)}) '" for line in lines) + " ET"
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] /Contents {4 + 2 * i} 0 R "
+            f"/Resources << /Font << /F1 {font_id} 0 R >> >> >>"
+        )
+        objects.append(f"<< /Length {len(content)} >>\nstream\n{content}\nendstream")
+    objects.append("<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+
+    out = io.BytesIO()
+    out.write(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(out.tell())
+        out.write(f"{number} 0 obj\n{body}\nendobj\n".encode("latin-1"))
+    xref = out.tell()
+    out.write(f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode())
+    for offset in offsets:
+        out.write(f"{offset:010d} 00000 n \n".encode())
+    out.write(f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode())
+    return out.getvalue()
+
+
+def _encrypt(pdf_bytes: bytes, password: str) -> bytes:
+    from PyPDF2 import PdfReader, PdfWriter
+
+    writer = PdfWriter()
+    for page in PdfReader(io.BytesIO(pdf_bytes)).pages:
+        writer.add_page(page)
+    writer.encrypt(password)
+    out = io.BytesIO()
+    writer.write(out)
+    return out.getvalue()
+
+
+def statement_pdf(issuer: str, total: float, minimum: float, due_date: date,
+                  transactions: list[tuple[date, str, float, str]] = (), password: str | None = None) -> bytes:
+    """Render a statement in the issuer's layout (header row or label/value) with its transactions after the summary."""
+    name = ISSUER_NAMES.get(issuer, ISSUER_NAMES["generic"])
+    due = due_date.strftime("%d/%m/%Y")
+    lines = [f"{name} Credit Card Statement", f"Statement Date {(due_date - timedelta(days=20)).strftime('%d/%m/%Y')}", "", "Payment Summary"]
+    if ISSUERS.get(issuer, ISSUERS["generic"])["layout"] == "header_row":
+        lines += [
+            "Total Amount Due     Minimum Amount Due     Payment Due Date",
+            f"Rs. {_money(total)} Dr     Rs. {_money(minimum)} Dr     {due}",
+        ]
+    else:
+        lines += [
+            f"Total Amount Due: Rs. {_money(total)}",
+            f"Minimum Amount Due: Rs. {_money(minimum)}",
+            f"Payment Due Date: {due}",
+        ]
+    lines += ["", "Transaction Details"]
+    lines += [f"{d.strftime('%d/%m/%Y')} {desc} {_money(amount)} {kind}" for d, desc, amount, kind in transactions]
+    pages = [lines[i:i + _LINES_PER_PAGE] for i in range(0, len(lines), _LINES_PER_PAGE)]
+    pdf = text_pdf(pages)
+    return _encrypt(pdf, password) if password else pdf
+
+
+def random_statement(rng: random.Random, issuer: str | None = None, transactions: int = 12,
+                     password: str | None = None, today: date | None = None) -> tuple[dict, bytes]:
+    """A random statement and its labels {issuer, total_amount_due, minimum_amount_due, due_date}, due around today."""
+    issuer = issuer or rng.choice(list(ISSUER_NAMES))
+    due_date = (today or date.today()) + timedelta(days=rng.randint(-60, 30))
+    rows = []
+    for _ in range(transactions):
+        day = due_date - timedelta(days=rng.randint(20, 50))
+        rows.append((day, rng.choice(_MERCHANTS), round(rng.uniform(50, 25000), 2), "Dr"))
+    rows.sort()
+    total = round(sum(amount for _, _, amount, _ in rows) or rng.uniform(1000, 90000), 2)
+    minimum = round(max(200.0, total * 0.05), 2)
+    labels = {
+        "issuer": issuer,
+        "total_amount_due": total,
+        "minimum_amount_due": minimum,
+        "due_date": due_date.isoformat(),
+    }
+    return labels, statement_pdf(issuer, total, minimum, due_date, rows, password)
+
+
+def write_golden_set(directory: Path, count: int, seed: int = 7, anchor: date = GOLDEN_ANCHOR_DATE) -> Path:
+    """Write count synthetic statements, due around anchor, plus labels.jsonl into directory."""
+    rng = random.Random(seed)
+    directory.mkdir(parents=True, exist_ok=True)
+    issuers = list(ISSUER_NAMES)
+    with open(directory / "labels.jsonl", "w", encoding="utf-8") as labels_file:
+        for i in range(count):
+            labels, pdf = random_statement(rng, issuers[i % len(issuers)], today=anchor)
+            filename = f"synthetic_{labels['issuer']}_{i:03d}.pdf"
+            (directory / filename).write_bytes(pdf)
+            labels_file.write(json.dumps({"file": filename, **labels}) + "\n")
+    return directory / "labels.jsonl"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(prog="python -m app.statement_fixtures")
+    parser.add_argument("directory", type=Path)
+    parser.add_argument("--count", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--anchor", type=date.fromisoformat, default=GOLDEN_ANCHOR_DATE, help="due dates fall around this day")
+    args = parser.parse_args()
+    print(write_golden_set(args.directory, args.count, args.seed, args.anchor))
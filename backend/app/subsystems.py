@@ -0,0 +1,88 @@
+# app/subsystems.py
+
+import importlib
+import os
+import subprocess
+import sys
+import threading
+import time
+
+# Heavy libraries behind each subsystem. Nothing here is imported at startup; modules
+# import them on first use, and WARM_SUBSYSTEMS preloads some after the app is serving.
+SUBSYSTEMS = {
+    "gmail": ("googleapiclient.discovery", "google.oauth2.credentials", "google.auth.transport.requests"),
+    "oauth": ("google_auth_oauthlib.flow",),
+    "pdf": ("PyPDF2",),
+    "ocr": ("pdf2image", "pytesseract"),
+}
+WARM_SUBSYSTEMS = [s for s in os.getenv("WARM_SUBSYSTEMS", "gmail,pdf").split(",") if s]
+
+_warm_errors: dict[str, str] = {}
+
+
+def is_warm(name: str) -> bool:
+    return all(module in sys.modules for module in SUBSYSTEMS[name])
+
+
+def warm(name: str) -> float:
+    """Import a subsystem's libraries now. Returns seconds spent."""
+    started = time.perf_counter()
+    try:
+        for module in SUBSYSTEMS[name]:
+            importlib.import_module(module)
+        _warm_errors.pop(name, None)
+    except Exception as e:
+        _warm_errors[name] = str(e)
+    return time.perf_counter() - started
+
+
+def warm_in_background(names: list[str] = WARM_SUBSYSTEMS) -> threading.Thread:
+    """Preload subsystems off the startup path; readiness does not wait for them."""
+    def _run():
+        for name in names:
+            if name in SUBSYSTEMS:
+                warm(name)
+
+    thread = threading.Thread(target=_run, name="warm-subsystems", daemon=True)
+    thread.start()
+    return thread
+
+
+def status() -> dict:
+    return {
+        name: {"warm": is_warm(name), **({"error": _warm_errors[name]} if name in _warm_errors else {})}
+        for name in SUBSYSTEMS
+    }
+
+
+_REPORT_SCRIPT = """
+import json, sys, time
+started = time.perf_counter()
+import app.main
+report = {"app.main": time.perf_counter() - started}
+from app.subsystems import SUBSYSTEMS, warm
+for name in SUBSYSTEMS:
+    report[name] = warm(name)
+print(json.dumps(report))
+"""
+
+
+def import_time_report() -> dict:
+    """
+    Time a cold `import app.main` in a fresh interpreter, then the first-use cost of each
+    subsystem, which is what startup used to pay up front.
+    """
+    env = {**os.environ, "SYNC_SCHEDULER_ENABLED": "0", "REMINDER_SCHEDULER_ENABLED": "0"}
+    out = subprocess.run([sys.executable, "-c", _REPORT_SCRIPT], capture_output=True, text=True, env=env, check=True)
+    import json
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+if __name__ == "__main__":
+    report = import_time_report()
+    deferred = sum(seconds for name, seconds in report.items() if name != "app.main")
+    print(f"import app.main: {report['app.main'] * 1000:.0f} ms")
+    for name, seconds in report.items():
+        if name != "app.main":
+            print(f"  first use of {name}: {seconds * 1000:.0f} ms")
+    print(f"startup before lazy loading ≈ {(report['app.main'] + deferred) * 1000:.0f} ms")
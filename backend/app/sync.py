@@ -0,0 +1,198 @@
+# app/sync.py
+
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Any, Callable
+
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+from app.db import sync_state_collection
+
+# How long a finished sync result is served again without touching Gmail
+SYNC_FRESHNESS_SECONDS = float(os.getenv("SYNC_FRESHNESS_SECONDS", "30"))
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: BaseException | None = None
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls for the same key onto one in-flight execution.
+
+    The first caller for a key runs the function; callers arriving while it runs
+    block and receive the same result (or exception). Successful results are kept
+    for freshness_seconds and returned directly to later callers. With a shared cache
+    namespace, results are also published there so other worker processes reuse them.
+    """
+
+    def __init__(self, freshness_seconds: float = 0, shared=None):
+        self.freshness_seconds = freshness_seconds
+        self.shared = shared
+        self._lock = threading.Lock()
+        self._inflight: dict[str, _Call] = {}
+        self._results: dict[str, tuple[float, Any]] = {}
+
+    def do(self, key: str, fn: Callable[[], Any], force: bool = False, timeout: float | None = None) -> Any:
+        """
+        Run fn for key, or join the run already in flight. force skips the freshness window.
+        A caller joining another's run waits at most timeout seconds, then gets TimeoutError
+        (the run itself carries on for its leader).
+        """
+        with self._lock:
+            cached = self._results.get(key)
+            if not force and cached and time.monotonic() - cached[0] < self.freshness_seconds:
+                return cached[1]
+            call = self._inflight.get(key)
+            leader = call is None
+            if leader:
+                call = self._inflight[key] = _Call()
+
+        if leader and not force and self.shared is not None:
+            shared = self.shared.get(key)
+            if shared is not None:
+                call.result = shared
+                with self._lock:
+                    self._inflight.pop(key, None)
+                    self._results[key] = (time.monotonic(), shared)
+                call.done.set()
+                return shared
+
+        if not leader:
+            if not call.done.wait(timeout):
+                raise TimeoutError(f"{key} is still in flight")
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+                if call.error is None:
+                    self._results[key] = (time.monotonic(), call.result)
+            call.done.set()
+        if self.shared is not None and self.freshness_seconds > 0:
+            self.shared.set(key, call.result, ttl=self.freshness_seconds)
+        return call.result
+
+    def in_flight(self, key: str) -> bool:
+        with self._lock:
+            return key in self._inflight
+
+    def forget(self, key: str) -> None:
+        """Drop the cached result for key so the next call runs fresh."""
+        with self._lock:
+            self._results.pop(key, None)
+        if self.shared is not None:
+            self.shared.delete(key)
+
+
+# ---------------- Per-user sync state ----------------
+
+_indexes_ready = False
+
+
+def _ensure_indexes() -> None:
+    global _indexes_ready
+    if not _indexes_ready:
+        # unique so concurrent lease upserts cannot create duplicate state documents
+        sync_state_collection.create_index("email", unique=True)
+        _indexes_ready = True
+
+
+def known_message_ids(email: str) -> set[str]:
+    """Messages whose PDFs were fully ingested by an earlier sync."""
+    state = sync_state_collection.find_one({"email": email}, {"message_ids": 1})
+    return set(state.get("message_ids", [])) if state else set()
+
+
+def mark_message_synced(email: str, message_id: str) -> None:
+    _ensure_indexes()
+    sync_state_collection.update_one(
+        {"email": email},
+        {"$addToSet": {"message_ids": message_id}, "$set": {"last_synced_at": datetime.utcnow()}},
+        upsert=True,
+    )
+
+
+def claim_sync_lease(email: str, seconds: float) -> bool:
+    """
+    Atomically claim the right to run the scheduled sync for email for the next
+    seconds. Only one worker process wins per user per period.
+    """
+    _ensure_indexes()
+    now = datetime.utcnow()
+    try:
+        state = sync_state_collection.find_one_and_update(
+            {"email": email, "$or": [{"lease_until": {"$exists": False}}, {"lease_until": {"$lte": now}}]},
+            {"$set": {"lease_until": now + timedelta(seconds=seconds)}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+    except DuplicateKeyError:
+        # the user has a state document with a live lease held by someone else
+        return False
+    return state is not None
+
+
+def next_revision(email: str) -> int:
+    """
+    Advance and return the user's listing revision. Every record change takes a new one,
+    so list-pdfs can name its content (ETag) and hand out "changed since" cursors.
+    """
+    _ensure_indexes()
+    state = sync_state_collection.find_one_and_update(
+        {"email": email},
+        {"$inc": {"revision": 1}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER,
+        projection={"revision": 1},
+    )
+    return state["revision"]
+
+
+def get_revision(email: str) -> int:
+    state = sync_state_collection.find_one({"email": email}, {"revision": 1})
+    return state.get("revision", 0) if state else 0
+
+
+def record_listing(email: str, message_ids: list[str]) -> None:
+    """Remember the Gmail window a sync just listed, so list-pdfs can validate an ETag without syncing."""
+    _ensure_indexes()
+    sync_state_collection.update_one(
+        {"email": email},
+        {"$set": {"listing_ids": message_ids, "listed_at": datetime.utcnow()}},
+        upsert=True,
+    )
+
+
+def get_listing_state(email: str) -> dict:
+    """The user's revision, last listed window and when it was listed, from one read."""
+    state = sync_state_collection.find_one({"email": email}, {"revision": 1, "listing_ids": 1, "listed_at": 1}) or {}
+    return {"revision": state.get("revision", 0), "listing_ids": state.get("listing_ids", []),
+            "listed_at": state.get("listed_at")}
+
+
+def update_sync_progress(email: str, **progress) -> None:
+    """Record sync progress in the shared state document so any worker can report it."""
+    _ensure_indexes()
+    sync_state_collection.update_one(
+        {"email": email},
+        {"$set": {f"progress.{key}": value for key, value in progress.items()}},
+        upsert=True,
+    )
+
+
+def get_sync_progress(email: str) -> dict | None:
+    state = sync_state_collection.find_one({"email": email}, {"progress": 1})
+    return state.get("progress") if state else None
@@ -0,0 +1,156 @@
+# app/transactions.py
+
+import io
+import os
+import re
+from contextlib import ExitStack
+from typing import Iterable, Iterator
+
+from pymongo import ASCENDING, ReplaceOne
+from PyPDF2 import PdfReader
+
+from app.creditcard_parser import _group_lines, _merge_line_numbers, _image_to_words, _decrypt_pdf_bytes, _pdf_on_disk
+from app.db import transactions_collection
+from app.statement_document import parse_date_token
+
+TRANSACTION_BATCH_SIZE = int(os.getenv("TRANSACTION_BATCH_SIZE", "500"))
+TRANSACTION_OCR_DPI = int(os.getenv("TRANSACTION_OCR_DPI", "200"))
+# Pages with less text layer than this are OCR'd instead
+_MIN_PAGE_TEXT = 20
+
+# A transaction row starts with its date ("04/09/2025", "04-09-25", "04 Sep 2025")
+_ROW_DATE_RE = re.compile(r"^\s*(\d{1,2}[\-/]\d{1,2}[\-/]\d{2,4}|\d{1,2}\s+[A-Za-z]{3,9},?\s+\d{2,4})\s+(.*)$")
+# Transaction amounts always carry paise; a trailing Dr/Cr (or CR/+ for credits) is optional
+_ROW_AMOUNT_RE = re.compile(r"(?:[₹Rr][sS]?\.?\s*)?(\d{1,3}(?:,\d{3})+\.\d{2}|\d+\.\d{2})\s*(Dr|Cr|DR|CR|C|D|\+)?(?!\w)", re.IGNORECASE)
+
+
+def parse_transaction_line(line: str) -> dict | None:
+    """Parse one statement line into {date, description, amount, type}, or None if it is not a row."""
+    m = _ROW_DATE_RE.match(line)
+    if not m:
+        return None
+    txn_date = parse_date_token(m.group(1))
+    if not txn_date:
+        return None
+    rest = m.group(2)
+    amounts = list(_ROW_AMOUNT_RE.finditer(rest))
+    if not amounts:
+        return None
+    last = amounts[-1]
+    description = rest[:last.start()].strip(" -|")
+    if not description:
+        return None
+    marker = (last.group(2) or "").upper()
+    is_credit = marker in ("CR", "C", "+") or rest[last.end():].strip().upper().startswith("CR")
+    return {
+        "date": txn_date.strftime("%Y-%m-%d"),
+        "description": description,
+        "amount": float(last.group(1).replace(",", "")),
+        "type": "Cr" if is_credit else "Dr",
+    }
+
+
+def _ocr_page_lines(pdf_path: str, page_num: int) -> list[str]:
+    """Render and OCR one page, rebuilding its lines with the summary extractor's helpers."""
+    from pdf2image import convert_from_path
+
+    images = convert_from_path(pdf_path, dpi=TRANSACTION_OCR_DPI, first_page=page_num + 1, last_page=page_num + 1)
+    if not images:
+        return []
+    lines = _group_lines(_image_to_words(images[0]))
+    lines.sort(key=lambda line_words: line_words[0]["y"])
+    return [" ".join(_merge_line_numbers(line_words)) for line_words in lines]
+
+
+def iter_page_lines(pdf_bytes: bytes, ocr: bool = True) -> Iterator[tuple[int, list[str]]]:
+    """
+    Yield (page_num, lines) one page at a time. The text layer is used where present;
+    image-only pages are rendered and OCR'd individually, so only one page image is
+    ever held in memory regardless of the statement's length. The PDF is written to disk
+    once, at the first such page, and every render reads that copy.
+    """
+    reader = PdfReader(io.BytesIO(pdf_bytes))
+    with ExitStack() as stack:
+        pdf_path = None
+        for page_num, page in enumerate(reader.pages):
+            text = page.extract_text() or ""
+            if len(text.strip()) >= _MIN_PAGE_TEXT:
+                yield page_num, text.splitlines()
+            elif ocr:
+                if pdf_path is None:
+                    pdf_path = stack.enter_context(_pdf_on_disk(pdf_bytes))
+                try:
+                    yield page_num, _ocr_page_lines(pdf_path, page_num)
+                except Exception as e:
+                    print(f"❌ Error OCR-ing transactions on page {page_num + 1}: {e}")
+
+
+def iter_transactions(file_bytes: bytes, password: str | None = None, ocr: bool = True) -> Iterator[dict]:
+    """Generate transaction rows across every page of a statement, in page order."""
+    pdf_bytes = _decrypt_pdf_bytes(file_bytes, password)
+    if not pdf_bytes:
+        raise ValueError("PDF is encrypted. Please provide correct password.")
+    for page_num, lines in iter_page_lines(pdf_bytes, ocr):
+        row = 0
+        for line in lines:
+            txn = parse_transaction_line(line)
+            if txn:
+                yield {"page": page_num + 1, "row": row, **txn}
+                row += 1
+
+
+# ---------------- Storage ----------------
+
+_indexes_ready = False
+
+
+def ensure_indexes() -> None:
+    global _indexes_ready
+    if not _indexes_ready:
+        transactions_collection.create_index(
+            [("email", ASCENDING), ("message_id", ASCENDING), ("filename", ASCENDING),
+             ("page", ASCENDING), ("row", ASCENDING)],
+            unique=True,
+        )
+        transactions_collection.create_index([("email", ASCENDING), ("date", ASCENDING)])
+        _indexes_ready = True
+
+
+def store_transactions(email: str, message_id: str, filename: str, rows: Iterable[dict],
+                       batch_size: int = TRANSACTION_BATCH_SIZE) -> int:
+    """
+    Upsert rows in bulk batches as they are generated and drop rows a previous run
+    stored beyond this one. Returns the number of rows stored.
+    """
+    ensure_indexes()
+    key = {"email": email, "message_id": message_id, "filename": filename}
+    batch = []
+    stored = 0
+    # rows are numbered densely per page, so anything past each page's last row is stale
+    last_row = {}
+    for txn in rows:
+        batch.append(ReplaceOne({**key, "page": txn["page"], "row": txn["row"]}, {**key, **txn}, upsert=True))
+        last_row[txn["page"]] = max(last_row.get(txn["page"], -1), txn["row"])
+        if len(batch) >= batch_size:
+            transactions_collection.bulk_write(batch, ordered=False)
+            stored += len(batch)
+            batch = []
+    if batch:
+        transactions_collection.bulk_write(batch, ordered=False)
+        stored += len(batch)
+    stale = [{"page": {"$nin": list(last_row)}}] + [{"page": p, "row": {"$gt": r}} for p, r in last_row.items()]
+    transactions_collection.delete_many({**key, "$or": stale})
+    return stored
+
+
+def extract_and_store_transactions(email: str, message_id: str, filename: str, file_bytes: bytes,
+                                   password: str | None = None) -> int:
+    return store_transactions(email, message_id, filename, iter_transactions(file_bytes, password))
+
+
+def list_transactions(email: str, message_id: str | None = None, skip: int = 0, limit: int = 500) -> list[dict]:
+    query = {"email": email}
+    if message_id:
+        query["message_id"] = message_id
+    cursor = transactions_collection.find(query, {"_id": 0, "email": 0})
+    return list(cursor.sort([("date", ASCENDING), ("page", ASCENDING), ("row", ASCENDING)]).skip(skip).limit(limit))
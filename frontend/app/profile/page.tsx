@@ -65,34 +65,52 @@ const [messages, setMessages] = useState([
 const [chatInput, setChatInput] = useState('');
 const [chatLoading, setChatLoading] = useState(false);
 
-// --- Function to call llama API ---
+// --- Function to call the backend chat route (streams the reply as server-sent events) ---
 const sendMessage = async () => {
   if (!chatInput.trim()) return;
 
   // Add user message to chat
-  setMessages((prev) => [...prev, { role: 'user', content: chatInput }]);
-  const userMessage = chatInput;
+  const history = [...messages, { role: 'user', content: chatInput }];
+  setMessages(history);
   setChatInput('');
   setChatLoading(true);
 
   try {
-    const res = await fetch("http://0.0.0.0:8087/v1/chat/completions", {
+    const res = await fetch("http://localhost:8000/chat", {
       method: "POST",
       headers: { "Content-Type": "application/json" },
       body: JSON.stringify({
-        model: "meta-llama/Llama-3.3-70B-Instruct",
-        messages: [{ role: "user", content: userMessage }],
+        user_email: userEmail,
+        messages: history.filter((m) => m.role === 'user' || m.role === 'assistant'),
       }),
     });
 
-    if (!res.ok) {
-      throw new Error("Failed to connect with Llama server");
+    if (!res.ok || !res.body) {
+      throw new Error("Failed to connect with the assistant");
     }
 
-    const data = await res.json();
-    const reply = data?.choices?.[0]?.message?.content || "⚠️ No response from Llama.";
-
-    setMessages((prev) => [...prev, { role: 'assistant', content: reply }]);
+    // Append an empty assistant message and grow it as tokens arrive
+    setMessages((prev) => [...prev, { role: 'assistant', content: '' }]);
+    const appendToReply = (text: string) =>
+      setMessages((prev) => [...prev.slice(0, -1), { ...prev[prev.length - 1], content: prev[prev.length - 1].content + text }]);
+
+    const reader = res.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    while (true) {
+      const { done, value } = await reader.read();
+      if (done) break;
+      buffer += decoder.decode(value, { stream: true });
+      const events = buffer.split("\n\n");
+      buffer = events.pop() || '';
+      for (const event of events) {
+        const data = event.replace(/^data: /, '');
+        if (!data || data === '[DONE]') continue;
+        const parsed = JSON.parse(data);
+        if (parsed.error) throw new Error(parsed.error);
+        if (parsed.delta) appendToReply(parsed.delta);
+      }
+    }
   } catch (err: any) {
     setMessages((prev) => [...prev, { role: 'error', content: `❌ Error: ${err.message}` }]);
   } finally {